@@ -8,6 +8,7 @@ from app.schemas.auth import UserCreate, UserResponse, Token, UserLogin, GeminiK
 from app.auth import crud
 from app.auth.security import create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
 from app.auth.dependencies import get_current_active_user, user_to_response
+from app.ratelimit import rate_limiter
 
 auth_router = APIRouter(prefix="/auth", tags=["authentication"])
 
@@ -30,13 +31,13 @@ async def register_user(user: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Create new user
-    new_user = crud.create_user(db=db, user=user)
+    new_user = await crud.create_user_async(db=db, user=user)
     return user_to_response(new_user)
 
 @auth_router.post("/login", response_model=Token)
 async def login_user(user_credentials: UserLogin, db: Session = Depends(get_db)):
     """Login user with email and password"""
-    user = crud.authenticate_user(db, user_credentials.email, user_credentials.password)
+    user = await crud.authenticate_user_async(db, user_credentials.email, user_credentials.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -53,7 +54,7 @@ async def login_user(user_credentials: UserLogin, db: Session = Depends(get_db))
 @auth_router.post("/token", response_model=Token)
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     """OAuth2 compatible token login endpoint"""
-    user = crud.authenticate_user(db, form_data.username, form_data.password)
+    user = await crud.authenticate_user_async(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -71,6 +72,11 @@ async def read_users_me(current_user = Depends(get_current_active_user)):
     """Get current user information"""
     return user_to_response(current_user)
 
+@auth_router.get("/usage")
+def read_usage(current_user = Depends(get_current_active_user)):
+    """Get the current user's rate limit buckets and request counters"""
+    return {"enabled": rate_limiter.enabled, "limits": rate_limiter.usage(current_user.id)}
+
 @auth_router.put("/gemini-key", response_model=UserResponse)
 async def update_gemini_key(
     key_update: GeminiKeyUpdate,
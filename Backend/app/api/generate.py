@@ -1,16 +1,22 @@
+from typing import Optional
 from fastapi import APIRouter, Query, HTTPException, Depends
 from sqlalchemy.orm import Session
-from app.models.generative import generate_text, generate_image
-from app.models.file_utils import get_uploaded_image
+from app.models.generative import (
+    agenerate_text, agenerate_image, GenerationBusyError, GenerationTimeoutError
+)
+from app.models.image_store import (
+    get_image_payload, get_legacy_image_payload, ImageNotFoundError, ImageStoreBusyError
+)
 from app.database import get_db
-from app.auth.dependencies import get_current_active_user
+from app.auth.dependencies import get_current_active_user, rate_limited
 
 generate_router = APIRouter()
 
-@generate_router.get("/gemini")
+@generate_router.get("/gemini", dependencies=[Depends(rate_limited("ai"))])
 async def generate(
     query: str,
     model_type: str = Query(default='text'),
+    image_id: Optional[str] = Query(default=None),
     current_user = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -20,14 +26,23 @@ async def generate(
 
     try:
         if model_type == 'text':
-            response = generate_text(query, db, current_user.id)
+            response = await agenerate_text(query, db, current_user.id)
         else:
-            # Get the uploaded image for image-based generation
-            img_data = get_uploaded_image()
-            response = generate_image(query, img_data, db, current_user.id)
+            # Use the user's stored image, falling back to the legacy single upload
+            if image_id:
+                img_data = await get_image_payload(current_user.id, image_id)
+            else:
+                img_data = await get_legacy_image_payload()
+            response = await agenerate_image(query, img_data, db, current_user.id)
         
         return response
+    except ImageNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except (GenerationBusyError, ImageStoreBusyError) as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "2"})
+    except GenerationTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Generation failed: {str(e)}")
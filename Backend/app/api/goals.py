@@ -2,16 +2,17 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import Optional, List
 from app.database import get_db
-from app.auth.dependencies import get_current_active_user
+from app.auth.dependencies import get_current_active_user, rate_limited
 from app.models.auth import User
 from app.crud.goal import (
-    create_goal, get_goal, get_goals, update_goal, delete_goal, get_goal_stats
+    create_goal, get_goal, get_goals, update_goal, delete_goal, get_goal_stats, get_goal_facets,
+    InvalidCursorError, GoalWriteConflictError
 )
 from app.schemas.goal import (
     Goal, GoalCreate, GoalUpdate, GoalResponse, GoalsListResponse
 )
 
-router = APIRouter(prefix="/api/goals", tags=["goals"])
+router = APIRouter(prefix="/api/goals", tags=["goals"], dependencies=[Depends(rate_limited("crud"))])
 
 
 @router.post("/", response_model=GoalResponse, status_code=201)
@@ -32,31 +33,45 @@ def create_new_goal(
 def list_goals(
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(10, ge=1, le=100, description="Number of items per page"),
-    category: Optional[str] = Query(None, description="Filter by category"),
+    category: Optional[str] = Query(None, description="Filter by category (exact, ignoring case)"),
+    category_prefix: Optional[str] = Query(None, description="Filter by category prefix (ignoring case)"),
     status: Optional[str] = Query(None, description="Filter by status"),
     priority: Optional[str] = Query(None, description="Filter by priority"),
     search: Optional[str] = Query(None, description="Search in title and description"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page; replaces page"),
+    include_total: bool = Query(True, description="Count all matching goals"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Get all goals for the authenticated user with optional filtering and pagination."""
+    """Get all goals for the authenticated user with optional filtering and pagination.
+
+    Either page through with page/page_size, or follow next_cursor, which
+    costs the same on every page.
+    """
     skip = (page - 1) * page_size
-    goals, total = get_goals(
-        db=db, 
-        user_id=current_user.id,
-        skip=skip, 
-        limit=page_size,
-        category=category,
-        status=status,
-        priority=priority,
-        search=search
-    )
+    try:
+        goals, total, next_cursor = get_goals(
+            db=db, 
+            user_id=current_user.id,
+            skip=skip, 
+            limit=page_size,
+            category=category,
+            status=status,
+            priority=priority,
+            search=search,
+            cursor=cursor,
+            include_total=include_total,
+            category_prefix=category_prefix
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     return GoalsListResponse(
         data=goals,
         total=total,
         page=page,
         page_size=page_size,
+        next_cursor=next_cursor,
         message="Goals retrieved successfully"
     )
 
@@ -71,6 +86,16 @@ def get_stats(
     return {"data": stats, "message": "Stats retrieved successfully"}
 
 
+@router.get("/facets")
+def get_facets(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get goal counts per category, status and priority for the authenticated user."""
+    facets = get_goal_facets(db=db, user_id=current_user.id)
+    return {"data": facets, "message": "Facets retrieved successfully"}
+
+
 @router.get("/{goal_id}", response_model=GoalResponse)
 def get_goal_by_id(
     goal_id: int, 
@@ -93,7 +118,10 @@ def update_goal_by_id(
     current_user: User = Depends(get_current_active_user)
 ):
     """Update a specific goal for the authenticated user."""
-    db_goal = update_goal(db=db, goal_id=goal_id, user_id=current_user.id, goal_update=goal_update)
+    try:
+        db_goal = update_goal(db=db, goal_id=goal_id, user_id=current_user.id, goal_update=goal_update)
+    except GoalWriteConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     if not db_goal:
         raise HTTPException(status_code=404, detail="Goal not found")
     
@@ -107,7 +135,10 @@ def delete_goal_by_id(
     current_user: User = Depends(get_current_active_user)
 ):
     """Delete a specific goal for the authenticated user."""
-    success = delete_goal(db=db, goal_id=goal_id, user_id=current_user.id)
+    try:
+        success = delete_goal(db=db, goal_id=goal_id, user_id=current_user.id)
+    except GoalWriteConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     if not success:
         raise HTTPException(status_code=404, detail="Goal not found")
     
@@ -123,7 +154,10 @@ def update_goal_status(
 ):
     """Update only the status of a specific goal for the authenticated user."""
     goal_update = GoalUpdate(status=status)
-    db_goal = update_goal(db=db, goal_id=goal_id, user_id=current_user.id, goal_update=goal_update)
+    try:
+        db_goal = update_goal(db=db, goal_id=goal_id, user_id=current_user.id, goal_update=goal_update)
+    except GoalWriteConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     if not db_goal:
         raise HTTPException(status_code=404, detail="Goal not found")
     
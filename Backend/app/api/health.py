@@ -1,7 +1,45 @@
 from fastapi import APIRouter
+from app.database import pool_stats
+from app.auth.user_cache import user_cache_stats
+from app.auth.hashing import password_pool_stats
+from app.auth.key_cache import key_cache_stats
+from app.models.generative import generation_pool_stats, resilience_stats
+from app.models.gemini_pool import client_pool_stats
+from app.models.llm_backends import get_backend
+from app.models.image_store import image_store_stats
+from app.models.generation_cache import roadmap_cache
+from app.models.job_queue import job_queue
+from app.models.roadmap_generator import roadmap_flights, parse_stats
+from app.ratelimit import rate_limiter
+from app.logging_setup import logging_stats
+from app.search import search_stats
+from app.crud.goal import goal_facets_cache_stats
 
 health_router = APIRouter()
 
 @health_router.get("/health")
 async def health_check():
     return {"status": "ok"}
+
+@health_router.get("/metrics")
+async def metrics():
+    """In-process cache and pool counters for monitoring."""
+    return {
+        "database_pool": pool_stats(),
+        "user_cache": user_cache_stats(),
+        "password_hashing": password_pool_stats(),
+        "api_key_cache": key_cache_stats(),
+        "llm_backend": get_backend().name,
+        "generation_pool": generation_pool_stats(),
+        "llm_resilience": resilience_stats(),
+        "gemini_clients": client_pool_stats(),
+        "image_store": image_store_stats(),
+        "roadmap_cache": roadmap_cache.stats(),
+        "jobs": job_queue.stats(),
+        "roadmap_single_flight": roadmap_flights.stats(),
+        "roadmap_parsing": parse_stats.stats(),
+        "rate_limits": rate_limiter.stats(),
+        "logging": logging_stats(),
+        "goal_search": search_stats(),
+        "goal_facets_cache": goal_facets_cache_stats(),
+    }
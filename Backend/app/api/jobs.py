@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.auth.dependencies import get_current_user, rate_limited
+from app.models.auth import User
+from app.models.job import JobStatus
+from app.crud.job import get_job
+from app.crud.roadmap import roadmap_crud
+from app.schemas.job import JobResponse
+
+router = APIRouter(prefix="/jobs", tags=["jobs"], dependencies=[Depends(rate_limited("crud"))])
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+def get_job_status(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get the status of a background job, with its roadmap once done."""
+    job = get_job(db, job_id, current_user.id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+
+    result = None
+    if job.status == JobStatus.done and job.roadmap_id:
+        result = roadmap_crud.get_roadmap(db, job.roadmap_id, current_user.id)
+    return JobResponse(data=job, result=result, message=f"Job {job.status.value}")
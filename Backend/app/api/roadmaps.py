@@ -1,26 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Iterator, List
 
-from app.database import get_db
-from app.auth.dependencies import get_current_user
+from app.database import get_db, SessionLocal
+from app.auth.dependencies import get_current_user, rate_limited, check_rate_limit
 from app.models.auth import User
 from app.schemas.roadmap import (
     Roadmap, RoadmapCreate, RoadmapUpdate,
-    RoadmapStep, RoadmapStepCreate, RoadmapStepUpdate
+    RoadmapStep, RoadmapStepCreate, RoadmapStepUpdate,
+    RoadmapBatchGenerateRequest, RoadmapBatchGenerateResponse, RoadmapBatchResult
 )
 from app.crud.roadmap import roadmap_crud, roadmap_step_crud
 from app.crud.goal import get_goal
-from app.models.generative import generate_text
-from app.schemas.roadmap import RoadmapStepCreate
+from app.models.generative import GenerationBusyError, GenerationTimeoutError
+from app.models.roadmap_generator import (
+    generate_roadmap, generate_roadmaps_batch, stream_roadmap_steps, build_roadmap_create,
+    regenerate_remaining_steps
+)
+from app.models.job_queue import job_queue
+from app.crud.job import create_job
+from app.schemas.job import Job
 import json
-import re
-from datetime import date
+import logging
+
+logger = logging.getLogger(__name__)
 
+# Rate limits are set per route: CRUD routes spend the "crud" bucket and
+# generation routes only the "ai" bucket
 router = APIRouter(prefix="/roadmaps", tags=["roadmaps"])
 
 
-@router.post("/goal/{goal_id}", response_model=Roadmap, status_code=status.HTTP_201_CREATED)
+@router.post("/goal/{goal_id}", response_model=Roadmap, status_code=status.HTTP_201_CREATED, dependencies=[Depends(rate_limited("crud"))])
 def create_roadmap_for_goal(
     goal_id: int,
     roadmap: RoadmapCreate,
@@ -38,7 +49,7 @@ def create_roadmap_for_goal(
     return db_roadmap
 
 
-@router.get("/goal/{goal_id}", response_model=Roadmap)
+@router.get("/goal/{goal_id}", response_model=Roadmap, dependencies=[Depends(rate_limited("crud"))])
 def get_roadmap_by_goal(
     goal_id: int,
     db: Session = Depends(get_db),
@@ -54,7 +65,7 @@ def get_roadmap_by_goal(
     return roadmap
 
 
-@router.get("/{roadmap_id}", response_model=Roadmap)
+@router.get("/{roadmap_id}", response_model=Roadmap, dependencies=[Depends(rate_limited("crud"))])
 def get_roadmap(
     roadmap_id: int,
     db: Session = Depends(get_db),
@@ -70,7 +81,7 @@ def get_roadmap(
     return roadmap
 
 
-@router.put("/{roadmap_id}", response_model=Roadmap)
+@router.put("/{roadmap_id}", response_model=Roadmap, dependencies=[Depends(rate_limited("crud"))])
 def update_roadmap(
     roadmap_id: int,
     roadmap_update: RoadmapUpdate,
@@ -88,7 +99,7 @@ def update_roadmap(
     return roadmap
 
 
-@router.delete("/{roadmap_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/{roadmap_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(rate_limited("crud"))])
 def delete_roadmap(
     roadmap_id: int,
     db: Session = Depends(get_db),
@@ -103,8 +114,48 @@ def delete_roadmap(
         )
 
 
+@router.post("/{roadmap_id}/regenerate-remaining", response_model=Roadmap, dependencies=[Depends(rate_limited("ai"))])
+def regenerate_remaining_roadmap_steps(
+    roadmap_id: int,
+    cache: str = Query("use", pattern="^(use|bypass)$"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Regenerate only the incomplete steps of a roadmap, keeping completed ones."""
+    roadmap = roadmap_crud.get_roadmap(db, roadmap_id, current_user.id)
+    if not roadmap:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Roadmap not found"
+        )
+    if roadmap.steps and all(step.is_completed for step in roadmap.steps):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="All roadmap steps are already completed"
+        )
+
+    try:
+        db_roadmap = regenerate_remaining_steps(
+            db, roadmap, current_user.id, use_cache=cache != "bypass")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except GenerationBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "2"})
+    except GenerationTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        logger.exception("Remaining steps regeneration failed", extra={"roadmap_id": roadmap_id, "user_id": current_user.id})
+        raise HTTPException(
+            status_code=500, detail=f"Gemini generation failed: {str(e)}")
+
+    if not db_roadmap:
+        raise HTTPException(
+            status_code=400, detail="Failed to update roadmap steps")
+    return db_roadmap
+
+
 # Roadmap Steps endpoints
-@router.post("/{roadmap_id}/steps", response_model=RoadmapStep, status_code=status.HTTP_201_CREATED)
+@router.post("/{roadmap_id}/steps", response_model=RoadmapStep, status_code=status.HTTP_201_CREATED, dependencies=[Depends(rate_limited("crud"))])
 def create_roadmap_step(
     roadmap_id: int,
     step: RoadmapStepCreate,
@@ -122,7 +173,7 @@ def create_roadmap_step(
     return db_step
 
 
-@router.get("/{roadmap_id}/steps", response_model=List[RoadmapStep])
+@router.get("/{roadmap_id}/steps", response_model=List[RoadmapStep], dependencies=[Depends(rate_limited("crud"))])
 def get_roadmap_steps(
     roadmap_id: int,
     db: Session = Depends(get_db),
@@ -134,7 +185,7 @@ def get_roadmap_steps(
     return steps
 
 
-@router.get("/steps/{step_id}", response_model=RoadmapStep)
+@router.get("/steps/{step_id}", response_model=RoadmapStep, dependencies=[Depends(rate_limited("crud"))])
 def get_roadmap_step(
     step_id: int,
     db: Session = Depends(get_db),
@@ -150,7 +201,7 @@ def get_roadmap_step(
     return step
 
 
-@router.put("/steps/{step_id}", response_model=RoadmapStep)
+@router.put("/steps/{step_id}", response_model=RoadmapStep, dependencies=[Depends(rate_limited("crud"))])
 def update_roadmap_step(
     step_id: int,
     step_update: RoadmapStepUpdate,
@@ -168,7 +219,7 @@ def update_roadmap_step(
     return step
 
 
-@router.patch("/steps/{step_id}/toggle", response_model=RoadmapStep)
+@router.patch("/steps/{step_id}/toggle", response_model=RoadmapStep, dependencies=[Depends(rate_limited("crud"))])
 def toggle_step_completion(
     step_id: int,
     db: Session = Depends(get_db),
@@ -185,7 +236,7 @@ def toggle_step_completion(
     return step
 
 
-@router.delete("/steps/{step_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/steps/{step_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(rate_limited("crud"))])
 def delete_roadmap_step(
     step_id: int,
     db: Session = Depends(get_db),
@@ -200,7 +251,7 @@ def delete_roadmap_step(
         )
 
 
-@router.post("/{roadmap_id}/steps/reorder", status_code=status.HTTP_200_OK)
+@router.post("/{roadmap_id}/steps/reorder", status_code=status.HTTP_200_OK, dependencies=[Depends(rate_limited("crud"))])
 def reorder_roadmap_steps(
     roadmap_id: int,
     step_orders: List[dict],
@@ -218,9 +269,37 @@ def reorder_roadmap_steps(
     return {"message": "Steps reordered successfully"}
 
 
-@router.post("/generate/{goal_id}", response_model=Roadmap, status_code=status.HTTP_201_CREATED)
+@router.post("/generate/batch", response_model=RoadmapBatchGenerateResponse)
+def generate_roadmaps_for_goals(
+    batch: RoadmapBatchGenerateRequest,
+    cache: str = Query("use", pattern="^(use|bypass)$", description="Set to 'bypass' to force fresh Gemini calls"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Generate roadmaps for several goals at once, reporting success or failure per goal."""
+    # Each goal actually sent to Gemini costs one AI token
+    outcomes = generate_roadmaps_batch(
+        db, batch.goal_ids, current_user.id, use_cache=cache != "bypass",
+        before_generate=lambda count: check_rate_limit(current_user.id, "ai", cost=count))
+    results = [
+        RoadmapBatchResult(goal_id=goal_id, success=roadmap_id is not None, roadmap_id=roadmap_id, error=error)
+        for goal_id, (roadmap_id, error) in outcomes.items()
+    ]
+    succeeded = sum(1 for result in results if result.success)
+    return RoadmapBatchGenerateResponse(
+        data=results,
+        succeeded=succeeded,
+        failed=len(results) - succeeded,
+        message=f"Generated {succeeded} of {len(results)} roadmaps"
+    )
+
+
+@router.post("/generate/{goal_id}", response_model=Roadmap, status_code=status.HTTP_201_CREATED,
+             dependencies=[Depends(rate_limited("ai"))])
 def generate_roadmap_for_goal(
     goal_id: int,
+    cache: str = Query("use", pattern="^(use|bypass)$", description="Set to 'bypass' to force a fresh Gemini call"),
+    run_async: bool = Query(False, alias="async", description="Queue generation as a background job and return 202"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -230,102 +309,122 @@ def generate_roadmap_for_goal(
     if not goal:
         raise HTTPException(status_code=404, detail="Goal not found")
 
-    today_str = date.today().isoformat()
-    deadline_str = str(goal.deadline) if goal.deadline else 'No deadline specified'
-    # Prepare prompt for Gemini
-    prompt = f"""
-    You are an expert productivity and learning coach.
-
-    Given the following goal details, generate a detailed and actionable step-by-step roadmap to achieve the goal. 
-    Your response should be a JSON array where each item is an object with the following keys:
-    - 'title': a short, clear summary of the step
-    - 'description': a concise but helpful explanation of what needs to be done in that step
-
-    Instructions for roadmap generation:
-        1. Break down the goal into logical, progressive steps.
-        2. Ensure each step builds on the previous one and leads toward the final outcome.
-        3. Incorporate best practices from the relevant field (e.g., programming, design, writing).
-        4. Strictly design the roadmap so that all steps are distributed within the date range from today ({today_str}) to the deadline ({deadline_str}). Do not exceed the deadline.
-        5. If a deadline is provided, distribute the steps realistically and evenly across the available time.
-        6. Include milestones and checkpoints where applicable.
-        7. Focus on practical execution—suggest resources, tools, or actions that help achieve each step.
-
-    Formatting instructions:
-    - The 'description' field supports markdown formatting. You may use *italic*, **bold**, and line breaks (blank lines) for clarity.
-    - You can also combine **bold and *italic* together**.
-    - Line breaks in your response will be preserved.
-
-    Example description:
-    This is a step description.
-
-    It supports *italic* and **bold** text.
-
-    You can also combine **bold and *italic* together**.
-
-    Line breaks
-
-    are preserved.
-
-    Goal Details:
-    - Goal Title: {goal.title}
-    - Description: {goal.description or 'No additional description provided.'}
-    - Category: {goal.category}
-    - Priority Level: {goal.priority}
-    - Today's Date: {today_str}
-    - Deadline: {deadline_str}
-
-    Return the output in the following format (as JSON):
-    [
-    {{
-        "title": "Step 1 Title",
-        "description": "Step 1 detailed description"
-    }},
-    ...
-    ]
-    """
+    if run_async:
+        if roadmap_crud.get_roadmap_by_goal(db, goal_id, current_user.id):
+            raise HTTPException(status_code=400, detail="Roadmap already exists")
+        job = create_job(db, current_user.id, goal_id, params={"use_cache": cache != "bypass"})
+        job_queue.notify()
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content={"data": Job.model_validate(job).model_dump(mode="json"), "message": "Roadmap generation queued"},
+            headers={"Location": f"/jobs/{job.id}"},
+        )
 
     # Call Gemini API
-    import traceback
-    import re
     try:
-        result = generate_text(prompt, db, current_user.id)
-        print("Gemini raw result:", repr(result['text']))  # Debug Gemini output
-        # Clean Gemini response: robustly strip markdown code fences and language tags
-        raw = result['text']
-        print(f"Gemini raw result: {repr(raw)}")
-        cleaned = raw.strip()
-        # Remove code fences if present
-        if cleaned.startswith('```'):
-            # Remove the first line (``` or ```json) and the last line (```)
-            lines = cleaned.splitlines()
-            if len(lines) >= 3 and lines[0].startswith('```') and lines[-1].startswith('```'):
-                cleaned = '\n'.join(lines[1:-1])
-            else:
-                # fallback: remove all code fences using regex
-                cleaned = re.sub(r'^```[a-zA-Z]*\n|\n```$', '', cleaned)
-        print(f"Gemini cleaned result: {repr(cleaned)}")
-        try:
-            steps_data = json.loads(cleaned)
-        except Exception as e:
-            print(f"Gemini generation failed: {type(e).__name__}({repr(e)})")
-            raise
+        db_roadmap = generate_roadmap(
+            db, goal, current_user.id, use_cache=cache != "bypass")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except GenerationBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "2"})
+    except GenerationTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
-        print("Gemini generation failed:", repr(e))
-        print(traceback.format_exc())
+        logger.exception("Roadmap generation failed", extra={"goal_id": goal_id, "user_id": current_user.id})
         raise HTTPException(
             status_code=500, detail=f"Gemini generation failed: {str(e)}")
 
-    # Build RoadmapCreate and steps
-    roadmap_in = RoadmapCreate(
-        title=f"Roadmap for: {goal.title}",
-        description=f"Auto-generated roadmap for goal '{goal.title}'",
-        steps=[RoadmapStepCreate(**step) for step in steps_data]
-    )
-
-    # Use existing CRUD to create roadmap
-    db_roadmap = roadmap_crud.create_roadmap(
-        db, roadmap_in, goal_id, current_user.id)
     if not db_roadmap:
         raise HTTPException(
             status_code=400, detail="Roadmap already exists or failed to create")
     return db_roadmap
+
+
+def _sse_event(event: str, data: dict) -> str:
+    """Format a Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _stream_roadmap_events(goal_id: int, user_id: int, steps: Iterator[dict]) -> Iterator[str]:
+    """Persist streamed steps as they arrive and emit each one as an SSE event.
+
+    Runs after the request handler has returned, so it uses its own session.
+    If the client disconnects, the generator is closed: Gemini streaming stops
+    and the partial roadmap is deleted.
+    """
+    db = SessionLocal()
+    db_roadmap = None
+    step_count = 0
+    try:
+        goal = get_goal(db, goal_id, user_id)
+        db_roadmap = roadmap_crud.create_roadmap(
+            db, build_roadmap_create(goal, []), goal_id, user_id)
+        if not db_roadmap:
+            yield _sse_event("error", {"detail": "Roadmap already exists or failed to create"})
+            return
+
+        for index, step_data in enumerate(steps):
+            step_in = RoadmapStepCreate(**{**step_data, "order_index": index})
+            db_step = roadmap_step_crud.create_step(db, step_in, db_roadmap.id, user_id)
+            step_count += 1
+            yield _sse_event("step", RoadmapStep.model_validate(db_step).model_dump(mode="json"))
+
+        if not step_count:
+            # Keep the empty roadmap out of the database (deleted below) so the goal can be retried
+            logger.warning("Streamed roadmap generation produced no steps", extra={"goal_id": goal_id, "user_id": user_id})
+            yield _sse_event("error", {"detail": "Gemini returned no roadmap steps"})
+            return
+
+        db.refresh(db_roadmap)
+        yield _sse_event("roadmap", Roadmap.model_validate(db_roadmap).model_dump(mode="json"))
+        db_roadmap = None
+    except GeneratorExit:
+        logger.info("Client disconnected from roadmap stream", extra={"goal_id": goal_id, "user_id": user_id})
+        raise
+    except Exception as e:
+        logger.exception("Streamed roadmap generation failed", extra={"goal_id": goal_id, "user_id": user_id})
+        yield _sse_event("error", {"detail": f"Gemini generation failed: {str(e)}"})
+    finally:
+        # Stop the Gemini stream if we are leaving early
+        close = getattr(steps, "close", None)
+        if close is not None:
+            close()
+        # Drop a partially generated roadmap so the goal can be regenerated
+        if db_roadmap is not None:
+            db.rollback()
+            roadmap_crud.delete_roadmap(db, db_roadmap.id, user_id)
+        db.close()
+
+
+@router.post("/generate/{goal_id}/stream", dependencies=[Depends(rate_limited("ai"))])
+def stream_roadmap_for_goal(
+    goal_id: int,
+    cache: str = Query("use", pattern="^(use|bypass)$", description="Set to 'bypass' to force a fresh Gemini call"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Generate a roadmap with Gemini, streaming each step as a Server-Sent Event.
+
+    Emits a `step` event per persisted step, then a final `roadmap` event with
+    the complete roadmap (or an `error` event).
+    """
+    goal = get_goal(db, goal_id, current_user.id)
+    if not goal:
+        raise HTTPException(status_code=404, detail="Goal not found")
+    if roadmap_crud.get_roadmap_by_goal(db, goal_id, current_user.id):
+        raise HTTPException(status_code=400, detail="Roadmap already exists")
+
+    try:
+        steps = stream_roadmap_steps(
+            db, goal, current_user.id, use_cache=cache != "bypass")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except GenerationBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "2"})
+
+    return StreamingResponse(
+        _stream_roadmap_events(goal_id, current_user.id, steps),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
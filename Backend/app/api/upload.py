@@ -1,6 +1,8 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException
+from fastapi import APIRouter, Depends, File, UploadFile, HTTPException
 from pathlib import Path
-from app.models.file_utils import save_file
+from app.auth.dependencies import get_current_active_user
+from app.models.file_utils import save_file, UploadTooLargeError
+from app.models.image_store import store_image, InvalidImageError, ImageStoreBusyError
 
 upload_router = APIRouter()
 
@@ -8,10 +10,44 @@ MAX_UPLOAD_SIZE = 10 * 1024 * 1024  # 10 MB size limit
 
 @upload_router.post("/upload")
 async def upload(file: UploadFile = File(...)):
-    if file.size > MAX_UPLOAD_SIZE:
+    # Reject early when the client declared a size; the limit is enforced again while streaming
+    if file.size is not None and file.size > MAX_UPLOAD_SIZE:
         raise HTTPException(status_code=413, detail="File size exceeds the allowed limit")
-    
-    file_path = Path(__file__).resolve().parent.parent / "uploads" / file.filename
-    await save_file(file, file_path)
-    
-    return {"filename": file.filename, "message": "File uploaded successfully"}
+
+    filename = Path(file.filename or "").name
+    if not filename:
+        raise HTTPException(status_code=400, detail="Missing file name")
+
+    file_path = Path(__file__).resolve().parent.parent / "uploads" / filename
+    try:
+        saved = await save_file(file, file_path, max_size=MAX_UPLOAD_SIZE)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    return {
+        "filename": filename,
+        "size": saved["size"],
+        "sha256": saved["sha256"],
+        "message": "File uploaded successfully",
+    }
+
+
+@upload_router.post("/upload/image")
+async def upload_image(file: UploadFile = File(...), current_user = Depends(get_current_active_user)):
+    """Upload an image to the user's image store and return its id for /gemini."""
+    if file.size is not None and file.size > MAX_UPLOAD_SIZE:
+        raise HTTPException(status_code=413, detail="File size exceeds the allowed limit")
+
+    try:
+        stored = await store_image(file, current_user.id, max_size=MAX_UPLOAD_SIZE)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except InvalidImageError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ImageStoreBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "2"})
+
+    return {
+        **stored,
+        "message": "Image already stored" if stored["deduplicated"] else "Image uploaded successfully",
+    }
@@ -2,6 +2,9 @@ from sqlalchemy.orm import Session
 from app.models.auth import User
 from app.schemas.auth import UserCreate
 from app.auth.security import get_password_hash, verify_password, encrypt_api_key, decrypt_api_key
+from app.auth.user_cache import invalidate_user
+from app.auth.key_cache import key_generation, get_cached_key, cache_key, purge_key
+from app.auth.hashing import hash_password, check_password
 from typing import Optional
 
 def get_user_by_email(db: Session, email: str) -> Optional[User]:
@@ -16,9 +19,10 @@ def get_user_by_id(db: Session, user_id: int) -> Optional[User]:
     """Get user by ID"""
     return db.query(User).filter(User.id == user_id).first()
 
-def create_user(db: Session, user: UserCreate) -> User:
+def create_user(db: Session, user: UserCreate, hashed_password: Optional[str] = None) -> User:
     """Create a new user"""
-    hashed_password = get_password_hash(user.password)
+    if hashed_password is None:
+        hashed_password = get_password_hash(user.password)
     db_user = User(
         email=user.email,
         username=user.username,
@@ -38,17 +42,29 @@ def update_user_gemini_key(db: Session, user_id: int, api_key: str) -> Optional[
     # Encrypt the API key before storing
     encrypted_key = encrypt_api_key(api_key) if api_key else None
     user.gemini_api_key = encrypted_key
+    username = user.username
     db.commit()
+    invalidate_user(username)
+    purge_key(user_id)
     db.refresh(user)
     return user
 
 def get_user_gemini_key(db: Session, user_id: int) -> Optional[str]:
     """Get user's decrypted Gemini API key"""
+    cached = get_cached_key(user_id)
+    if cached is not None:
+        return cached
+
+    # Taken before the read, so a key update landing meanwhile keeps the old key out of the cache
+    generation = key_generation()
     user = get_user_by_id(db, user_id)
     if not user or not user.gemini_api_key:
         return None
     
-    return decrypt_api_key(user.gemini_api_key)
+    api_key = decrypt_api_key(user.gemini_api_key)
+    if api_key:
+        cache_key(user_id, generation, api_key)
+    return api_key
 
 def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
     """Authenticate user with email and password"""
@@ -58,3 +74,18 @@ def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
     if not verify_password(password, user.hashed_password):
         return None
     return user
+
+
+async def create_user_async(db: Session, user: UserCreate) -> User:
+    """Create a new user, hashing the password off the event loop"""
+    hashed_password = await hash_password(user.password)
+    return create_user(db, user, hashed_password=hashed_password)
+
+async def authenticate_user_async(db: Session, email: str, password: str) -> Optional[User]:
+    """Authenticate user, verifying the password off the event loop"""
+    user = get_user_by_email(db, email)
+    if not user:
+        return None
+    if not await check_password(password, user.hashed_password):
+        return None
+    return user
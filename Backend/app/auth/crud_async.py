@@ -0,0 +1,45 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.auth import User
+from app.schemas.auth import UserCreate
+from app.auth import crud
+from app.auth.hashing import hash_password, check_password
+from typing import Optional
+
+# AsyncSession counterparts of app.auth.crud. Writes and key reads run the sync
+# implementations through AsyncSession.run_sync, so cache invalidation and the
+# decrypted key cache behave the same on both paths.
+
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
+    """Get user by email"""
+    return await db.scalar(select(User).where(User.email == email))
+
+async def get_user_by_username(db: AsyncSession, username: str) -> Optional[User]:
+    """Get user by username"""
+    return await db.scalar(select(User).where(User.username == username))
+
+async def get_user_by_id(db: AsyncSession, user_id: int) -> Optional[User]:
+    """Get user by ID"""
+    return await db.scalar(select(User).where(User.id == user_id))
+
+async def create_user(db: AsyncSession, user: UserCreate) -> User:
+    """Create a new user, hashing the password in the worker pool"""
+    hashed_password = await hash_password(user.password)
+    return await db.run_sync(crud.create_user, user, hashed_password=hashed_password)
+
+async def update_user_gemini_key(db: AsyncSession, user_id: int, api_key: str) -> Optional[User]:
+    """Update user's Gemini API key (see crud.update_user_gemini_key)"""
+    return await db.run_sync(crud.update_user_gemini_key, user_id, api_key)
+
+async def get_user_gemini_key(db: AsyncSession, user_id: int) -> Optional[str]:
+    """Get user's decrypted Gemini API key (see crud.get_user_gemini_key)"""
+    return await db.run_sync(crud.get_user_gemini_key, user_id)
+
+async def authenticate_user(db: AsyncSession, email: str, password: str) -> Optional[User]:
+    """Authenticate user with email and password, verifying off the event loop"""
+    user = await get_user_by_email(db, email)
+    if not user:
+        return None
+    if not await check_password(password, user.hashed_password):
+        return None
+    return user
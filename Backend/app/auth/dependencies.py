@@ -1,10 +1,13 @@
+import math
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import get_db, get_async_db
 from app.models.auth import User
 from app.schemas.auth import UserResponse
 from app.auth.security import verify_token
+from app.auth.user_cache import get_cached_user, aget_cached_user
+from app.ratelimit import rate_limiter
 
 # HTTP Bearer token scheme
 security = HTTPBearer()
@@ -20,18 +23,51 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
     token = credentials.credentials
     username = verify_token(token, credentials_exception)
     
-    user = db.query(User).filter(User.username == username).first()
+    user = get_cached_user(db, username)
     if user is None:
         raise credentials_exception
     
     return user
 
+async def get_current_user_async(credentials: HTTPAuthorizationCredentials = Depends(security), db = Depends(get_async_db)):
+    """Get current user from JWT token using the async engine, for routers on get_async_db"""
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+    username = verify_token(credentials.credentials, credentials_exception)
+
+    user = await aget_cached_user(db, username)
+    if user is None:
+        raise credentials_exception
+
+    return user
+
 def get_current_active_user(current_user: User = Depends(get_current_user)):
     """Get current active user"""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
+def check_rate_limit(user_id: int, endpoint_class: str, cost: float = 1):
+    """Spend from the user's token bucket for endpoint_class, raising 429 when it is empty"""
+    allowed, retry_after = rate_limiter.acquire(user_id, endpoint_class, cost)
+    if not allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Rate limit exceeded for {endpoint_class} requests, please retry later",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+def rate_limited(endpoint_class: str):
+    """Dependency that charges one token from the current user's endpoint_class bucket"""
+    def dependency(current_user: User = Depends(get_current_user)):
+        check_rate_limit(current_user.id, endpoint_class)
+        return current_user
+    return dependency
+
 def user_to_response(user: User) -> UserResponse:
     """Convert User model to UserResponse with has_gemini_key field"""
     return UserResponse(
@@ -0,0 +1,48 @@
+import asyncio
+import os
+from fastapi import HTTPException, status
+from app.auth.security import get_password_hash, verify_password
+from app.concurrency import BoundedExecutor, ExecutorOverloaded
+
+# Password hashing pool configuration
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+PASSWORD_HASH_TIMEOUT_SECONDS = float(os.getenv("PASSWORD_HASH_TIMEOUT_SECONDS", "10"))
+
+# bcrypt is CPU-bound, so it runs in worker processes instead of on the event loop
+password_executor = BoundedExecutor(
+    "password-hash",
+    max_workers=PASSWORD_HASH_WORKERS,
+    max_pending=PASSWORD_HASH_MAX_PENDING,
+    kind="process",
+)
+
+
+def _overloaded_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Authentication service is busy, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
+async def hash_password(password: str) -> str:
+    """Hash a password in the worker pool."""
+    try:
+        return await password_executor.run(get_password_hash, password, timeout=PASSWORD_HASH_TIMEOUT_SECONDS)
+    except (ExecutorOverloaded, asyncio.TimeoutError):
+        raise _overloaded_exception()
+
+
+async def check_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password against its hash in the worker pool."""
+    try:
+        return await password_executor.run(
+            verify_password, plain_password, hashed_password, timeout=PASSWORD_HASH_TIMEOUT_SECONDS
+        )
+    except (ExecutorOverloaded, asyncio.TimeoutError):
+        raise _overloaded_exception()
+
+
+def password_pool_stats() -> dict:
+    return password_executor.stats()
@@ -0,0 +1,66 @@
+import os
+import threading
+from typing import Optional
+from sqlalchemy import event
+from app.cache import TTLCache
+from app.models.auth import User
+
+# Decrypted API key cache configuration
+API_KEY_CACHE_TTL_SECONDS = float(os.getenv("API_KEY_CACHE_TTL_SECONDS", "300"))
+API_KEY_CACHE_MAX_SIZE = int(os.getenv("API_KEY_CACHE_MAX_SIZE", "1024"))
+
+
+def _wipe(user_id, secret: bytearray):
+    """Zero the cache's own copy of an evicted key.
+
+    Only this bytearray is overwritten: the str handed to each caller by
+    get_cached_key (and any copies the SDK makes) is immutable and stays in
+    memory until it is garbage collected.
+    """
+    for i in range(len(secret)):
+        secret[i] = 0
+
+
+# Decrypted keys stored as bytearrays, keyed by user_id
+_key_cache = TTLCache(maxsize=API_KEY_CACHE_MAX_SIZE, ttl=API_KEY_CACHE_TTL_SECONDS, on_evict=_wipe)
+
+# Bumped on every purge, for any user; a key read that overlapped a purge is not cached
+_generation = 0
+_generation_lock = threading.Lock()
+
+
+def key_generation() -> int:
+    """Take before reading a key from the database and pass to cache_key."""
+    return _generation
+
+
+def get_cached_key(user_id: int) -> Optional[str]:
+    secret = _key_cache.get(user_id)
+    if secret is None:
+        return None
+    return secret.decode()
+
+
+def cache_key(user_id: int, generation: int, api_key: str):
+    """Cache a decrypted key unless a purge happened since generation was taken."""
+    with _generation_lock:
+        if generation == _generation:
+            _key_cache.set(user_id, bytearray(api_key.encode()))
+
+
+def purge_key(user_id: int):
+    """Invalidate a user's cached key immediately."""
+    global _generation
+    with _generation_lock:
+        _generation += 1
+        _key_cache.pop(user_id)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _purge_on_write(mapper, connection, target):
+    purge_key(target.id)
+
+
+def key_cache_stats() -> dict:
+    return _key_cache.stats()
@@ -6,6 +6,9 @@ from cryptography.fernet import Fernet
 from fastapi import HTTPException, status
 import os
 import base64
+import logging
+
+logger = logging.getLogger(__name__)
 
 # Security configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production")
@@ -22,8 +25,12 @@ def get_encryption_key():
     if not key:
         # Generate a key if not provided (for development)
         key = base64.urlsafe_b64encode(os.urandom(32)).decode()
-        print(f"Generated encryption key: {key}")
-        print("Please set ENCRYPTION_KEY environment variable with this key")
+        # Never log the key itself: log lines are queued and may be shipped off the host
+        logger.warning(
+            "No ENCRYPTION_KEY set, generated a temporary key for this process; API keys stored now "
+            "will be unreadable after a restart. Generate one with generate_encryption_key.py and set "
+            "ENCRYPTION_KEY in the environment or .env"
+        )
     return key.encode() if isinstance(key, str) else key
 
 _fernet = None
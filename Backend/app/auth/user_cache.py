@@ -0,0 +1,66 @@
+import os
+from typing import Optional
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from app.cache import TTLCache
+from app.models.auth import User
+
+# Authenticated user cache configuration
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", "2048"))
+
+# Detached User rows keyed by JWT subject (username). They are never handed out
+# directly; callers get a copy merged into their own session
+_user_cache = TTLCache(maxsize=USER_CACHE_MAX_SIZE, ttl=USER_CACHE_TTL_SECONDS)
+
+
+def get_cached_user(db: Session, username: str) -> Optional[User]:
+    """Get the user for a token subject, hitting the database only on a cache miss.
+
+    The result is attached to db, so relationships lazy-load as usual and
+    changes to it never leak into other requests.
+    """
+    user = _user_cache.get(username)
+    if user is None:
+        user = db.query(User).filter(User.username == username).first()
+        if user is None:
+            return None
+        db.expunge(user)
+        _user_cache.set(username, user)
+
+    # load=False copies the cached state into this session without a query
+    return db.merge(user, load=False)
+
+
+async def aget_cached_user(db, username: str) -> Optional[User]:
+    """AsyncSession variant of get_cached_user, sharing the same cache."""
+    user = _user_cache.get(username)
+    if user is None:
+        user = await db.scalar(select(User).where(User.username == username))
+        if user is None:
+            return None
+        db.expunge(user)
+        _user_cache.set(username, user)
+
+    return await db.merge(user, load=False)
+
+
+def invalidate_user(username: str):
+    """Drop a cached user. Call whenever the user row is modified."""
+    _user_cache.pop(username)
+
+
+def invalidate_user_id(user_id: int):
+    """Drop a cached user by primary key."""
+    _user_cache.pop_where(lambda username, user: user.id == user_id)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_on_write(mapper, connection, target):
+    """Evict users whenever their row is flushed (key updates, deactivation, password changes)."""
+    invalidate_user_id(target.id)
+
+
+def user_cache_stats() -> dict:
+    return _user_cache.stats()
@@ -0,0 +1,101 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class TTLCache:
+    """Thread-safe bounded LRU cache with an optional per-entry time-to-live."""
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: Optional[float] = None,
+        on_evict: Optional[Callable[[Hashable, Any], None]] = None,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._on_evict = on_evict
+        self._data: "OrderedDict[Hashable, tuple[Any, Optional[float]]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _evict(self, key: Hashable, value: Any):
+        self.evictions += 1
+        if self._on_evict:
+            self._on_evict(key, value)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for key, or default if missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self._evict(key, value)
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store a value, evicting the least recently used entries past maxsize."""
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None and previous[0] is not value:
+                self._evict(key, previous[0])
+            self._data[key] = (value, expires_at)
+            while len(self._data) > self.maxsize:
+                old_key, (old_value, _) = self._data.popitem(last=False)
+                self._evict(old_key, old_value)
+
+    def pop(self, key: Hashable) -> bool:
+        """Remove an entry. Returns True if something was removed."""
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is None:
+                return False
+            self._evict(key, entry[0])
+            return True
+
+    def pop_where(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """Remove every entry for which predicate(key, value) is true. Returns the number removed."""
+        with self._lock:
+            keys = [key for key, (value, _) in self._data.items() if predicate(key, value)]
+            for key in keys:
+                value, _ = self._data.pop(key)
+                self._evict(key, value)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            while self._data:
+                key, (value, _) = self._data.popitem(last=False)
+                self._evict(key, value)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        """Return hit/miss counters for monitoring."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
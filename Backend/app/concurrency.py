@@ -0,0 +1,122 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Optional
+
+
+class ExecutorOverloaded(Exception):
+    """Raised when a bounded executor has no free worker or queue slot."""
+
+
+class BoundedExecutor:
+    """Thread or process pool with admission control and queue-depth counters.
+
+    At most max_workers tasks run at once and at most max_pending more wait in
+    the queue; anything beyond that is rejected with ExecutorOverloaded so the
+    caller can shed load instead of piling up work.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_pending: int = 0, kind: str = "thread"):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind: {kind}")
+        self.name = name
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.kind = kind
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._active = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+        return self._executor
+
+    def _on_done(self, future: Future):
+        with self._lock:
+            self._active -= 1
+            if future.cancelled() or future.exception() is not None:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Submit work, raising ExecutorOverloaded if the pool and queue are full."""
+        with self._lock:
+            if self._active >= self.max_workers + self.max_pending:
+                self.rejected += 1
+                raise ExecutorOverloaded(f"{self.name} executor is at capacity")
+            executor = self._get_executor()
+            self._active += 1
+            self.submitted += 1
+
+        try:
+            if self.kind == "thread":
+                # Keep request-scoped context (e.g. correlation ids) inside worker threads
+                ctx = contextvars.copy_context()
+                future = executor.submit(ctx.run, fn, *args, **kwargs)
+            else:
+                future = executor.submit(fn, *args, **kwargs)
+        except Exception:
+            with self._lock:
+                self._active -= 1
+                self.failed += 1
+            raise
+        future.add_done_callback(self._on_done)
+        return future
+
+    def call(self, fn: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """Run fn on the pool and block the calling thread for its result."""
+        future = self.submit(fn, *args, **kwargs)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            with self._lock:
+                self.timeouts += 1
+            raise
+
+    async def run(self, fn: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """Run fn on the pool without blocking the event loop."""
+        future = self.submit(fn, *args, **kwargs)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            raise
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self._active - self.max_workers)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "in_flight": min(self._active, self.max_workers),
+                "queue_depth": max(0, self._active - self.max_workers),
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+            }
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
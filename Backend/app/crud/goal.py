@@ -1,8 +1,266 @@
+import base64
+import binascii
+import json
+import os
+import time
+from datetime import datetime
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import Optional, List
-from app.models.goal import Goal
+from sqlalchemy import func, literal, tuple_, String
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from typing import Optional, List, Iterable, Tuple
+from app.cache import TTLCache
+from app.models.goal import Goal, GoalStatus, GoalPriority, UserGoalStats, normalize_category
 from app.schemas.goal import GoalCreate, GoalUpdate
+from app.search import apply_goal_search, attach_snippets
+
+# Serve /api/goals/stats from user_goal_stats instead of aggregating the goals
+# table. The stats table is maintained either way, so this can be toggled freely.
+GOAL_STATS_MATERIALIZED = os.getenv("GOAL_STATS_MATERIALIZED", "true").lower() == "true"
+
+# Facet counts per user; dropped on goal writes in this process, so other
+# worker processes may serve counts up to the TTL old
+GOAL_FACETS_CACHE_TTL_SECONDS = float(os.getenv("GOAL_FACETS_CACHE_TTL_SECONDS", "60"))
+GOAL_FACETS_CACHE_MAX_SIZE = int(os.getenv("GOAL_FACETS_CACHE_MAX_SIZE", "2048"))
+
+# Goal updates and deletes re-read the goal this many times when a concurrent
+# write keeps changing its status, priority or category, then give up with a 409
+GOAL_WRITE_ATTEMPTS = int(os.getenv("GOAL_WRITE_ATTEMPTS", "3"))
+
+_UPSERT_INSERTS = {"sqlite": sqlite_insert, "postgresql": postgresql_insert}
+
+_facets_cache = TTLCache(maxsize=GOAL_FACETS_CACHE_MAX_SIZE, ttl=GOAL_FACETS_CACHE_TTL_SECONDS)
+# Monotonic time of each user's last goal write, so a facet read that overlapped
+# a write is not cached; kept longer than any aggregate query takes
+_facets_written_at = TTLCache(maxsize=GOAL_FACETS_CACHE_MAX_SIZE * 4, ttl=GOAL_FACETS_CACHE_TTL_SECONDS)
+
+# (category_key, category, status, priority, count) rows, grouped by FACET_GROUP_BY;
+# the category label is the alphabetically smallest spelling stored for each key
+FACET_COLUMNS = (Goal.category_key, func.min(Goal.category), Goal.status, Goal.priority, func.count(Goal.id))
+FACET_GROUP_BY = (Goal.category_key, Goal.status, Goal.priority)
+
+
+def _stat_value(value) -> str:
+    return getattr(value, "value", value) or ""
+
+
+def goal_stats_key(goal: Goal) -> Tuple[str, str, str]:
+    """The (status, priority, category_key) user_goal_stats row a goal is counted in."""
+    return _stat_value(goal.status), _stat_value(goal.priority), normalize_category(goal.category)
+
+
+def adjust_goal_stats(db: Session, user_id: int, key: Tuple[str, str, str], delta: int):
+    """Add delta to a user's goal count for one (status, priority, category) key.
+
+    Runs in the caller's transaction, as a single upsert where the dialect supports it.
+    """
+    status, priority, category = key
+    insert = _UPSERT_INSERTS.get(db.get_bind().dialect.name)
+    if insert is not None:
+        stmt = insert(UserGoalStats).values(
+            user_id=user_id, status=status, priority=priority, category=category, goal_count=delta
+        )
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["user_id", "status", "priority", "category"],
+            set_={"goal_count": UserGoalStats.goal_count + delta},
+        ))
+        return
+
+    updated = db.query(UserGoalStats).filter(
+        UserGoalStats.user_id == user_id,
+        UserGoalStats.status == status,
+        UserGoalStats.priority == priority,
+        UserGoalStats.category == category,
+    ).update({UserGoalStats.goal_count: UserGoalStats.goal_count + delta}, synchronize_session=False)
+    if not updated:
+        db.add(UserGoalStats(
+            user_id=user_id, status=status, priority=priority, category=category, goal_count=delta
+        ))
+        db.flush()
+
+
+class GoalWriteConflictError(RuntimeError):
+    """Raised when a goal kept changing concurrently for GOAL_WRITE_ATTEMPTS reads."""
+
+
+def _read_goal_for_write(db: Session, goal_id: int, user_id: int) -> Optional[Goal]:
+    """Read a goal that is about to change, discarding any stale copy in the session.
+
+    On Postgres the row stays locked until commit. SQLite has no row locks,
+    so callers confirm the stats key with _current_stats_key instead.
+    """
+    query = db.query(Goal).filter(Goal.id == goal_id, Goal.user_id == user_id).populate_existing()
+    if db.get_bind().dialect.name == "postgresql":
+        query = query.with_for_update()
+    return query.first()
+
+
+def _current_stats_key(db: Session, goal_id: int) -> Optional[Tuple[str, str, str]]:
+    """The stats key stored for a goal right now, ignoring unflushed changes in the session.
+
+    Call it after a stats write: from then on the transaction holds SQLite's
+    write lock, so the key read here cannot change before commit.
+    """
+    with db.no_autoflush:
+        row = db.query(Goal.status, Goal.priority, Goal.category_key).filter(Goal.id == goal_id).first()
+    if row is None:
+        return None
+    status, priority, category_key = row
+    return _stat_value(status), _stat_value(priority), category_key
+
+
+def move_goal_stats(db: Session, user_id: int, old_key: Tuple[str, str, str], new_key: Tuple[str, str, str]):
+    """Move one goal between user_goal_stats keys after its status, priority or category changed."""
+    if old_key == new_key:
+        return
+    adjust_goal_stats(db, user_id, old_key, -1)
+    adjust_goal_stats(db, user_id, new_key, 1)
+
+
+def summarize_goal_stats(rows: Iterable[Tuple[object, object, str, int]]) -> dict:
+    """Build the stats payload from (status, priority, category_key, count) rows."""
+    by_status = {status.value: 0 for status in GoalStatus}
+    by_priority = {priority.value: 0 for priority in GoalPriority}
+    by_category = {}
+    for status, priority, category, count in rows:
+        if not count:
+            continue
+        status, priority = _stat_value(status), _stat_value(priority)
+        by_status[status] = by_status.get(status, 0) + count
+        by_priority[priority] = by_priority.get(priority, 0) + count
+        by_category[category] = by_category.get(category, 0) + count
+
+    return {
+        "total_goals": sum(by_status.values()),
+        "completed_goals": by_status[GoalStatus.completed.value],
+        "in_progress_goals": by_status[GoalStatus.in_progress.value],
+        "overdue_goals": by_status[GoalStatus.overdue.value],
+        "by_status": by_status,
+        "by_priority": by_priority,
+        "by_category": by_category,
+    }
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a goal listing cursor cannot be decoded."""
+
+
+def encode_goal_cursor(goal: Goal) -> str:
+    """Opaque cursor pointing just after goal in the (updated_at desc, id desc) listing order."""
+    payload = json.dumps([goal.updated_at.isoformat(), goal.id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_goal_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor from encode_goal_cursor into its (updated_at, id) key."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        updated_at, goal_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(updated_at), int(goal_id)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as e:
+        raise InvalidCursorError("Invalid cursor") from e
+
+
+def _updated_at_param(db: Session, value: datetime):
+    """Bind a cursor timestamp so it compares equal to the stored updated_at.
+
+    SQLite stores server-side timestamps as CURRENT_TIMESTAMP text, without
+    the microseconds a bound DateTime would be rendered with.
+    """
+    if db.get_bind().dialect.name != "sqlite":
+        return value
+    text = value.strftime("%Y-%m-%d %H:%M:%S")
+    if value.microsecond:
+        text += f".{value.microsecond:06d}"
+    return literal(text, String)
+
+
+def filter_goals(query, category=None, status=None, priority=None, search=None, cursor=None, category_prefix=None):
+    """Apply the goal listing filters to a Query or Select.
+
+    category matches exactly and category_prefix by prefix, both ignoring
+    case and extra whitespace (see normalize_category).
+
+    Returns (query, ranking): ranking is None for the plain recency listing,
+    or (order_by, snippet) when full-text search results should be ranked.
+    """
+    if category:
+        query = query.filter(Goal.category_key == normalize_category(category))
+    if category_prefix:
+        query = query.filter(Goal.category_key.startswith(normalize_category(category_prefix), autoescape=True))
+    if status:
+        query = query.filter(Goal.status == status)
+    if priority:
+        query = query.filter(Goal.priority == priority)
+    if not search:
+        return query, None
+
+    if cursor:
+        raise InvalidCursorError("Cursor pagination is not available for search results")
+    query, order_by, snippet = apply_goal_search(query, search)
+    if order_by is None:
+        return query, None
+    return query, (order_by, snippet)
+
+
+def order_goals(db: Session, query, cursor: Optional[str], ranking=None):
+    """Order a goal Query or Select for listing, seeking past cursor if given.
+
+    Ranked search results come best match first and carry their snippet as
+    a second column (see attach_snippets).
+    """
+    if ranking is not None:
+        order_by, snippet = ranking
+        return query.add_columns(snippet).order_by(*order_by, Goal.updated_at.desc(), Goal.id.desc())
+    if cursor:
+        updated_at, goal_id = decode_goal_cursor(cursor)
+        query = query.filter(
+            tuple_(Goal.updated_at, Goal.id) < tuple_(_updated_at_param(db, updated_at), goal_id)
+        )
+    return query.order_by(Goal.updated_at.desc(), Goal.id.desc())
+
+
+def page_goals(rows: list, limit: int, ranking=None, search: Optional[str] = None) -> Tuple[List[Goal], Optional[str]]:
+    """Trim a limit + 1 row fetch to one page and build the cursor for the next one.
+
+    Search results are paged by offset only, so they never get a cursor.
+    """
+    goals = attach_snippets(rows) if ranking is not None else rows
+    if len(goals) <= limit:
+        return goals, None
+    goals = goals[:limit]
+    return goals, None if search else encode_goal_cursor(goals[-1])
+
+
+def summarize_goal_facets(rows: Iterable[Tuple[str, str, object, object, int]]) -> dict:
+    """Build the facets payload from (category_key, category, status, priority, count) rows."""
+    categories = {}
+    status_counts = {status.value: 0 for status in GoalStatus}
+    priority_counts = {priority.value: 0 for priority in GoalPriority}
+    for category_key, category, status, priority, count in rows:
+        facet = categories.setdefault(category_key, {"key": category_key, "label": category, "count": 0})
+        facet["count"] += count
+        facet["label"] = min(facet["label"], category)
+        status, priority = _stat_value(status), _stat_value(priority)
+        status_counts[status] = status_counts.get(status, 0) + count
+        priority_counts[priority] = priority_counts.get(priority, 0) + count
+
+    return {
+        "total": sum(status_counts.values()),
+        "categories": sorted(categories.values(), key=lambda facet: (-facet["count"], facet["key"])),
+        "status": status_counts,
+        "priority": priority_counts,
+    }
+
+
+def invalidate_goal_facets(user_id: int):
+    """Drop a user's cached facet counts. Call after any goal write."""
+    _facets_written_at.set(user_id, time.monotonic())
+    _facets_cache.pop(user_id)
+
+
+def goal_facets_cache_stats() -> dict:
+    return _facets_cache.stats()
 
 
 def create_goal(db: Session, goal: GoalCreate, user_id: int) -> Goal:
@@ -11,7 +269,10 @@ def create_goal(db: Session, goal: GoalCreate, user_id: int) -> Goal:
     goal_data['user_id'] = user_id
     db_goal = Goal(**goal_data)
     db.add(db_goal)
+    db.flush()
+    adjust_goal_stats(db, user_id, goal_stats_key(db_goal), 1)
     db.commit()
+    invalidate_goal_facets(user_id)
     db.refresh(db_goal)
     return db_goal
 
@@ -29,71 +290,111 @@ def get_goals(
     category: Optional[str] = None,
     status: Optional[str] = None,
     priority: Optional[str] = None,
-    search: Optional[str] = None
-) -> tuple[List[Goal], int]:
-    """Get goals for a specific user with optional filtering and pagination."""
-    query = db.query(Goal).filter(Goal.user_id == user_id)
-    
-    # Apply filters
-    if category:
-        query = query.filter(Goal.category.ilike(f"%{category}%"))
-    if status:
-        query = query.filter(Goal.status == status)
-    if priority:
-        query = query.filter(Goal.priority == priority)
-    if search:
-        query = query.filter(
-            Goal.title.ilike(f"%{search}%") | 
-            Goal.description.ilike(f"%{search}%")
-        )
+    search: Optional[str] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    category_prefix: Optional[str] = None
+) -> tuple[List[Goal], Optional[int], Optional[str]]:
+    """Get goals for a specific user with optional filtering and pagination.
+
+    With a cursor (from a previous page's next_cursor) the listing seeks on
+    the (user_id, updated_at, id) index instead of skipping rows, so skip is
+    ignored. Searches use the full-text index where available and return the
+    best matches first, each with a highlighted search_snippet.
+    Returns (goals, total, next_cursor); total is None unless include_total,
+    and next_cursor is None on the last page and for searches.
+    """
+    query, ranking = filter_goals(
+        db.query(Goal).filter(Goal.user_id == user_id),
+        category=category, status=status, priority=priority, search=search, cursor=cursor,
+        category_prefix=category_prefix
+    )
     
-    # Get total count before pagination
-    total = query.count()
+    # Count before pagination, only when asked for
+    total = query.count() if include_total else None
     
-    # Apply pagination and ordering
-    goals = query.order_by(Goal.updated_at.desc()).offset(skip).limit(limit).all()
+    query = order_goals(db, query, cursor, ranking)
+    if not cursor:
+        query = query.offset(skip)
+    goals, next_cursor = page_goals(query.limit(limit + 1).all(), limit, ranking, search)
     
-    return goals, total
+    return goals, total, next_cursor
 
 
 def update_goal(db: Session, goal_id: int, user_id: int, goal_update: GoalUpdate) -> Optional[Goal]:
-    """Update a goal for a specific user."""
-    db_goal = db.query(Goal).filter(Goal.id == goal_id, Goal.user_id == user_id).first()
-    if not db_goal:
-        return None
-    
+    """Update a goal for a specific user.
+
+    Raises GoalWriteConflictError if concurrent writes kept moving the goal
+    between stats keys.
+    """
     update_data = goal_update.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(db_goal, field, value)
-    
-    db.commit()
-    db.refresh(db_goal)
-    return db_goal
+    for _ in range(GOAL_WRITE_ATTEMPTS):
+        db_goal = _read_goal_for_write(db, goal_id, user_id)
+        if not db_goal:
+            return None
+        
+        old_key = goal_stats_key(db_goal)
+        for field, value in update_data.items():
+            setattr(db_goal, field, value)
+        new_key = goal_stats_key(db_goal)
+        
+        # Unchanged key columns are left out of the UPDATE, so only a move needs the key confirmed
+        move_goal_stats(db, user_id, old_key, new_key)
+        if old_key == new_key or _current_stats_key(db, goal_id) == old_key:
+            db.commit()
+            invalidate_goal_facets(user_id)
+            db.refresh(db_goal)
+            return db_goal
+        move_goal_stats(db, user_id, new_key, old_key)
+    raise GoalWriteConflictError("Goal was modified concurrently, please retry")
 
 
 def delete_goal(db: Session, goal_id: int, user_id: int) -> bool:
-    """Delete a goal for a specific user."""
-    db_goal = db.query(Goal).filter(Goal.id == goal_id, Goal.user_id == user_id).first()
-    if not db_goal:
-        return False
-    
-    db.delete(db_goal)
-    db.commit()
-    return True
+    """Delete a goal for a specific user.
+
+    Raises GoalWriteConflictError if concurrent writes kept moving the goal
+    between stats keys.
+    """
+    for _ in range(GOAL_WRITE_ATTEMPTS):
+        db_goal = _read_goal_for_write(db, goal_id, user_id)
+        if not db_goal:
+            return False
+        
+        key = goal_stats_key(db_goal)
+        adjust_goal_stats(db, user_id, key, -1)
+        if _current_stats_key(db, goal_id) == key:
+            db.delete(db_goal)
+            db.commit()
+            invalidate_goal_facets(user_id)
+            return True
+        adjust_goal_stats(db, user_id, key, 1)
+    raise GoalWriteConflictError("Goal was modified concurrently, please retry")
 
 
 def get_goal_stats(db: Session, user_id: int) -> dict:
-    """Get goal statistics for a specific user."""
-    user_goals = db.query(Goal).filter(Goal.user_id == user_id)
-    
-    total_goals = user_goals.count()
-    completed_goals = user_goals.filter(Goal.status == "completed").count()
-    in_progress_goals = user_goals.filter(Goal.status == "in-progress").count()
-    overdue_goals = user_goals.filter(Goal.status == "overdue").count()
-    
-    return {
-        "total_goals": total_goals,
-        "completed_goals": completed_goals,
-        "in_progress_goals": in_progress_goals,
-        "overdue_goals": overdue_goals,
-    }
+    """Get goal statistics for a specific user, broken down by status, priority and category."""
+    if GOAL_STATS_MATERIALIZED:
+        rows = db.query(
+            UserGoalStats.status, UserGoalStats.priority, UserGoalStats.category, UserGoalStats.goal_count
+        ).filter(UserGoalStats.user_id == user_id, UserGoalStats.goal_count > 0).all()
+    else:
+        rows = db.query(
+            Goal.status, Goal.priority, Goal.category_key, func.count(Goal.id)
+        ).filter(Goal.user_id == user_id).group_by(Goal.status, Goal.priority, Goal.category_key).all()
+    return summarize_goal_stats(rows)
+
+
+def get_goal_facets(db: Session, user_id: int) -> dict:
+    """Goal counts per category, status and priority for a user, from one aggregate over the category index."""
+    facets = _facets_cache.get(user_id)
+    if facets is not None:
+        return facets
+
+    started = time.monotonic()
+    rows = db.query(*FACET_COLUMNS).filter(Goal.user_id == user_id).group_by(*FACET_GROUP_BY).all()
+    facets = summarize_goal_facets(rows)
+    # A write that landed while the aggregate ran may not be in it
+    written_at = _facets_written_at.get(user_id)
+    if written_at is None or written_at < started:
+        _facets_cache.set(user_id, facets)
+    return facets
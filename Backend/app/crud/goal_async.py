@@ -0,0 +1,85 @@
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional, List
+from app.models.goal import Goal, UserGoalStats
+from app.schemas.goal import GoalCreate, GoalUpdate
+from app.crud import goal as goal_crud
+from app.crud.goal import (
+    GOAL_STATS_MATERIALIZED, summarize_goal_stats, filter_goals, order_goals, page_goals
+)
+
+# AsyncSession counterparts of app.crud.goal for routers on get_async_db. Reads
+# are issued as async statements; writes run the sync implementations through
+# AsyncSession.run_sync, so the stats upserts, category_key and conflict
+# retries stay identical on both paths.
+
+
+async def create_goal(db: AsyncSession, goal: GoalCreate, user_id: int) -> Goal:
+    """Create a new goal for a specific user."""
+    return await db.run_sync(goal_crud.create_goal, goal, user_id)
+
+
+async def get_goal(db: AsyncSession, goal_id: int, user_id: int) -> Optional[Goal]:
+    """Get a goal by ID for a specific user."""
+    return await db.scalar(select(Goal).where(Goal.id == goal_id, Goal.user_id == user_id))
+
+
+async def get_goals(
+    db: AsyncSession,
+    user_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    category: Optional[str] = None,
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    search: Optional[str] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    category_prefix: Optional[str] = None
+) -> tuple[List[Goal], Optional[int], Optional[str]]:
+    """Get goals for a specific user with optional filtering and pagination (see crud.goal.get_goals)."""
+    query, ranking = filter_goals(
+        select(Goal).where(Goal.user_id == user_id),
+        category=category, status=status, priority=priority, search=search, cursor=cursor,
+        category_prefix=category_prefix
+    )
+
+    # Count before pagination, only when asked for
+    total = await db.scalar(select(func.count()).select_from(query.subquery())) if include_total else None
+
+    query = order_goals(db, query, cursor, ranking)
+    if not cursor:
+        query = query.offset(skip)
+    result = await db.execute(query.limit(limit + 1))
+    rows = list(result.all()) if ranking is not None else list(result.scalars().all())
+    goals, next_cursor = page_goals(rows, limit, ranking, search)
+    return goals, total, next_cursor
+
+
+async def update_goal(db: AsyncSession, goal_id: int, user_id: int, goal_update: GoalUpdate) -> Optional[Goal]:
+    """Update a goal for a specific user (see crud.goal.update_goal)."""
+    return await db.run_sync(goal_crud.update_goal, goal_id, user_id, goal_update)
+
+
+async def delete_goal(db: AsyncSession, goal_id: int, user_id: int) -> bool:
+    """Delete a goal for a specific user (see crud.goal.delete_goal)."""
+    return await db.run_sync(goal_crud.delete_goal, goal_id, user_id)
+
+
+async def get_goal_stats(db: AsyncSession, user_id: int) -> dict:
+    """Get goal statistics for a specific user (see crud.goal.get_goal_stats)."""
+    if GOAL_STATS_MATERIALIZED:
+        query = select(
+            UserGoalStats.status, UserGoalStats.priority, UserGoalStats.category, UserGoalStats.goal_count
+        ).where(UserGoalStats.user_id == user_id, UserGoalStats.goal_count > 0)
+    else:
+        query = select(
+            Goal.status, Goal.priority, Goal.category_key, func.count(Goal.id)
+        ).where(Goal.user_id == user_id).group_by(Goal.status, Goal.priority, Goal.category_key)
+    result = await db.execute(query)
+    return summarize_goal_stats(result.all())
+
+
+async def get_goal_facets(db: AsyncSession, user_id: int) -> dict:
+    """Goal counts per category, status and priority for a user, through the shared facet cache."""
+    return await db.run_sync(goal_crud.get_goal_facets, user_id)
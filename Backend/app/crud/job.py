@@ -0,0 +1,96 @@
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.orm import Session
+from typing import Optional
+from app.models.job import GenerationJob, JobStatus
+
+
+def create_job(db: Session, user_id: int, goal_id: int, kind: str = "roadmap", params: Optional[dict] = None) -> GenerationJob:
+    """Create a queued job."""
+    db_job = GenerationJob(
+        id=uuid.uuid4().hex,
+        kind=kind,
+        status=JobStatus.queued,
+        user_id=user_id,
+        goal_id=goal_id,
+        params=json.dumps(params or {}),
+    )
+    db.add(db_job)
+    db.commit()
+    db.refresh(db_job)
+    return db_job
+
+
+def get_job(db: Session, job_id: str, user_id: int) -> Optional[GenerationJob]:
+    """Get a job by ID for a specific user."""
+    return db.query(GenerationJob).filter(
+        GenerationJob.id == job_id,
+        GenerationJob.user_id == user_id
+    ).first()
+
+
+def claim_next_job(db: Session) -> Optional[GenerationJob]:
+    """Atomically move the oldest queued job to running and return it.
+
+    The conditional UPDATE makes the claim safe when several worker threads
+    or processes poll the same table.
+    """
+    while True:
+        candidate = db.query(GenerationJob.id).filter(
+            GenerationJob.status == JobStatus.queued
+        ).order_by(GenerationJob.created_at, GenerationJob.id).first()
+        if candidate is None:
+            return None
+
+        claimed = db.query(GenerationJob).filter(
+            GenerationJob.id == candidate.id,
+            GenerationJob.status == JobStatus.queued
+        ).update({
+            GenerationJob.status: JobStatus.running,
+            GenerationJob.started_at: datetime.now(timezone.utc),
+            GenerationJob.attempts: GenerationJob.attempts + 1,
+        }, synchronize_session=False)
+        db.commit()
+        if claimed:
+            return db.query(GenerationJob).filter(GenerationJob.id == candidate.id).first()
+
+
+def finish_job(db: Session, job: GenerationJob, roadmap_id: Optional[int] = None, error: Optional[str] = None):
+    """Mark a running job done (with its roadmap) or failed (with an error)."""
+    job.status = JobStatus.failed if error else JobStatus.done
+    job.roadmap_id = roadmap_id
+    job.error = error
+    job.finished_at = datetime.now(timezone.utc)
+    db.commit()
+
+
+def requeue_job(db: Session, job: GenerationJob):
+    """Put a running job back in the queue."""
+    job.status = JobStatus.queued
+    job.started_at = None
+    db.commit()
+
+
+def requeue_stale_jobs(db: Session, stale_after_seconds: float, max_attempts: int) -> int:
+    """Requeue running jobs abandoned by a crashed or restarted worker.
+
+    Jobs already claimed max_attempts times are failed instead, so a job that
+    keeps killing its worker does not cycle forever. Returns the number requeued.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=stale_after_seconds)
+    stale = db.query(GenerationJob).filter(
+        GenerationJob.status == JobStatus.running,
+        GenerationJob.started_at < cutoff
+    )
+    stale.filter(GenerationJob.attempts >= max_attempts).update({
+        GenerationJob.status: JobStatus.failed,
+        GenerationJob.error: "Job was abandoned by its worker too many times",
+        GenerationJob.finished_at: datetime.now(timezone.utc),
+    }, synchronize_session=False)
+    count = stale.filter(GenerationJob.attempts < max_attempts).update({
+        GenerationJob.status: JobStatus.queued,
+        GenerationJob.started_at: None,
+    }, synchronize_session=False)
+    db.commit()
+    return count
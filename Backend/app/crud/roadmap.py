@@ -1,11 +1,37 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from sqlalchemy.exc import IntegrityError
-from typing import Optional, List
+from sqlalchemy.sql import func, case
+from typing import Optional, List, Dict
 from app.models.roadmap import Roadmap, RoadmapStep
 from app.models.goal import Goal
 from app.schemas.roadmap import RoadmapCreate, RoadmapUpdate, RoadmapStepCreate, RoadmapStepUpdate
 
 
+def adjust_step_counters(db: Session, roadmap_id: int, total_delta: int = 0, completed_delta: int = 0):
+    """Shift a roadmap's step counters in SQL, without loading the roadmap or its steps.
+
+    Runs in the caller's transaction, so it commits together with the step change.
+    """
+    if not total_delta and not completed_delta:
+        return
+    db.query(Roadmap).filter(Roadmap.id == roadmap_id).update(
+        {
+            Roadmap.total_steps: Roadmap.total_steps + total_delta,
+            Roadmap.completed_steps: Roadmap.completed_steps + completed_delta,
+        },
+        synchronize_session=False,
+    )
+
+
+def step_counter_values(db: Session, roadmap_id: int) -> dict:
+    """Step counters for a roadmap computed in one aggregate query."""
+    total, completed = db.query(
+        func.count(RoadmapStep.id),
+        func.coalesce(func.sum(case((RoadmapStep.is_completed.is_(True), 1), else_=0)), 0),
+    ).filter(RoadmapStep.roadmap_id == roadmap_id).one()
+    return {Roadmap.total_steps: total, Roadmap.completed_steps: completed}
+
+
 class RoadmapCRUD:
     """CRUD operations for roadmaps with proper error handling and validation."""
     
@@ -26,6 +52,8 @@ class RoadmapCRUD:
             # Create roadmap
             roadmap_data = roadmap.model_dump(exclude={"steps"})
             roadmap_data['goal_id'] = goal_id
+            roadmap_data['total_steps'] = len(roadmap.steps or [])
+            roadmap_data['completed_steps'] = sum(1 for step in roadmap.steps or [] if step.is_completed)
             db_roadmap = Roadmap(**roadmap_data)
             db.add(db_roadmap)
             db.flush()  # Get the ID without committing
@@ -40,20 +68,113 @@ class RoadmapCRUD:
                     db.add(db_step)
             
             db.commit()
-            db.refresh(db_roadmap)
-            return db_roadmap
+            return RoadmapCRUD.get_roadmap(db, db_roadmap.id, user_id)
             
         except IntegrityError:
             db.rollback()
             return None
     
+    @staticmethod
+    def create_roadmaps(db: Session, roadmaps: Dict[int, RoadmapCreate], user_id: int) -> Dict[int, Optional[int]]:
+        """Create roadmaps for several goals in a single transaction.
+
+        roadmaps maps goal_id to its RoadmapCreate. Returns goal_id -> new
+        roadmap ID, with None for goals that are missing, not owned by the user
+        or already have a roadmap.
+        """
+        goal_ids = list(roadmaps)
+        owned = {
+            goal_id for (goal_id,) in db.query(Goal.id).filter(
+                Goal.id.in_(goal_ids), Goal.user_id == user_id
+            )
+        }
+        existing = {
+            goal_id for (goal_id,) in db.query(Roadmap.goal_id).filter(
+                Roadmap.goal_id.in_(goal_ids)
+            )
+        }
+        results: Dict[int, Optional[int]] = {goal_id: None for goal_id in goal_ids}
+        to_create = [goal_id for goal_id in goal_ids if goal_id in owned and goal_id not in existing]
+        if not to_create:
+            return results
+
+        try:
+            db_roadmaps = {}
+            for goal_id in to_create:
+                steps = roadmaps[goal_id].steps or []
+                roadmap_data = roadmaps[goal_id].model_dump(exclude={"steps"})
+                roadmap_data['goal_id'] = goal_id
+                roadmap_data['total_steps'] = len(steps)
+                roadmap_data['completed_steps'] = sum(1 for step in steps if step.is_completed)
+                db_roadmaps[goal_id] = Roadmap(**roadmap_data)
+            db.add_all(db_roadmaps.values())
+            db.flush()  # Assign roadmap IDs for the steps
+
+            db_steps = []
+            for goal_id, db_roadmap in db_roadmaps.items():
+                for i, step_data in enumerate(roadmaps[goal_id].steps or []):
+                    step_dict = step_data.model_dump()
+                    step_dict['roadmap_id'] = db_roadmap.id
+                    step_dict['order_index'] = i  # Ensure proper ordering
+                    db_steps.append(RoadmapStep(**step_dict))
+            db.add_all(db_steps)
+
+            roadmap_ids = {goal_id: db_roadmap.id for goal_id, db_roadmap in db_roadmaps.items()}
+            db.commit()
+            results.update(roadmap_ids)
+            return results
+
+        except IntegrityError:
+            db.rollback()
+            return results
+    
+    @staticmethod
+    def replace_incomplete_steps(
+        db: Session, roadmap_id: int, steps: List[RoadmapStepCreate], user_id: int
+    ) -> Optional[Roadmap]:
+        """Replace a roadmap's incomplete steps with new ones in a single transaction.
+
+        Completed steps are kept as they are; the new steps are ordered after the
+        last completed step.
+        """
+        db_roadmap = RoadmapCRUD.get_roadmap(db, roadmap_id, user_id)
+        if not db_roadmap:
+            return None
+
+        try:
+            kept = [step for step in db_roadmap.steps if step.is_completed]
+            last_completed = max(
+                (step.order_index for step in kept if step.order_index is not None), default=None)
+
+            start = 0 if last_completed is None else last_completed + 1
+            db_steps = []
+            for i, step_data in enumerate(steps):
+                step_dict = step_data.model_dump()
+                step_dict['order_index'] = start + i
+                step_dict['is_completed'] = False
+                db_steps.append(RoadmapStep(**step_dict))
+            # Steps dropped from the loaded collection are deleted by its delete-orphan
+            # cascade, which also takes them out of the session's identity map
+            db_roadmap.steps = kept + db_steps
+            db.flush()
+
+            db.query(Roadmap).filter(Roadmap.id == roadmap_id).update(
+                step_counter_values(db, roadmap_id), synchronize_session=False)
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            return None
+
+        # The counter update bypassed the session, so reload the roadmap and its steps
+        return RoadmapCRUD.get_roadmap(db, roadmap_id, user_id)
+
     @staticmethod
     def get_roadmap_by_goal(db: Session, goal_id: int, user_id: int) -> Optional[Roadmap]:
         """Get roadmap by goal ID, ensuring user owns the goal."""
         return db.query(Roadmap).join(Goal).filter(
             Roadmap.goal_id == goal_id,
             Goal.user_id == user_id
-        ).first()
+        ).options(selectinload(Roadmap.steps)).first()
     
     @staticmethod
     def get_roadmap(db: Session, roadmap_id: int, user_id: int) -> Optional[Roadmap]:
@@ -61,7 +182,7 @@ class RoadmapCRUD:
         return db.query(Roadmap).join(Goal).filter(
             Roadmap.id == roadmap_id,
             Goal.user_id == user_id
-        ).first()
+        ).options(selectinload(Roadmap.steps)).populate_existing().first()
     
     @staticmethod
     def update_roadmap(db: Session, roadmap_id: int, roadmap_update: RoadmapUpdate, user_id: int) -> Optional[Roadmap]:
@@ -75,8 +196,7 @@ class RoadmapCRUD:
             setattr(db_roadmap, field, value)
         
         db.commit()
-        db.refresh(db_roadmap)
-        return db_roadmap
+        return RoadmapCRUD.get_roadmap(db, roadmap_id, user_id)
     
     @staticmethod
     def delete_roadmap(db: Session, roadmap_id: int, user_id: int) -> bool:
@@ -93,12 +213,18 @@ class RoadmapCRUD:
 class RoadmapStepCRUD:
     """CRUD operations for roadmap steps."""
     
+    @staticmethod
+    def _owns_roadmap(db: Session, roadmap_id: int, user_id: int) -> bool:
+        return db.query(Roadmap.id).join(Goal).filter(
+            Roadmap.id == roadmap_id,
+            Goal.user_id == user_id
+        ).first() is not None
+    
     @staticmethod
     def create_step(db: Session, step: RoadmapStepCreate, roadmap_id: int, user_id: int) -> Optional[RoadmapStep]:
         """Create a new step for a roadmap."""
         # Verify roadmap exists and user owns it
-        roadmap = RoadmapCRUD.get_roadmap(db, roadmap_id, user_id)
-        if not roadmap:
+        if not RoadmapStepCRUD._owns_roadmap(db, roadmap_id, user_id):
             return None
         
         # Set order_index if not provided
@@ -112,6 +238,7 @@ class RoadmapStepCRUD:
         step_data['roadmap_id'] = roadmap_id
         db_step = RoadmapStep(**step_data)
         db.add(db_step)
+        adjust_step_counters(db, roadmap_id, 1, 1 if db_step.is_completed else 0)
         db.commit()
         db.refresh(db_step)
         return db_step
@@ -127,14 +254,28 @@ class RoadmapStepCRUD:
     @staticmethod
     def get_steps_by_roadmap(db: Session, roadmap_id: int, user_id: int) -> List[RoadmapStep]:
         """Get all steps for a roadmap, ordered by order_index."""
-        roadmap = RoadmapCRUD.get_roadmap(db, roadmap_id, user_id)
-        if not roadmap:
+        if not RoadmapStepCRUD._owns_roadmap(db, roadmap_id, user_id):
             return []
         
         return db.query(RoadmapStep).filter(
             RoadmapStep.roadmap_id == roadmap_id
         ).order_by(RoadmapStep.order_index).all()
     
+    @staticmethod
+    def _set_completed(db: Session, db_step: RoadmapStep, completed: bool) -> bool:
+        """Set a step's completion with a conditional UPDATE, moving the roadmap counter only if it changed.
+
+        The WHERE clause re-checks the row's current value, so concurrent
+        toggles or updates of the same step can never both count.
+        """
+        changed = db.query(RoadmapStep).filter(
+            RoadmapStep.id == db_step.id,
+            RoadmapStep.is_completed == (not completed)
+        ).update({RoadmapStep.is_completed: completed}, synchronize_session=False)
+        if changed == 1:
+            adjust_step_counters(db, db_step.roadmap_id, completed_delta=1 if completed else -1)
+        return changed == 1
+    
     @staticmethod
     def update_step(db: Session, step_id: int, step_update: RoadmapStepUpdate, user_id: int) -> Optional[RoadmapStep]:
         """Update a roadmap step."""
@@ -143,9 +284,12 @@ class RoadmapStepCRUD:
             return None
         
         update_data = step_update.model_dump(exclude_unset=True)
+        completed = update_data.pop("is_completed", None)
         for field, value in update_data.items():
             setattr(db_step, field, value)
         
+        if completed is not None:
+            RoadmapStepCRUD._set_completed(db, db_step, completed)
         db.commit()
         db.refresh(db_step)
         return db_step
@@ -157,9 +301,24 @@ class RoadmapStepCRUD:
         if not db_step:
             return False
         
-        db.delete(db_step)
-        db.commit()
-        return True
+        roadmap_id = db_step.roadmap_id
+        # Delete only while the completion we read is still current, so the counters match the row
+        for _ in range(3):
+            completed = bool(db_step.is_completed)
+            deleted = db.query(RoadmapStep).filter(
+                RoadmapStep.id == step_id,
+                RoadmapStep.is_completed == completed
+            ).delete(synchronize_session=False)
+            if deleted:
+                adjust_step_counters(db, roadmap_id, -1, -1 if completed else 0)
+                db.commit()
+                db.expunge(db_step)
+                return True
+            db.rollback()
+            db_step = RoadmapStepCRUD.get_step(db, step_id, user_id)
+            if not db_step:
+                return False
+        return False
     
     @staticmethod
     def toggle_step_completion(db: Session, step_id: int, user_id: int) -> Optional[RoadmapStep]:
@@ -168,7 +327,8 @@ class RoadmapStepCRUD:
         if not db_step:
             return None
         
-        db_step.is_completed = not db_step.is_completed
+        # If a concurrent toggle got there first, the step already has the value we wanted
+        RoadmapStepCRUD._set_completed(db, db_step, not db_step.is_completed)
         db.commit()
         db.refresh(db_step)
         return db_step
@@ -176,8 +336,7 @@ class RoadmapStepCRUD:
     @staticmethod
     def reorder_steps(db: Session, roadmap_id: int, step_orders: List[dict], user_id: int) -> bool:
         """Reorder steps in a roadmap. step_orders should be [{'id': step_id, 'order_index': new_index}, ...]"""
-        roadmap = RoadmapCRUD.get_roadmap(db, roadmap_id, user_id)
-        if not roadmap:
+        if not RoadmapStepCRUD._owns_roadmap(db, roadmap_id, user_id):
             return False
         
         try:
@@ -0,0 +1,127 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import Optional, List, Dict
+from app.models.roadmap import Roadmap, RoadmapStep
+from app.models.goal import Goal
+from app.crud.roadmap import RoadmapCRUD, RoadmapStepCRUD
+from app.schemas.roadmap import RoadmapCreate, RoadmapUpdate, RoadmapStepCreate, RoadmapStepUpdate
+
+
+class AsyncRoadmapCRUD:
+    """AsyncSession counterpart of RoadmapCRUD.
+
+    Roadmaps are returned with their steps eagerly loaded, since lazy loads
+    are not available under AsyncSession. Writes run the sync implementations
+    through AsyncSession.run_sync, so the step counters are maintained by the
+    same code on both paths.
+    """
+
+    @staticmethod
+    async def create_roadmap(db: AsyncSession, roadmap: RoadmapCreate, goal_id: int, user_id: int) -> Optional[Roadmap]:
+        """Create a new roadmap for a specific goal (see RoadmapCRUD.create_roadmap)."""
+        return await db.run_sync(RoadmapCRUD.create_roadmap, roadmap, goal_id, user_id)
+
+    @staticmethod
+    async def create_roadmaps(db: AsyncSession, roadmaps: Dict[int, RoadmapCreate], user_id: int) -> Dict[int, Optional[int]]:
+        """Create roadmaps for several goals in a single transaction (see RoadmapCRUD.create_roadmaps)."""
+        return await db.run_sync(RoadmapCRUD.create_roadmaps, roadmaps, user_id)
+
+    @staticmethod
+    async def replace_incomplete_steps(
+        db: AsyncSession, roadmap_id: int, steps: List[RoadmapStepCreate], user_id: int
+    ) -> Optional[Roadmap]:
+        """Replace a roadmap's incomplete steps in one transaction (see RoadmapCRUD.replace_incomplete_steps)."""
+        return await db.run_sync(RoadmapCRUD.replace_incomplete_steps, roadmap_id, steps, user_id)
+
+    @staticmethod
+    async def get_roadmap_by_goal(db: AsyncSession, goal_id: int, user_id: int) -> Optional[Roadmap]:
+        """Get roadmap by goal ID, ensuring user owns the goal."""
+        return await db.scalar(
+            select(Roadmap).join(Goal).where(
+                Roadmap.goal_id == goal_id,
+                Goal.user_id == user_id
+            ).options(selectinload(Roadmap.steps))
+        )
+
+    @staticmethod
+    async def get_roadmap(db: AsyncSession, roadmap_id: int, user_id: int) -> Optional[Roadmap]:
+        """Get roadmap by ID, ensuring user owns the associated goal."""
+        return await db.scalar(
+            select(Roadmap).join(Goal).where(
+                Roadmap.id == roadmap_id,
+                Goal.user_id == user_id
+            ).options(selectinload(Roadmap.steps))
+            # Refresh steps already in the identity map after bulk changes
+            .execution_options(populate_existing=True)
+        )
+
+    @staticmethod
+    async def update_roadmap(db: AsyncSession, roadmap_id: int, roadmap_update: RoadmapUpdate, user_id: int) -> Optional[Roadmap]:
+        """Update a roadmap (see RoadmapCRUD.update_roadmap)."""
+        return await db.run_sync(RoadmapCRUD.update_roadmap, roadmap_id, roadmap_update, user_id)
+
+    @staticmethod
+    async def delete_roadmap(db: AsyncSession, roadmap_id: int, user_id: int) -> bool:
+        """Delete a roadmap and all its steps (see RoadmapCRUD.delete_roadmap)."""
+        return await db.run_sync(RoadmapCRUD.delete_roadmap, roadmap_id, user_id)
+
+
+class AsyncRoadmapStepCRUD:
+    """AsyncSession counterpart of RoadmapStepCRUD."""
+
+    @staticmethod
+    async def create_step(db: AsyncSession, step: RoadmapStepCreate, roadmap_id: int, user_id: int) -> Optional[RoadmapStep]:
+        """Create a new step for a roadmap (see RoadmapStepCRUD.create_step)."""
+        return await db.run_sync(RoadmapStepCRUD.create_step, step, roadmap_id, user_id)
+
+    @staticmethod
+    async def get_step(db: AsyncSession, step_id: int, user_id: int) -> Optional[RoadmapStep]:
+        """Get a step by ID, ensuring user owns the associated roadmap."""
+        return await db.scalar(
+            select(RoadmapStep).join(Roadmap).join(Goal).where(
+                RoadmapStep.id == step_id,
+                Goal.user_id == user_id
+            )
+        )
+
+    @staticmethod
+    async def get_steps_by_roadmap(db: AsyncSession, roadmap_id: int, user_id: int) -> List[RoadmapStep]:
+        """Get all steps for a roadmap, ordered by order_index."""
+        owned = await db.scalar(
+            select(Roadmap.id).join(Goal).where(Roadmap.id == roadmap_id, Goal.user_id == user_id)
+        )
+        if owned is None:
+            return []
+
+        result = await db.scalars(
+            select(RoadmapStep).where(
+                RoadmapStep.roadmap_id == roadmap_id
+            ).order_by(RoadmapStep.order_index)
+        )
+        return list(result.all())
+
+    @staticmethod
+    async def update_step(db: AsyncSession, step_id: int, step_update: RoadmapStepUpdate, user_id: int) -> Optional[RoadmapStep]:
+        """Update a roadmap step (see RoadmapStepCRUD.update_step)."""
+        return await db.run_sync(RoadmapStepCRUD.update_step, step_id, step_update, user_id)
+
+    @staticmethod
+    async def delete_step(db: AsyncSession, step_id: int, user_id: int) -> bool:
+        """Delete a roadmap step (see RoadmapStepCRUD.delete_step)."""
+        return await db.run_sync(RoadmapStepCRUD.delete_step, step_id, user_id)
+
+    @staticmethod
+    async def toggle_step_completion(db: AsyncSession, step_id: int, user_id: int) -> Optional[RoadmapStep]:
+        """Toggle the completion status of a step (see RoadmapStepCRUD.toggle_step_completion)."""
+        return await db.run_sync(RoadmapStepCRUD.toggle_step_completion, step_id, user_id)
+
+    @staticmethod
+    async def reorder_steps(db: AsyncSession, roadmap_id: int, step_orders: List[dict], user_id: int) -> bool:
+        """Reorder steps in a roadmap (see RoadmapStepCRUD.reorder_steps)."""
+        return await db.run_sync(RoadmapStepCRUD.reorder_steps, roadmap_id, step_orders, user_id)
+
+
+# Convenience instances
+async_roadmap_crud = AsyncRoadmapCRUD()
+async_roadmap_step_crud = AsyncRoadmapStepCRUD()
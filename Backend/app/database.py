@@ -1,20 +1,187 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
+import threading
+import time
 
 # Database URL - can be easily changed to PostgreSQL later
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./goalforge.db")
 
-# For SQLite, we need to add connect_args
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-else:
-    # For PostgreSQL or other databases
-    engine = create_engine(DATABASE_URL)
+# Engine tuning profile: "auto" picks sqlite_wal or postgres from DATABASE_URL;
+# "basic" keeps driver defaults
+DB_ENGINE_PROFILE = os.getenv("DB_ENGINE_PROFILE", "auto")
+
+# sqlite_wal profile: WAL lets readers proceed during a write, and busy_timeout
+# makes concurrent writers wait instead of failing with "database is locked"
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# Negative values are KiB, so -65536 is a 64 MiB page cache per connection
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))
+
+# postgres profile: connection pool sizing
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+
+def _resolve_profile(url: str) -> str:
+    if DB_ENGINE_PROFILE != "auto":
+        return DB_ENGINE_PROFILE
+    return "sqlite_wal" if url.startswith("sqlite") else "postgres"
+
+
+def _engine_options(url: str, profile: str) -> dict:
+    """create_engine keyword arguments for a profile."""
+    if profile not in ("basic", "sqlite_wal", "postgres"):
+        raise ValueError(f"Unknown DB_ENGINE_PROFILE: {profile}")
+    options = {}
+    if url.startswith("sqlite") and "aiosqlite" not in url:
+        # For SQLite, we need to add connect_args
+        options["connect_args"] = {"check_same_thread": False}
+    if profile == "postgres":
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT_SECONDS,
+            pool_recycle=DB_POOL_RECYCLE_SECONDS,
+            pool_pre_ping=DB_POOL_PRE_PING,
+        )
+    return options
+
+
+def _install_sqlite_pragmas(sync_engine):
+    """Apply the sqlite_wal pragmas to every new DBAPI connection."""
+    @event.listens_for(sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+            cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS:d}")
+            cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE:d}")
+            cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE:d}")
+        finally:
+            cursor.close()
+
+
+class PoolMetrics:
+    """Connection checkout counters collected from pool events."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.checked_out = 0
+        self.peak_checked_out = 0
+        self.total_hold_seconds = 0.0
+        self.max_hold_seconds = 0.0
+
+    def install(self, sync_engine):
+        event.listen(sync_engine, "connect", self._on_connect)
+        event.listen(sync_engine, "checkout", self._on_checkout)
+        event.listen(sync_engine, "checkin", self._on_checkin)
+        event.listen(sync_engine, "invalidate", self._on_invalidate)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["checked_out_at"] = time.monotonic()
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        started = connection_record.info.pop("checked_out_at", None)
+        if started is None:
+            return
+        held = time.monotonic() - started
+        with self._lock:
+            self.checkins += 1
+            self.checked_out -= 1
+            self.total_hold_seconds += held
+            self.max_hold_seconds = max(self.max_hold_seconds, held)
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "invalidations": self.invalidations,
+                "peak_checked_out": self.peak_checked_out,
+                "avg_hold_ms": round(self.total_hold_seconds / self.checkins * 1000, 2) if self.checkins else 0.0,
+                "max_hold_ms": round(self.max_hold_seconds * 1000, 2),
+            }
+
+
+def _configure_engine(sync_engine, profile: str, metrics: PoolMetrics):
+    if profile == "sqlite_wal":
+        _install_sqlite_pragmas(sync_engine)
+    metrics.install(sync_engine)
+
+
+ENGINE_PROFILE = _resolve_profile(DATABASE_URL)
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL, ENGINE_PROFILE))
+pool_metrics = PoolMetrics()
+_configure_engine(engine, ENGINE_PROFILE, pool_metrics)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+# Async driver used for each backend when ASYNC_DATABASE_URL is not set
+_ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg", "postgres": "asyncpg"}
+
+
+def _default_async_url(url: str) -> str:
+    """Map a sync database URL, with or without an explicit +driver, to its async driver."""
+    scheme, sep, rest = url.partition(":")
+    backend = scheme.split("+", 1)[0]
+    driver = _ASYNC_DRIVERS.get(backend)
+    if not sep or driver is None:
+        return url
+    return f"{'postgresql' if backend == 'postgres' else backend}+{driver}:{rest}"
+
+
+# Async engine for routers that opt in to AsyncSession; created on first use so
+# sync-only deployments do not need an async driver installed
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", _default_async_url(DATABASE_URL))
+
+_async_engine = None
+_async_session_factory = None
+async_pool_metrics = PoolMetrics()
+
+
+def get_async_engine():
+    global _async_engine
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import create_async_engine
+        profile = _resolve_profile(ASYNC_DATABASE_URL)
+        _async_engine = create_async_engine(ASYNC_DATABASE_URL, **_engine_options(ASYNC_DATABASE_URL, profile))
+        _configure_engine(_async_engine.sync_engine, profile, async_pool_metrics)
+    return _async_engine
+
+
+def get_async_session_factory():
+    global _async_session_factory
+    if _async_session_factory is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+        # expire_on_commit=False: attributes stay readable after commit without an implicit (sync) reload
+        _async_session_factory = async_sessionmaker(
+            get_async_engine(), autoflush=False, expire_on_commit=False)
+    return _async_session_factory
+
 Base = declarative_base()
 
 # Dependency to get database session
@@ -24,3 +191,31 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# Dependency to get an async database session
+async def get_async_db():
+    async with get_async_session_factory()() as db:
+        yield db
+
+
+async def dispose_async_engine():
+    """Close the async engine's connections, if it was ever created."""
+    global _async_engine, _async_session_factory
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        _async_session_factory = None
+
+
+def pool_stats() -> dict:
+    """Connection pool usage for monitoring."""
+    pool = engine.pool
+    stats = {"profile": ENGINE_PROFILE, "pool_class": type(pool).__name__}
+    for name in ("size", "checkedout", "overflow", "checkedin"):
+        if hasattr(pool, name):
+            stats[name] = getattr(pool, name)()
+    stats.update(pool_metrics.stats())
+    if _async_engine is not None:
+        stats["async"] = async_pool_metrics.stats()
+    return stats
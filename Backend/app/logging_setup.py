@@ -0,0 +1,159 @@
+import contextvars
+import copy
+import hashlib
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+# Logging configuration
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Large payloads (prompts, model output) are truncated to a preview unless sampled
+LOG_PAYLOAD_MAX_CHARS = int(os.getenv("LOG_PAYLOAD_MAX_CHARS", "500"))
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0.01"))
+
+# Correlation id of the request (or background job) being handled by this context
+correlation_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("correlation_id", default=None)
+
+# Attributes every LogRecord has; anything else was passed through extra= and is emitted as a field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener: Optional[QueueListener] = None
+_setup_lock = threading.Lock()
+
+
+class CorrelationIdFilter(logging.Filter):
+    """Stamp records with the current correlation id, in the calling thread before queueing."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.correlation_id = correlation_id.get()
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full.
+
+    Only the message is rendered in the caller; formatting, tracebacks and the
+    stdout write happen on the listener thread.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with extra= fields at the top level."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for name, value in vars(record).items():
+            if name not in _RECORD_ATTRIBUTES:
+                entry[name] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines for local development, with extra= fields appended."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(correlation_id)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = {
+            name: value for name, value in vars(record).items()
+            if name not in _RECORD_ATTRIBUTES and name != "correlation_id"
+        }
+        if fields:
+            line += " " + " ".join(f"{name}={value}" for name, value in fields.items())
+        return line
+
+
+def payload_fields(name: str, text: Optional[str]) -> dict:
+    """Summarize a large payload for extra=: length, short hash and a preview.
+
+    A LOG_PAYLOAD_SAMPLE_RATE fraction of calls log the full text instead.
+    """
+    if text is None:
+        return {name: None}
+    fields = {
+        f"{name}_chars": len(text),
+        f"{name}_sha256": hashlib.sha256(text.encode()).hexdigest()[:16],
+    }
+    if len(text) <= LOG_PAYLOAD_MAX_CHARS or random.random() < LOG_PAYLOAD_SAMPLE_RATE:
+        fields[name] = text
+    else:
+        fields[name] = text[:LOG_PAYLOAD_MAX_CHARS] + "..."
+    return fields
+
+
+def setup_logging():
+    """Route app.* loggers through a bounded queue to a background stdout writer."""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return
+        log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        handler = NonBlockingQueueHandler(log_queue)
+        handler.addFilter(CorrelationIdFilter())
+
+        output = logging.StreamHandler(sys.stdout)
+        output.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+
+        logger = logging.getLogger("app")
+        logger.setLevel(LOG_LEVEL)
+        logger.addHandler(handler)
+        logger.propagate = False
+
+        _listener = QueueListener(log_queue, output, respect_handler_level=True)
+        _listener.start()
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+        logger = logging.getLogger("app")
+        for handler in list(logger.handlers):
+            if isinstance(handler, NonBlockingQueueHandler):
+                logger.removeHandler(handler)
+
+
+def logging_stats() -> dict:
+    handlers = [h for h in logging.getLogger("app").handlers if isinstance(h, NonBlockingQueueHandler)]
+    return {
+        "level": logging.getLevelName(logging.getLogger("app").getEffectiveLevel()),
+        "queue_depth": sum(h.queue.qsize() for h in handlers),
+        "dropped": sum(h.dropped for h in handlers),
+    }
@@ -1,6 +1,18 @@
+import logging
 import os
+import time
+import uuid
 from dotenv import load_dotenv
-from fastapi import FastAPI
+
+# Load environment variables from .env file before app modules read their settings
+load_dotenv()
+
+from app.logging_setup import setup_logging, shutdown_logging, correlation_id
+
+# Start the log writer before other modules log at import time
+setup_logging()
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.upload import upload_router
@@ -9,13 +21,17 @@ from app.api.health import health_router
 from app.api.auth import auth_router
 from app.api.goals import router as goals_router
 from app.api.roadmaps import router as roadmaps_router
-from app.database import Base, engine
+from app.api.jobs import router as jobs_router
+from app.auth.hashing import password_executor
+from app.models.generative import llm_executor
+from app.models.image_store import image_executor
+from app.models.job_queue import job_queue
+from app.database import Base, engine, dispose_async_engine
+from app.migrations import run_migrations
 
-# Load environment variables from .env file
-load_dotenv()
-
-# Create database tables
+# Create database tables, then upgrade tables created by older versions
 Base.metadata.create_all(bind=engine)
+run_migrations(engine)
 
 app = FastAPI(title="GoalForge API", version="1.0.0")
 
@@ -35,10 +51,62 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+logger = logging.getLogger("app.requests")
+
+
+@app.middleware("http")
+async def correlation_id_middleware(request: Request, call_next):
+    """Tag each request with a correlation id (from X-Request-ID when given) and log its outcome."""
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    token = correlation_id.set(request_id)
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = request_id
+        logger.info(
+            "Request handled",
+            extra={
+                "method": request.method,
+                "path": request.url.path,
+                "status": response.status_code,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+            },
+        )
+        return response
+    except Exception:
+        logger.exception("Unhandled error", extra={"method": request.method, "path": request.url.path})
+        raise
+    finally:
+        correlation_id.reset(token)
+
+
 # Include routers for endpoints
 app.include_router(auth_router)
 app.include_router(goals_router)
 app.include_router(roadmaps_router)
+app.include_router(jobs_router)
 app.include_router(upload_router)
 app.include_router(generate_router)
 app.include_router(health_router)  # Optional, for a health check endpoint
+
+
+@app.on_event("startup")
+def start_job_workers():
+    """Start background job workers, picking up jobs left over from a restart."""
+    job_queue.start()
+
+
+@app.on_event("shutdown")
+def shutdown_executors():
+    """Stop worker pools so the server exits cleanly."""
+    job_queue.stop()
+    password_executor.shutdown(wait=False)
+    llm_executor.shutdown(wait=False)
+    image_executor.shutdown(wait=False)
+    shutdown_logging()
+
+
+@app.on_event("shutdown")
+async def close_async_engine():
+    """Close async database connections, if any router used them."""
+    await dispose_async_engine()
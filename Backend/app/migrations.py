@@ -0,0 +1,135 @@
+"""
+Idempotent schema upgrades for databases created before a column or index existed.
+
+Base.metadata.create_all only creates missing tables, so changes to existing
+tables are applied here at startup. Every step checks the live schema first
+and is safe to run on each boot.
+"""
+import logging
+from sqlalchemy import bindparam, delete, func, inspect, insert, select, text, update
+from sqlalchemy.engine import Connection, Engine
+from app.models.goal import Goal, UserGoalStats, normalize_category
+from app.search import install_goal_search
+
+logger = logging.getLogger(__name__)
+
+
+def _columns(conn: Connection, table: str) -> set:
+    return {column["name"] for column in inspect(conn).get_columns(table)}
+
+
+def _add_roadmap_step_counters(conn: Connection):
+    """Add roadmaps.total_steps / completed_steps and backfill them from roadmap_steps."""
+    columns = _columns(conn, "roadmaps")
+    added = False
+    for name in ("total_steps", "completed_steps"):
+        if name not in columns:
+            conn.execute(text(f"ALTER TABLE roadmaps ADD COLUMN {name} INTEGER NOT NULL DEFAULT 0"))
+            added = True
+    if not added:
+        return
+
+    conn.execute(
+        text(
+            """
+            UPDATE roadmaps SET
+                total_steps = (
+                    SELECT COUNT(*) FROM roadmap_steps WHERE roadmap_steps.roadmap_id = roadmaps.id
+                ),
+                completed_steps = (
+                    SELECT COUNT(*) FROM roadmap_steps
+                    WHERE roadmap_steps.roadmap_id = roadmaps.id AND roadmap_steps.is_completed = :completed
+                )
+            """
+        ),
+        {"completed": True},
+    )
+    logger.info("Added and backfilled roadmap step counters")
+
+
+def rebuild_user_goal_stats(conn: Connection) -> int:
+    """Recompute every user_goal_stats row from the goals table. Returns the number of rows written.
+
+    Repairs counts that drifted, e.g. after goals were edited outside the app.
+    Run it while the app is stopped, or through init_db.py --rebuild-goal-stats.
+    """
+    conn.execute(delete(UserGoalStats))
+
+    # Read through the ORM columns so status and priority come back as enum values
+    rows = conn.execute(
+        select(Goal.user_id, Goal.status, Goal.priority, Goal.category_key, func.count(Goal.id))
+        .group_by(Goal.user_id, Goal.status, Goal.priority, Goal.category_key)
+    ).all()
+    if not rows:
+        return 0
+
+    conn.execute(insert(UserGoalStats), [
+        {
+            "user_id": user_id,
+            "status": getattr(status, "value", status) or "",
+            "priority": getattr(priority, "value", priority) or "",
+            "category": category or "",
+            "goal_count": count,
+        }
+        for user_id, status, priority, category, count in rows
+    ])
+    logger.info("Rebuilt user_goal_stats", extra={"rows": len(rows)})
+    return len(rows)
+
+
+def _backfill_user_goal_stats(conn: Connection):
+    """Fill user_goal_stats from the goals already stored.
+
+    Rebuilds when the table is empty, or when it still holds raw category
+    spellings from before the rows were keyed by goals.category_key.
+    """
+    categories = conn.scalars(select(UserGoalStats.category).distinct()).all()
+    if not categories or any(category != normalize_category(category) for category in categories):
+        rebuild_user_goal_stats(conn)
+
+
+def _create_goal_index(conn: Connection, name: str):
+    for index in Goal.__table__.indexes:
+        if index.name == name:
+            index.create(conn, checkfirst=True)
+
+
+def _create_goal_listing_index(conn: Connection):
+    """Create the (user_id, updated_at, id) index behind goal listing pagination."""
+    _create_goal_index(conn, "ix_goals_user_updated_id")
+
+
+def _add_goal_category_key(conn: Connection):
+    """Add goals.category_key, backfill it with normalize_category and index it."""
+    if "category_key" not in _columns(conn, "goals"):
+        conn.execute(text("ALTER TABLE goals ADD COLUMN category_key VARCHAR(50) NOT NULL DEFAULT ''"))
+        rows = conn.execute(select(Goal.id, Goal.category)).all()
+        if rows:
+            goals = Goal.__table__
+            conn.execute(
+                update(goals)
+                .where(goals.c.id == bindparam("goal_id"))
+                # Setting updated_at to itself keeps its onupdate from reordering goal listings
+                .values(category_key=bindparam("key"), updated_at=goals.c.updated_at),
+                [{"goal_id": goal_id, "key": normalize_category(category)} for goal_id, category in rows],
+            )
+        logger.info("Added and backfilled goals.category_key", extra={"rows": len(rows)})
+    _create_goal_index(conn, "ix_goals_user_category_key")
+
+
+# Applied in order; append new steps at the end
+MIGRATIONS = [
+    _add_roadmap_step_counters,
+    _create_goal_listing_index,
+    install_goal_search,
+    _add_goal_category_key,
+    # After _add_goal_category_key, which the stats rows are keyed by
+    _backfill_user_goal_stats,
+]
+
+
+def run_migrations(engine: Engine):
+    """Apply every migration step in one transaction."""
+    with engine.begin() as conn:
+        for migration in MIGRATIONS:
+            migration(conn)
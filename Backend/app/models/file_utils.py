@@ -1,10 +1,54 @@
+import hashlib
+import os
+import tempfile
 from pathlib import Path
+from typing import Optional
+from starlette.concurrency import run_in_threadpool
 
-async def save_file(file, file_path: Path):
-    file_path.parent.mkdir(parents=True, exist_ok=True)
-    with file_path.open("wb") as buffer:
-        buffer.write(await file.read())
+# Bytes read from the upload and written to disk per step
+UPLOAD_CHUNK_SIZE = 1024 * 1024
 
-def get_uploaded_image():
-    img_path = Path(__file__).resolve().parent.parent / "uploads" / "image.jpg"  # Example file path
-    return img_path.read_bytes()
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload grows past the allowed size while streaming."""
+
+
+def _unlink_quietly(path: Path):
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+async def save_file(file, file_path: Path, max_size: Optional[int] = None) -> dict:
+    """Stream an upload to disk in chunks, enforcing max_size and hashing as it writes.
+
+    Data goes to a uniquely named temporary file next to file_path that is renamed into place
+    once complete, so a rejected or failed upload never leaves a partial file.
+    Disk writes run in the threadpool to keep the event loop free. Returns the
+    size in bytes and SHA-256 hex digest of the file.
+    """
+    await run_in_threadpool(file_path.parent.mkdir, parents=True, exist_ok=True)
+    # Unique per upload, so concurrent uploads of the same name never share a temp file
+    buffer = await run_in_threadpool(
+        tempfile.NamedTemporaryFile, "wb", dir=file_path.parent,
+        prefix=f".{file_path.name}.", suffix=".part", delete=False
+    )
+    temp_path = Path(buffer.name)
+    sha256 = hashlib.sha256()
+    size = 0
+    try:
+        try:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if max_size is not None and size > max_size:
+                    raise UploadTooLargeError("File size exceeds the allowed limit")
+                sha256.update(chunk)
+                await run_in_threadpool(buffer.write, chunk)
+        finally:
+            await run_in_threadpool(buffer.close)
+        await run_in_threadpool(os.replace, temp_path, file_path)
+    except BaseException:
+        await run_in_threadpool(_unlink_quietly, temp_path)
+        raise
+    return {"size": size, "sha256": sha256.hexdigest()}
@@ -0,0 +1,39 @@
+import hashlib
+import os
+import google.generativeai as genai
+from google.ai import generativelanguage as glm
+from app.cache import TTLCache
+
+# Maximum number of (API key, model) clients kept alive per process
+GEMINI_CLIENT_POOL_SIZE = int(os.getenv("GEMINI_CLIENT_POOL_SIZE", "256"))
+
+# GenerativeModel instances bound to their own API client, keyed by (sha256(api_key), model_name)
+_client_pool = TTLCache(maxsize=GEMINI_CLIENT_POOL_SIZE)
+
+
+def _hash_key(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+
+def get_pooled_model(api_key: str, model_name: str) -> genai.GenerativeModel:
+    """Return a GenerativeModel whose client is isolated to api_key.
+
+    genai.configure() sets a process-wide key, so concurrent calls for different
+    users could run on each other's keys. Each pooled model instead owns a
+    GenerativeServiceClient created for one key, and reuses its connection
+    across calls.
+    """
+    pool_key = (_hash_key(api_key), model_name)
+    model = _client_pool.get(pool_key)
+    if model is not None:
+        return model
+
+    client = glm.GenerativeServiceClient(client_options={"api_key": api_key})
+    model = genai.GenerativeModel(model_name)
+    model._client = client
+    _client_pool.set(pool_key, model)
+    return model
+
+
+def client_pool_stats() -> dict:
+    return _client_pool.stats()
@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Optional
+from app.cache import TTLCache
+
+# Roadmap generation cache configuration
+ROADMAP_CACHE_TTL_SECONDS = float(os.getenv("ROADMAP_CACHE_TTL_SECONDS", "86400"))
+ROADMAP_CACHE_MAX_SIZE = int(os.getenv("ROADMAP_CACHE_MAX_SIZE", "512"))
+# Optional persistent tier shared by all workers; disabled when unset
+ROADMAP_CACHE_SQLITE_PATH = os.getenv("ROADMAP_CACHE_SQLITE_PATH")
+ROADMAP_CACHE_SQLITE_MAX_ROWS = int(os.getenv("ROADMAP_CACHE_SQLITE_MAX_ROWS", "10000"))
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return " ".join(value.split()).casefold()
+    if isinstance(value, list):
+        return [_normalize(item) for item in value]
+    if hasattr(value, "value"):
+        return _normalize(value.value)
+    return value
+
+
+def make_cache_key(inputs: dict) -> str:
+    """Hash prompt inputs after normalizing case and whitespace."""
+    normalized = {name: _normalize(value) for name, value in inputs.items()}
+    payload = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class SQLiteCacheBackend:
+    """Persistent cache tier stored in a standalone SQLite file."""
+
+    def __init__(self, path: str, ttl: float, max_rows: int):
+        self.path = path
+        self.ttl = ttl
+        self.max_rows = max_rows
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS generation_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_generation_cache_last_access ON generation_cache (last_access)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, expires_at FROM generation_cache WHERE cache_key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                conn.execute("DELETE FROM generation_cache WHERE cache_key = ?", (key,))
+                return None
+            conn.execute("UPDATE generation_cache SET last_access = ? WHERE cache_key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO generation_cache (cache_key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + self.ttl, now),
+            )
+            conn.execute("DELETE FROM generation_cache WHERE expires_at <= ?", (now,))
+            # Size-based eviction: drop least recently used rows beyond max_rows
+            conn.execute(
+                """
+                DELETE FROM generation_cache WHERE cache_key IN (
+                    SELECT cache_key FROM generation_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_rows,),
+            )
+
+
+class GenerationCache:
+    """Two-tier (memory LRU, optional SQLite) cache of generated roadmap steps."""
+
+    def __init__(self, memory: TTLCache, sqlite_backend: Optional[SQLiteCacheBackend] = None):
+        self.memory = memory
+        self.sqlite = sqlite_backend
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.sqlite_hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.stores = 0
+        self.errors = 0
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("memory_hits")
+            return value
+
+        if self.sqlite is not None:
+            try:
+                value = self.sqlite.get(key)
+            except sqlite3.Error:
+                self._count("errors")
+                value = None
+            if value is not None:
+                self.memory.set(key, value)
+                self._count("sqlite_hits")
+                return value
+
+        self._count("misses")
+        return None
+
+    def set(self, key: str, value: Any):
+        self.memory.set(key, value)
+        if self.sqlite is not None:
+            try:
+                self.sqlite.set(key, value)
+            except sqlite3.Error:
+                self._count("errors")
+        self._count("stores")
+
+    def record_bypass(self):
+        self._count("bypasses")
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.memory_hits + self.sqlite_hits
+            lookups = hits + self.misses
+            return {
+                "memory": self.memory.stats(),
+                "sqlite_enabled": self.sqlite is not None,
+                "memory_hits": self.memory_hits,
+                "sqlite_hits": self.sqlite_hits,
+                "misses": self.misses,
+                "bypasses": self.bypasses,
+                "stores": self.stores,
+                "errors": self.errors,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+roadmap_cache = GenerationCache(
+    TTLCache(maxsize=ROADMAP_CACHE_MAX_SIZE, ttl=ROADMAP_CACHE_TTL_SECONDS),
+    SQLiteCacheBackend(ROADMAP_CACHE_SQLITE_PATH, ROADMAP_CACHE_TTL_SECONDS, ROADMAP_CACHE_SQLITE_MAX_ROWS)
+    if ROADMAP_CACHE_SQLITE_PATH else None,
+)
@@ -1,36 +1,207 @@
 import os
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from dotenv import load_dotenv
-import google.generativeai as genai
+from typing import Iterator, Optional
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from app.auth.crud import get_user_gemini_key
+from app.concurrency import BoundedExecutor, ExecutorOverloaded
+from app.models.llm_backends import get_backend
+from app.models.resilience import (
+    CircuitOpenError, DeadlineExceededError, TransientLLMError, resilient_caller
+)
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Generation pool configuration
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+GEMINI_MAX_PENDING = int(os.getenv("GEMINI_MAX_PENDING", "16"))
+GEMINI_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", "60"))
+
+# Blocking SDK calls run here; max_workers caps in-flight Gemini calls per process
+llm_executor = BoundedExecutor(
+    "gemini",
+    max_workers=GEMINI_MAX_CONCURRENCY,
+    max_pending=GEMINI_MAX_PENDING,
+)
+
+
+class GenerationBusyError(Exception):
+    """Raised when too many Gemini calls are already in flight."""
+
+
+class GenerationTimeoutError(Exception):
+    """Raised when a Gemini call exceeds GEMINI_TIMEOUT_SECONDS."""
+
+
+class GenerationUnavailableError(GenerationBusyError):
+    """Raised while the circuit breaker for the user's API key is open."""
+
+
 def configure_model(api_key: str):
     """Configure Gemini model with provided API key (must be user-provided)"""
     if not api_key:
         raise ValueError("No Gemini API key provided. Please upload your API key in your profile or contact administrator.")
     # Get model name from environment variable, default to gemini-1.5-flash
     model_name = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel(model_name)
-    return model
+    return get_backend().get_model(api_key, model_name)
 
 def get_model_for_user(db: Session, user_id: int):
     """Get model instance using user's uploaded API key"""
     user_api_key = get_user_gemini_key(db, user_id)
     return configure_model(user_api_key)
 
-def generate_text(query: str, db: Session, user_id: int):
+def _generate_content(model, contents, generation_config: Optional[dict], deadline: float) -> str:
+    """Blocking Gemini call with retries, hedging and circuit breaking, executed on the generation pool.
+
+    deadline is fixed when the call is submitted, so time spent queued for a
+    worker counts against the retry budget.
+    """
+    return resilient_caller.call(
+        model.key_id,
+        lambda timeout: model.generate(contents, generation_config, timeout=timeout),
+        deadline,
+    )
+
+_STREAM_END = object()
+
+def _stream_content(model, contents, chunks: queue.Queue, generation_config: Optional[dict] = None,
+                    cancelled: Optional[threading.Event] = None):
+    """Blocking streamed Gemini call; pushes text chunks onto a queue for the consumer.
+
+    Streams are not retried since chunks may already have been consumed, but
+    their outcome still feeds the key's circuit breaker. Setting cancelled
+    stops reading from Gemini after the current chunk.
+    """
+    breaker = resilient_caller.breaker(model.key_id)
+    try:
+        stream = model.stream(contents, generation_config)
+        try:
+            for chunk in stream:
+                if cancelled is not None and cancelled.is_set():
+                    # Consumer went away; the outcome says nothing about upstream health
+                    breaker.release()
+                    return
+                chunks.put(chunk)
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+        breaker.record_success()
+    except TransientLLMError as e:
+        breaker.record_failure()
+        chunks.put(e)
+    except Exception as e:
+        # Not an upstream health signal; just free the half-open trial if held
+        breaker.release()
+        chunks.put(e)
+    finally:
+        chunks.put(_STREAM_END)
+
+def _run_generation(model, contents, generation_config: Optional[dict] = None) -> str:
+    """Run a Gemini call on the pool, blocking the calling thread."""
+    deadline = time.monotonic() + GEMINI_TIMEOUT_SECONDS
+    try:
+        return llm_executor.call(
+            _generate_content, model, contents, generation_config, deadline, timeout=GEMINI_TIMEOUT_SECONDS)
+    except ExecutorOverloaded:
+        logger.warning("Generation pool at capacity, rejecting call", extra={"key_id": model.key_id})
+        raise GenerationBusyError("Too many generation requests in progress, please retry shortly")
+    except CircuitOpenError as e:
+        logger.warning("Circuit open for API key, rejecting call", extra={"key_id": model.key_id})
+        raise GenerationUnavailableError(str(e))
+    except (FutureTimeoutError, DeadlineExceededError):
+        logger.warning("Gemini call timed out", extra={"key_id": model.key_id, "timeout_seconds": GEMINI_TIMEOUT_SECONDS})
+        raise GenerationTimeoutError(f"Gemini did not respond within {GEMINI_TIMEOUT_SECONDS:g} seconds")
+
+async def _arun_generation(model, contents) -> str:
+    """Run a Gemini call on the pool without blocking the event loop."""
+    deadline = time.monotonic() + GEMINI_TIMEOUT_SECONDS
+    try:
+        return await llm_executor.run(
+            _generate_content, model, contents, None, deadline, timeout=GEMINI_TIMEOUT_SECONDS)
+    except ExecutorOverloaded:
+        logger.warning("Generation pool at capacity, rejecting call", extra={"key_id": model.key_id})
+        raise GenerationBusyError("Too many generation requests in progress, please retry shortly")
+    except CircuitOpenError as e:
+        logger.warning("Circuit open for API key, rejecting call", extra={"key_id": model.key_id})
+        raise GenerationUnavailableError(str(e))
+    except (asyncio.TimeoutError, DeadlineExceededError):
+        logger.warning("Gemini call timed out", extra={"key_id": model.key_id, "timeout_seconds": GEMINI_TIMEOUT_SECONDS})
+        raise GenerationTimeoutError(f"Gemini did not respond within {GEMINI_TIMEOUT_SECONDS:g} seconds")
+
+def _image_contents(query: str, img_data: bytes) -> list:
+    return [query, {"mime_type": "image/jpeg", "data": img_data}]
+
+def generate_text(query: str, db: Session, user_id: int, generation_config: Optional[dict] = None):
     """Generate text using user's Gemini API key"""
     model = get_model_for_user(db, user_id)
-    response = model.generate_content(query)
-    return {"text": response.text}
+    return {"text": _run_generation(model, query, generation_config)}
 
 def generate_image(query: str, img_data: bytes, db: Session, user_id: int):
     """Generate image analysis using user's Gemini API key"""
     model = get_model_for_user(db, user_id)
     # Use the same model for both text and image processing
-    response = model.generate_content([query, {"mime_type": "image/jpeg", "data": img_data}])
-    return {"image": response.text}
+    return {"image": _run_generation(model, _image_contents(query, img_data))}
+
+def stream_text(query: str, db: Session, user_id: int, generation_config: Optional[dict] = None) -> Iterator[str]:
+    """Stream text chunks using user's Gemini API key.
+
+    The model is resolved and the call admitted to the generation pool before
+    returning, so missing keys and overload surface before the first chunk.
+    GEMINI_TIMEOUT_SECONDS applies to the gap between chunks.
+    """
+    model = get_model_for_user(db, user_id)
+    breaker = resilient_caller.breaker(model.key_id)
+    if not breaker.allow():
+        raise GenerationUnavailableError("Gemini is failing for this API key; retry shortly")
+    chunks: queue.Queue = queue.Queue()
+    cancelled = threading.Event()
+    try:
+        llm_executor.submit(_stream_content, model, query, chunks, generation_config, cancelled)
+    except ExecutorOverloaded:
+        # The stream never started, so give back the half-open trial it may hold
+        breaker.release()
+        raise GenerationBusyError("Too many generation requests in progress, please retry shortly")
+
+    def iterate() -> Iterator[str]:
+        try:
+            while True:
+                try:
+                    item = chunks.get(timeout=GEMINI_TIMEOUT_SECONDS)
+                except queue.Empty:
+                    raise GenerationTimeoutError(f"Gemini did not respond within {GEMINI_TIMEOUT_SECONDS:g} seconds")
+                if item is _STREAM_END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Closing the iterator early (e.g. the client disconnected) stops the producer
+            cancelled.set()
+
+    return iterate()
+
+async def agenerate_text(query: str, db: Session, user_id: int):
+    """Async variant of generate_text for use from async routes"""
+    model = await run_in_threadpool(get_model_for_user, db, user_id)
+    return {"text": await _arun_generation(model, query)}
+
+async def agenerate_image(query: str, img_data: bytes, db: Session, user_id: int):
+    """Async variant of generate_image for use from async routes"""
+    model = await run_in_threadpool(get_model_for_user, db, user_id)
+    return {"image": await _arun_generation(model, _image_contents(query, img_data))}
+
+def generation_pool_stats() -> dict:
+    return llm_executor.stats()
+
+def resilience_stats() -> dict:
+    return resilient_caller.stats()
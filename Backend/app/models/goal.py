@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, Text, Float, DateTime, Enum as SQLEnum, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, Float, DateTime, Enum as SQLEnum, ForeignKey, Index
+from sqlalchemy.orm import relationship, validates
 from sqlalchemy.sql import func
 from app.database import Base
 import enum
@@ -19,6 +19,11 @@ class GoalPriority(str, enum.Enum):
     high = "high"
 
 
+def normalize_category(category: str) -> str:
+    """Lookup key for a category: case-folded with whitespace collapsed, so "Health " and "health" match."""
+    return " ".join((category or "").split()).casefold()
+
+
 class Goal(Base):
     __tablename__ = "goals"
 
@@ -27,6 +32,7 @@ class Goal(Base):
     description = Column(Text, nullable=True)
     status = Column(SQLEnum(GoalStatus), default=GoalStatus.in_progress)
     category = Column(String(50), nullable=False, index=True)
+    category_key = Column(String(50), nullable=False, default="", server_default="")  # normalize_category(category)
     deadline = Column(String(10), nullable=True)  # ISO date string format
     priority = Column(SQLEnum(GoalPriority), default=GoalPriority.medium)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
@@ -36,3 +42,34 @@ class Goal(Base):
     # Relationships
     user = relationship("User", back_populates="goals")
     roadmap = relationship("Roadmap", back_populates="goal", uselist=False, cascade="all, delete-orphan")
+
+    __table_args__ = (
+        # Serves the per-user listing order and its keyset cursor seeks
+        Index("ix_goals_user_updated_id", "user_id", "updated_at", "id"),
+        # Covers category filters and the facet aggregate; pattern ops let Postgres use it for prefixes
+        Index(
+            "ix_goals_user_category_key", "user_id", "category_key", "status", "priority",
+            postgresql_ops={"category_key": "text_pattern_ops"},
+        ),
+    )
+
+    @validates("category")
+    def _set_category_key(self, key, category):
+        self.category_key = normalize_category(category)
+        return category
+
+
+class UserGoalStats(Base):
+    """Goal counts per user and (status, priority, category), kept current by the goal CRUD.
+
+    Status and priority hold the enum values (e.g. "in-progress") and category
+    holds the goal's category_key. Rows are not removed when their count
+    drops to zero.
+    """
+    __tablename__ = "user_goal_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    status = Column(String(20), primary_key=True)
+    priority = Column(String(20), primary_key=True)
+    category = Column(String(50), primary_key=True)
+    goal_count = Column(Integer, nullable=False, default=0, server_default="0")
@@ -0,0 +1,175 @@
+import asyncio
+import os
+import re
+import uuid
+from pathlib import Path
+from starlette.concurrency import run_in_threadpool
+from app.cache import TTLCache
+from app.concurrency import BoundedExecutor, ExecutorOverloaded
+from app.models.file_utils import save_file
+
+# Image store configuration
+IMAGE_STORE_DIR = Path(os.getenv("IMAGE_STORE_DIR", str(Path(__file__).resolve().parent.parent / "uploads" / "images")))
+IMAGE_MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", "1024"))
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", str(min(2, os.cpu_count() or 1))))
+IMAGE_MAX_PENDING = int(os.getenv("IMAGE_MAX_PENDING", "16"))
+IMAGE_PROCESS_TIMEOUT_SECONDS = float(os.getenv("IMAGE_PROCESS_TIMEOUT_SECONDS", "30"))
+IMAGE_CACHE_MAX_ITEMS = int(os.getenv("IMAGE_CACHE_MAX_ITEMS", "64"))
+IMAGE_CACHE_TTL_SECONDS = float(os.getenv("IMAGE_CACHE_TTL_SECONDS", "600"))
+
+# Single image written by POST /upload, used by /gemini when no image_id is given
+LEGACY_IMAGE_PATH = Path(__file__).resolve().parent.parent / "uploads" / "image.jpg"
+
+# Decoding and resizing are CPU-bound, so they run in worker processes
+image_executor = BoundedExecutor(
+    "image-prepare",
+    max_workers=IMAGE_WORKERS,
+    max_pending=IMAGE_MAX_PENDING,
+    kind="process",
+)
+
+# Hot set of prepared payloads, keyed by (user_id, image_id)
+_payload_cache = TTLCache(maxsize=IMAGE_CACHE_MAX_ITEMS, ttl=IMAGE_CACHE_TTL_SECONDS)
+
+_IMAGE_ID_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+class ImageNotFoundError(Exception):
+    """Raised when an image id does not exist in the user's store."""
+
+
+class InvalidImageError(ValueError):
+    """Raised when an upload cannot be decoded as an image."""
+
+
+class ImageStoreBusyError(Exception):
+    """Raised when the image preparation pool is saturated or too slow."""
+
+
+def _prepare_image(source: str, destination: str, max_dimension: int, quality: int) -> int:
+    """Downscale and recompress an image to JPEG. Runs in a worker process.
+
+    Returns the prepared size in bytes.
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    temp = f"{destination}.{os.getpid()}.part"
+    try:
+        with Image.open(source) as image:
+            image = ImageOps.exif_transpose(image)
+            image = image.convert("RGB")
+            image.thumbnail((max_dimension, max_dimension))
+            image.save(temp, format="JPEG", quality=quality, optimize=True)
+    except (UnidentifiedImageError, OSError) as e:
+        if os.path.exists(temp):
+            os.remove(temp)
+        raise InvalidImageError(f"Uploaded file is not a valid image: {e}")
+    os.replace(temp, destination)
+    return os.path.getsize(destination)
+
+
+def _user_dir(user_id: int) -> Path:
+    return IMAGE_STORE_DIR / str(user_id)
+
+
+def _unlink_quietly(path: Path):
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+async def _prepare(original: Path, prepared: Path):
+    try:
+        await image_executor.run(
+            _prepare_image, str(original), str(prepared), IMAGE_MAX_DIMENSION, IMAGE_JPEG_QUALITY,
+            timeout=IMAGE_PROCESS_TIMEOUT_SECONDS,
+        )
+    except ExecutorOverloaded:
+        raise ImageStoreBusyError("Too many images being processed, please retry shortly")
+    except asyncio.TimeoutError:
+        raise ImageStoreBusyError("Image processing timed out, please retry shortly")
+
+
+async def store_image(file, user_id: int, max_size: int) -> dict:
+    """Save an uploaded image in the user's content-addressed store.
+
+    The image id is the SHA-256 of the original bytes, so re-uploading the same
+    file reuses the stored copy. A downscaled JPEG for Gemini is prepared once
+    at upload time and kept next to the original.
+    """
+    user_dir = _user_dir(user_id)
+    incoming = user_dir / f"incoming-{uuid.uuid4().hex}"
+    saved = await save_file(file, incoming, max_size=max_size)
+    image_id = saved["sha256"]
+    original = user_dir / f"{image_id}.orig"
+    prepared = user_dir / f"{image_id}.jpg"
+
+    deduplicated = await run_in_threadpool(prepared.exists)
+    if deduplicated:
+        await run_in_threadpool(_unlink_quietly, incoming)
+    else:
+        await run_in_threadpool(os.replace, incoming, original)
+        try:
+            await _prepare(original, prepared)
+        except InvalidImageError:
+            await run_in_threadpool(_unlink_quietly, original)
+            raise
+
+    return {"image_id": image_id, "size": saved["size"], "deduplicated": deduplicated}
+
+
+async def get_image_payload(user_id: int, image_id: str) -> bytes:
+    """Return the prepared JPEG for one of the user's images, from memory when hot."""
+    if not _IMAGE_ID_PATTERN.match(image_id or ""):
+        raise ImageNotFoundError("Image not found")
+
+    cache_key = (user_id, image_id)
+    payload = _payload_cache.get(cache_key)
+    if payload is not None:
+        return payload
+
+    user_dir = _user_dir(user_id)
+    prepared = user_dir / f"{image_id}.jpg"
+    if not await run_in_threadpool(prepared.exists):
+        original = user_dir / f"{image_id}.orig"
+        if not await run_in_threadpool(original.exists):
+            raise ImageNotFoundError("Image not found")
+        # Prepared copy was removed or never finished; rebuild it from the original
+        await _prepare(original, prepared)
+
+    payload = await run_in_threadpool(prepared.read_bytes)
+    _payload_cache.set(cache_key, payload)
+    return payload
+
+
+def _legacy_needs_prepare(original: Path, prepared: Path) -> bool:
+    try:
+        uploaded_at = original.stat().st_mtime
+    except FileNotFoundError:
+        raise ImageNotFoundError("No image uploaded")
+    try:
+        return prepared.stat().st_mtime < uploaded_at
+    except FileNotFoundError:
+        return True
+
+
+async def get_legacy_image_payload() -> bytes:
+    """Return the legacy single upload, prepared the same way as stored images.
+
+    /upload can overwrite the file at any time, so the prepared copy is rebuilt
+    whenever it is older than the upload.
+    """
+    original = LEGACY_IMAGE_PATH
+    prepared = original.with_name(f"{original.stem}.prepared.jpg")
+    if await run_in_threadpool(_legacy_needs_prepare, original, prepared):
+        await _prepare(original, prepared)
+    return await run_in_threadpool(prepared.read_bytes)
+
+
+def image_store_stats() -> dict:
+    return {
+        "pool": image_executor.stats(),
+        "payload_cache": _payload_cache.stats(),
+    }
@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Enum as SQLEnum, ForeignKey
+from sqlalchemy.sql import func
+from app.database import Base
+import enum
+
+
+class JobStatus(str, enum.Enum):
+    queued = "queued"
+    running = "running"
+    done = "done"
+    failed = "failed"
+
+
+class GenerationJob(Base):
+    __tablename__ = "generation_jobs"
+
+    id = Column(String(32), primary_key=True, index=True)  # uuid4 hex
+    kind = Column(String(50), nullable=False, default="roadmap")
+    status = Column(SQLEnum(JobStatus), nullable=False, default=JobStatus.queued, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    goal_id = Column(Integer, nullable=False, index=True)  # No FK so jobs outlive deleted goals
+    params = Column(Text, nullable=True)  # JSON-encoded job options
+    roadmap_id = Column(Integer, nullable=True)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,153 @@
+import json
+import logging
+import os
+import threading
+import time
+from app.database import SessionLocal
+from app.crud.goal import get_goal
+from app.crud.job import claim_next_job, finish_job, requeue_job, requeue_stale_jobs
+from app.models.generative import GenerationBusyError
+from app.models.roadmap_generator import generate_roadmap
+from app.logging_setup import correlation_id
+
+logger = logging.getLogger(__name__)
+
+# Background job configuration
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "2"))
+# Running jobs older than this are assumed abandoned by a dead worker and requeued
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "600"))
+# Claims per job before it is failed instead of requeued (busy generation pool, abandoned runs)
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+
+
+class JobQueue:
+    """Worker threads that run queued generation jobs from the generation_jobs table.
+
+    The table is the queue, so jobs survive restarts and several processes can
+    share it; enqueueing only has to insert a row and wake a worker.
+    """
+
+    def __init__(self, workers: int, poll_interval: float, stale_after: float, max_attempts: int):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.max_attempts = max_attempts
+        self._threads: list[threading.Thread] = []
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.requeued = 0
+
+    def start(self):
+        if self._threads:
+            return
+        self._stop.clear()
+        self._sweep_stale_jobs(force=True)
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5):
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+    def notify(self):
+        """Wake an idle worker after a job was enqueued."""
+        self._wakeup.set()
+
+    def _count(self, counter: str, delta: int = 1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + delta)
+
+    def _sweep_stale_jobs(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._last_sweep < self.stale_after / 2:
+            return
+        self._last_sweep = now
+        db = SessionLocal()
+        try:
+            self._count("requeued", requeue_stale_jobs(db, self.stale_after, self.max_attempts))
+        finally:
+            db.close()
+
+    def _worker_loop(self):
+        while not self._stop.is_set():
+            try:
+                self._sweep_stale_jobs()
+                if not self._run_next():
+                    self._wakeup.wait(self.poll_interval)
+                    self._wakeup.clear()
+            except Exception:
+                logger.exception("Job worker error")
+                self._stop.wait(self.poll_interval)
+
+    def _run_next(self) -> bool:
+        """Claim and run one job. Returns False when the queue is empty."""
+        db = SessionLocal()
+        try:
+            job = claim_next_job(db)
+            if job is None:
+                return False
+
+            self._count("running")
+            # Log the job's work under its own correlation id
+            context_token = correlation_id.set(f"job-{job.id}")
+            try:
+                params = json.loads(job.params or "{}")
+                goal = get_goal(db, job.goal_id, job.user_id)
+                if not goal:
+                    finish_job(db, job, error="Goal not found")
+                    self._count("failed")
+                    return True
+
+                db_roadmap = generate_roadmap(
+                    db, goal, job.user_id, use_cache=params.get("use_cache", True))
+                if not db_roadmap:
+                    finish_job(db, job, error="Roadmap already exists or failed to create")
+                    self._count("failed")
+                else:
+                    finish_job(db, job, roadmap_id=db_roadmap.id)
+                    self._count("completed")
+            except GenerationBusyError as e:
+                # Generation pool is saturated; leave the job for a later attempt, up to max_attempts claims
+                db.rollback()
+                if job.attempts >= self.max_attempts:
+                    finish_job(db, job, error=f"Gave up after {job.attempts} attempts: {e}")
+                    self._count("failed")
+                else:
+                    requeue_job(db, job)
+                    self._count("requeued")
+                self._stop.wait(self.poll_interval)
+            except Exception as e:
+                logger.exception("Generation job failed", extra={"job_id": job.id, "goal_id": job.goal_id})
+                db.rollback()
+                finish_job(db, job, error=f"Gemini generation failed: {str(e)}")
+                self._count("failed")
+            finally:
+                correlation_id.reset(context_token)
+                self._count("running", -1)
+            return True
+        finally:
+            db.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": len(self._threads),
+                "running": self.running,
+                "completed": self.completed,
+                "failed": self.failed,
+                "requeued": self.requeued,
+            }
+
+
+job_queue = JobQueue(JOB_WORKERS, JOB_POLL_INTERVAL_SECONDS, JOB_STALE_SECONDS, JOB_MAX_ATTEMPTS)
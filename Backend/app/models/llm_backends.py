@@ -0,0 +1,178 @@
+import hashlib
+import json
+import os
+import random
+import re
+import time
+from abc import ABC, abstractmethod
+from typing import Iterator, Optional
+from app.models.resilience import TransientLLMError
+
+
+def key_fingerprint(api_key: str) -> str:
+    """Short non-reversible id for an API key, used to key per-key state such as circuit breakers."""
+    return hashlib.sha256(api_key.encode()).hexdigest()[:16]
+
+
+class LLMModel(ABC):
+    """A model bound to one API key. Implementations must be safe to share between threads.
+
+    generate() raises TransientLLMError for failures worth retrying, and should
+    give up after roughly timeout seconds when one is given.
+    """
+
+    key_id = "default"
+
+    @abstractmethod
+    def generate(self, contents, generation_config: Optional[dict] = None, timeout: Optional[float] = None) -> str:
+        """Return the full response text."""
+
+    @abstractmethod
+    def stream(self, contents, generation_config: Optional[dict] = None) -> Iterator[str]:
+        """Yield response text chunks as they arrive."""
+
+
+class LLMBackend(ABC):
+    """Source of LLM models, selected with the LLM_BACKEND environment variable."""
+
+    name = "base"
+
+    @abstractmethod
+    def get_model(self, api_key: str, model_name: str) -> LLMModel:
+        """Return a model bound to api_key."""
+
+
+class GeminiModel(LLMModel):
+    def __init__(self, model, key_id: str):
+        self._model = model
+        self.key_id = key_id
+
+    def generate(self, contents, generation_config: Optional[dict] = None, timeout: Optional[float] = None) -> str:
+        from google.api_core import exceptions as api_exceptions
+        request_options = {"timeout": timeout} if timeout else None
+        try:
+            response = self._model.generate_content(
+                contents, generation_config=generation_config, request_options=request_options)
+        except (api_exceptions.ServerError, api_exceptions.TooManyRequests) as e:
+            # 5xx (including upstream deadline exceeded) and 429 are retryable
+            raise TransientLLMError(str(e)) from e
+        return response.text
+
+    def stream(self, contents, generation_config: Optional[dict] = None) -> Iterator[str]:
+        from google.api_core import exceptions as api_exceptions
+        try:
+            for chunk in self._model.generate_content(contents, generation_config=generation_config, stream=True):
+                yield chunk.text
+        except (api_exceptions.ServerError, api_exceptions.TooManyRequests) as e:
+            raise TransientLLMError(str(e)) from e
+
+
+class GeminiBackend(LLMBackend):
+    """Google Gemini through per-key pooled clients."""
+
+    name = "gemini"
+
+    def get_model(self, api_key: str, model_name: str) -> LLMModel:
+        from app.models.gemini_pool import get_pooled_model
+        return GeminiModel(get_pooled_model(api_key, model_name), key_fingerprint(api_key))
+
+
+class FakeLLMError(TransientLLMError):
+    """Failure injected by the fake backend."""
+
+
+class FakeLLMModel(LLMModel):
+    """Offline stand-in for Gemini with configurable latency, errors and canned output."""
+
+    def __init__(self, backend: "FakeLLMBackend", key_id: str):
+        self.backend = backend
+        self.key_id = key_id
+
+    def _response_text(self, contents) -> str:
+        if isinstance(contents, list):
+            return "Fake image analysis: the image shows a sample scene."
+        match = re.search(r"Goal Title: (.+)", contents)
+        goal = match.group(1).strip() if match else "your goal"
+        steps = [
+            {
+                "title": f"Step {i}: work towards {goal}",
+                "description": f"Fake roadmap step {i} of {self.backend.steps}.\n\nIt supports *italic* and **bold** text.",
+            }
+            for i in range(1, self.backend.steps + 1)
+        ]
+        return json.dumps(steps, indent=2)
+
+    def generate(self, contents, generation_config: Optional[dict] = None, timeout: Optional[float] = None) -> str:
+        self.backend.maybe_fail()
+        latency = self.backend.sample_latency()
+        if timeout is not None and latency > timeout:
+            time.sleep(timeout)
+            raise FakeLLMError(f"Fake LLM call exceeded its {timeout:g}s deadline")
+        time.sleep(latency)
+        return self._response_text(contents)
+
+    def stream(self, contents, generation_config: Optional[dict] = None) -> Iterator[str]:
+        self.backend.maybe_fail()
+        text = self._response_text(contents)
+        size = self.backend.stream_chunk_chars
+        chunks = [text[i:i + size] for i in range(0, len(text), size)] or [""]
+        # Spread the sampled latency across the chunks, front-loading time to first token
+        latency = self.backend.sample_latency()
+        time.sleep(latency / 2)
+        for chunk in chunks:
+            time.sleep(latency / 2 / len(chunks))
+            yield chunk
+
+
+class FakeLLMBackend(LLMBackend):
+    """Deterministic-shape fake backend for load tests and offline development.
+
+    Configured with FAKE_LLM_* environment variables: median latency, latency
+    distribution (fixed, uniform or lognormal), error injection rate, number of
+    canned roadmap steps and streaming chunk size.
+    """
+
+    name = "fake"
+
+    def __init__(self):
+        self.latency_ms = float(os.getenv("FAKE_LLM_LATENCY_MS", "800"))
+        self.distribution = os.getenv("FAKE_LLM_LATENCY_DISTRIBUTION", "lognormal")
+        self.sigma = float(os.getenv("FAKE_LLM_LATENCY_SIGMA", "0.5"))
+        self.error_rate = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+        self.steps = int(os.getenv("FAKE_LLM_STEPS", "6"))
+        self.stream_chunk_chars = int(os.getenv("FAKE_LLM_STREAM_CHUNK_CHARS", "40"))
+
+    def sample_latency(self) -> float:
+        """Sample one call's latency in seconds."""
+        median = self.latency_ms / 1000
+        if self.distribution == "fixed":
+            return median
+        if self.distribution == "uniform":
+            return random.uniform(0, 2 * median)
+        return random.lognormvariate(0, self.sigma) * median
+
+    def maybe_fail(self):
+        if self.error_rate and random.random() < self.error_rate:
+            raise FakeLLMError("Injected fake LLM failure")
+
+    def get_model(self, api_key: str, model_name: str) -> LLMModel:
+        return FakeLLMModel(self, key_fingerprint(api_key))
+
+
+_BACKENDS = {
+    "gemini": GeminiBackend,
+    "fake": FakeLLMBackend,
+}
+
+_backend: Optional[LLMBackend] = None
+
+
+def get_backend() -> LLMBackend:
+    """Return the process-wide backend chosen by LLM_BACKEND (default: gemini)."""
+    global _backend
+    if _backend is None:
+        name = os.getenv("LLM_BACKEND", "gemini")
+        if name not in _BACKENDS:
+            raise ValueError(f"Unknown LLM_BACKEND: {name}")
+        _backend = _BACKENDS[name]()
+    return _backend
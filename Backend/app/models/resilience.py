@@ -0,0 +1,240 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional
+
+# Retry policy
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", "0.5"))
+LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", "8"))
+# Per-attempt deadline; the whole call is also bounded by the caller's overall deadline
+LLM_ATTEMPT_TIMEOUT_SECONDS = float(os.getenv("LLM_ATTEMPT_TIMEOUT_SECONDS", "30"))
+# Hedging: send a second request when the first is slower than the observed p95
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_HEDGE_MAX_WORKERS = int(os.getenv("LLM_HEDGE_MAX_WORKERS", "16"))
+# Circuit breaker, per API key
+LLM_BREAKER_FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", "5"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+
+
+class TransientLLMError(Exception):
+    """Upstream failure worth retrying (5xx, rate limiting, upstream timeouts)."""
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling upstream while a key's circuit breaker is open."""
+
+
+class DeadlineExceededError(Exception):
+    """Raised when retries run out of time before the overall deadline."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open trial call."""
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.state = "half_open"
+                self._trial_in_flight = False
+            if self.state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def release(self):
+        """End a call whose outcome says nothing about upstream health.
+
+        Frees the half-open trial slot (if this call held it) without
+        changing the state or the failure count.
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> bool:
+        """Record a failed call. Returns True if this opened the circuit."""
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                opened = self.state != "open"
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                return opened
+            return False
+
+
+class LatencyTracker:
+    """Sliding window of successful call latencies."""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < LLM_HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class ResilientCaller:
+    """Wraps LLM calls with deadlines, jittered retries, optional hedging and per-key circuit breakers."""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+        self._latency = LatencyTracker()
+        self._hedge_pool: Optional[ThreadPoolExecutor] = None
+        self.counts = {
+            "calls": 0,
+            "attempts": 0,
+            "successes": 0,
+            "retries": 0,
+            "transient_failures": 0,
+            "deadline_exceeded": 0,
+            "hedges_launched": 0,
+            "hedge_wins": 0,
+            "circuit_opened": 0,
+            "short_circuited": 0,
+        }
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counts[name] += 1
+
+    def breaker(self, key_id: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(key_id)
+            if breaker is None:
+                breaker = self._breakers[key_id] = CircuitBreaker(
+                    LLM_BREAKER_FAILURE_THRESHOLD, LLM_BREAKER_RESET_SECONDS)
+            return breaker
+
+    def _get_hedge_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._hedge_pool is None:
+                self._hedge_pool = ThreadPoolExecutor(max_workers=LLM_HEDGE_MAX_WORKERS, thread_name_prefix="llm-hedge")
+            return self._hedge_pool
+
+    def _attempt(self, fn: Callable[[float], str], timeout: float) -> str:
+        """Run one attempt, hedging it with a duplicate if it outlives the observed p95."""
+        self._count("attempts")
+        threshold = self._latency.percentile(95) if LLM_HEDGE_ENABLED else None
+        if threshold is None or threshold >= timeout:
+            return fn(timeout)
+
+        pool = self._get_hedge_pool()
+        primary = pool.submit(fn, timeout)
+        done, _ = wait([primary], timeout=threshold)
+        if done:
+            return primary.result()
+
+        self._count("hedges_launched")
+        hedge = pool.submit(fn, max(timeout - threshold, 0.1))
+        pending = {primary, hedge}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self._count("hedge_wins")
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def call(self, key_id: str, fn: Callable[[float], str], deadline: float) -> str:
+        """Call fn(attempt_timeout) until it succeeds, retries run out or the deadline passes.
+
+        deadline is an absolute time.monotonic() value. Only TransientLLMError is
+        retried; other errors propagate immediately. The key's circuit breaker
+        counts whole calls, so a call that recovers on retry is not a failure.
+        """
+        self._count("calls")
+        breaker = self.breaker(key_id)
+        if not breaker.allow():
+            self._count("short_circuited")
+            raise CircuitOpenError("Gemini is failing for this API key; retry shortly")
+
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._count("deadline_exceeded")
+                self._record_failure(breaker)
+                raise DeadlineExceededError("Gemini call deadline exceeded")
+
+            started = time.monotonic()
+            try:
+                result = self._attempt(fn, min(LLM_ATTEMPT_TIMEOUT_SECONDS, remaining))
+            except TransientLLMError:
+                self._count("transient_failures")
+                if attempt >= LLM_MAX_RETRIES:
+                    self._record_failure(breaker)
+                    raise
+                # Full-jitter exponential backoff, never sleeping past the deadline
+                delay = random.uniform(0, min(LLM_RETRY_MAX_SECONDS, LLM_RETRY_BASE_SECONDS * 2 ** attempt))
+                if time.monotonic() + delay >= deadline:
+                    self._count("deadline_exceeded")
+                    self._record_failure(breaker)
+                    raise DeadlineExceededError("Gemini call deadline exceeded while retrying")
+                attempt += 1
+                self._count("retries")
+                time.sleep(delay)
+                continue
+            except Exception:
+                # Non-transient errors (bad key, bad request) say nothing about upstream health
+                breaker.release()
+                raise
+
+            breaker.record_success()
+            self._latency.record(time.monotonic() - started)
+            self._count("successes")
+            return result
+
+    def _record_failure(self, breaker: CircuitBreaker):
+        if breaker.record_failure():
+            self._count("circuit_opened")
+
+    def stats(self) -> dict:
+        with self._lock:
+            states = {"closed": 0, "open": 0, "half_open": 0}
+            for breaker in self._breakers.values():
+                states[breaker.state] += 1
+            counts = dict(self.counts)
+        return {
+            **counts,
+            "breakers": states,
+            "hedge_enabled": LLM_HEDGE_ENABLED,
+            "hedge_threshold_seconds": self._latency.percentile(95) if LLM_HEDGE_ENABLED else None,
+        }
+
+
+resilient_caller = ResilientCaller()
@@ -11,21 +11,26 @@ class Roadmap(Base):
     title = Column(String(200), nullable=False)
     description = Column(Text, nullable=True)
     goal_id = Column(Integer, ForeignKey("goals.id"), nullable=False, unique=True, index=True)
+    # Denormalized step counters, maintained by the step CRUD so progress needs no step rows
+    total_steps = Column(Integer, nullable=False, default=0, server_default="0")
+    completed_steps = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     # Relationships
     goal = relationship("Goal", back_populates="roadmap")
-    steps = relationship("RoadmapStep", back_populates="roadmap", cascade="all, delete-orphan")
+    steps = relationship(
+        "RoadmapStep", back_populates="roadmap", cascade="all, delete-orphan",
+        order_by="RoadmapStep.order_index"
+    )
 
     @property
     def progress_percentage(self) -> float:
-        """Calculate progress percentage based on completed steps."""
-        if not self.steps:
+        """Calculate progress percentage from the step counters."""
+        if not self.total_steps:
             return 0.0
-        
-        completed_steps = sum(1 for step in self.steps if step.is_completed)
-        return (completed_steps / len(self.steps)) * 100
+
+        return (self.completed_steps / self.total_steps) * 100
 
 
 class RoadmapStep(Base):
@@ -0,0 +1,574 @@
+import contextvars
+import json
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+from typing_extensions import TypedDict
+from app.database import SessionLocal
+from app.models.goal import Goal
+from app.models.roadmap import Roadmap
+from app.crud.roadmap import roadmap_crud
+from app.models.generative import GEMINI_TIMEOUT_SECONDS, GenerationTimeoutError, generate_text, stream_text
+from app.models.generation_cache import roadmap_cache, make_cache_key
+from app.schemas.roadmap import RoadmapCreate, RoadmapStepCreate
+from app.singleflight import FlightWaitTimeout, make_single_flight
+from app.logging_setup import payload_fields
+
+logger = logging.getLogger(__name__)
+
+# Ask Gemini for schema-constrained JSON instead of free text
+GEMINI_STRUCTURED_OUTPUT = os.getenv("GEMINI_STRUCTURED_OUTPUT", "true").lower() == "true"
+
+# Maximum Gemini calls one user's batch generations may have in flight at once
+ROADMAP_BATCH_USER_CONCURRENCY = int(os.getenv("ROADMAP_BATCH_USER_CONCURRENCY", "4"))
+
+# Coalesces concurrent generations for the same (user_id, goal_id)
+roadmap_flights = make_single_flight()
+# How long a coalesced caller waits for the in-flight generation: a response
+# plus one repair call, each bounded by GEMINI_TIMEOUT_SECONDS
+ROADMAP_FLIGHT_WAIT_SECONDS = float(
+    os.getenv("ROADMAP_FLIGHT_WAIT_SECONDS", str(2 * GEMINI_TIMEOUT_SECONDS)))
+
+# user_id -> [semaphore, threads holding or waiting for it]; dropped when unused
+_user_batch_slots: Dict[int, list] = {}
+_user_batch_slots_lock = threading.Lock()
+
+
+class RoadmapStepOutput(TypedDict):
+    """Response schema for one generated step (mirrors RoadmapStepCreate)."""
+    title: str
+    description: str
+
+
+ROADMAP_GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": list[RoadmapStepOutput],
+} if GEMINI_STRUCTURED_OUTPUT else None
+
+
+class RoadmapParseError(Exception):
+    """Raised when no valid step array can be recovered from a Gemini response."""
+
+
+class ParseStats:
+    """Counters for how roadmap responses were parsed."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {"direct": 0, "recovered": 0, "repair_attempts": 0, "repaired": 0, "failed": 0}
+
+    def count(self, outcome: str):
+        with self._lock:
+            self.counts[outcome] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = sum(self.counts[outcome] for outcome in ("direct", "recovered", "repaired", "failed"))
+            return {
+                **self.counts,
+                "first_pass_failure_rate": round(self.counts["repair_attempts"] / total, 4) if total else 0.0,
+                "failure_rate": round(self.counts["failed"] / total, 4) if total else 0.0,
+            }
+
+
+parse_stats = ParseStats()
+
+
+def roadmap_prompt_inputs(goal: Goal, today: Optional[date] = None) -> dict:
+    """Collect every goal field that the roadmap prompt depends on."""
+    return {
+        "title": goal.title,
+        "description": goal.description or 'No additional description provided.',
+        "category": goal.category,
+        "priority": goal.priority,
+        "today": (today or date.today()).isoformat(),
+        "deadline": str(goal.deadline) if goal.deadline else 'No deadline specified',
+    }
+
+
+def build_roadmap_prompt(inputs: dict) -> str:
+    """Build the Gemini prompt for a full roadmap."""
+    return f"""
+    You are an expert productivity and learning coach.
+
+    Given the following goal details, generate a detailed and actionable step-by-step roadmap to achieve the goal. 
+    Your response should be a JSON array where each item is an object with the following keys:
+    - 'title': a short, clear summary of the step
+    - 'description': a concise but helpful explanation of what needs to be done in that step
+
+    Instructions for roadmap generation:
+        1. Break down the goal into logical, progressive steps.
+        2. Ensure each step builds on the previous one and leads toward the final outcome.
+        3. Incorporate best practices from the relevant field (e.g., programming, design, writing).
+        4. Strictly design the roadmap so that all steps are distributed within the date range from today ({inputs['today']}) to the deadline ({inputs['deadline']}). Do not exceed the deadline.
+        5. If a deadline is provided, distribute the steps realistically and evenly across the available time.
+        6. Include milestones and checkpoints where applicable.
+        7. Focus on practical execution—suggest resources, tools, or actions that help achieve each step.
+
+    Formatting instructions:
+    - The 'description' field supports markdown formatting. You may use *italic*, **bold**, and line breaks (blank lines) for clarity.
+    - You can also combine **bold and *italic* together**.
+    - Line breaks in your response will be preserved.
+
+    Example description:
+    This is a step description.
+
+    It supports *italic* and **bold** text.
+
+    You can also combine **bold and *italic* together**.
+
+    Line breaks
+
+    are preserved.
+
+    Goal Details:
+    - Goal Title: {inputs['title']}
+    - Description: {inputs['description']}
+    - Category: {inputs['category']}
+    - Priority Level: {inputs['priority']}
+    - Today's Date: {inputs['today']}
+    - Deadline: {inputs['deadline']}
+
+    Return the output in the following format (as JSON):
+    [
+    {{
+        "title": "Step 1 Title",
+        "description": "Step 1 detailed description"
+    }},
+    ...
+    ]
+    """
+
+
+def remaining_prompt_inputs(goal: Goal, roadmap: Roadmap, today: Optional[date] = None) -> dict:
+    """Collect a compact progress summary for regenerating a roadmap's incomplete steps."""
+    steps = sorted(roadmap.steps, key=lambda step: step.order_index)
+    return {
+        "kind": "remaining",
+        "title": goal.title,
+        "category": goal.category,
+        "priority": goal.priority,
+        "completed": [step.title for step in steps if step.is_completed],
+        "remaining_count": sum(1 for step in steps if not step.is_completed),
+        "today": (today or date.today()).isoformat(),
+        "deadline": str(goal.deadline) if goal.deadline else 'No deadline specified',
+    }
+
+
+def build_remaining_prompt(inputs: dict) -> str:
+    """Build the Gemini prompt for the incomplete part of an existing roadmap.
+
+    Only completed step titles are sent, so the prompt stays small however long
+    the original roadmap was.
+    """
+    completed = "\n".join(f"    - {title}" for title in inputs['completed']) or "    - Nothing yet"
+    count_hint = (
+        f" The previous plan had {inputs['remaining_count']} remaining steps; use a similar number if it still fits."
+        if inputs['remaining_count'] else ""
+    )
+    return f"""
+    You are an expert productivity and learning coach.
+
+    A user is partway through a roadmap for the goal "{inputs['title']}" (category: {inputs['category']}, priority: {inputs['priority']}).
+    Steps already completed:
+{completed}
+
+    Generate only the remaining steps needed to reach the goal, building on the completed ones without repeating them.
+    Distribute them between today ({inputs['today']}) and the deadline ({inputs['deadline']}); do not exceed the deadline.{count_hint}
+
+    Return a JSON array where each item is an object with a short 'title' and a markdown 'description'.
+    """
+
+
+def build_repair_prompt(raw: str) -> str:
+    """Build a follow-up prompt asking Gemini to fix an unparseable response."""
+    return f"""
+    The following response was supposed to be a JSON array of roadmap steps, but it could not be parsed.
+    Each item must be an object with exactly two string keys: "title" and "description".
+
+    Return only the corrected JSON array, with no commentary and no code fences.
+
+    Response to fix:
+    {raw}
+    """
+
+
+def _strip_code_fences(raw: str) -> str:
+    # Clean Gemini response: robustly strip markdown code fences and language tags
+    cleaned = raw.strip()
+    # Remove code fences if present
+    if cleaned.startswith('```'):
+        # Remove the first line (``` or ```json) and the last line (```)
+        lines = cleaned.splitlines()
+        if len(lines) >= 3 and lines[0].startswith('```') and lines[-1].startswith('```'):
+            cleaned = '\n'.join(lines[1:-1])
+        else:
+            # fallback: remove all code fences using regex
+            cleaned = re.sub(r'^```[a-zA-Z]*\n|\n```$', '', cleaned)
+    return cleaned
+
+
+def _validate_steps(data) -> list:
+    """Check parsed data against RoadmapStepCreate and keep only the generated fields."""
+    if isinstance(data, dict):
+        # Accept a wrapper object such as {"steps": [...]}
+        data = next((value for value in data.values() if isinstance(value, list)), None)
+    if not isinstance(data, list) or not data:
+        raise RoadmapParseError("Gemini response did not contain a step array")
+    try:
+        return [
+            RoadmapStepCreate.model_validate(item).model_dump(include={"title", "description"})
+            for item in data
+        ]
+    except ValidationError as e:
+        raise RoadmapParseError(f"Gemini returned invalid steps: {e.error_count()} validation errors")
+
+
+def _find_step_array(text: str) -> Optional[list]:
+    """Decode the first '[' in text that starts a complete JSON array of objects.
+
+    Brackets in surrounding prose (e.g. "[3 steps]" or "[1]") are skipped.
+    """
+    decoder = json.JSONDecoder()
+    start = text.find('[')
+    while start != -1:
+        try:
+            value, _ = decoder.raw_decode(text, start)
+        except ValueError:
+            value = None
+        if isinstance(value, list) and value and all(isinstance(item, dict) for item in value):
+            return value
+        start = text.find('[', start + 1)
+    return None
+
+
+def _parse_steps(raw: str) -> Tuple[list, str]:
+    """Parse steps, returning them with how they were obtained ("direct" or "recovered")."""
+    cleaned = _strip_code_fences(raw)
+    try:
+        return _validate_steps(json.loads(cleaned)), "direct"
+    except (ValueError, RoadmapParseError) as e:
+        logger.info(
+            "Roadmap response is not a clean step array, scanning for steps",
+            extra={"error": f"{type(e).__name__}: {e}", **payload_fields("raw", raw)},
+        )
+
+    data = _find_step_array(cleaned)
+    if data is not None:
+        try:
+            return _validate_steps(data), "recovered"
+        except RoadmapParseError:
+            pass
+
+    # A truncated array still yields the step objects that were completed
+    try:
+        return _validate_steps(StepStreamParser().feed(raw)), "recovered"
+    except ValueError:
+        raise RoadmapParseError("Gemini response was not valid JSON")
+
+
+def parse_roadmap_steps(raw: str) -> list:
+    """Parse and validate the step array out of a Gemini response.
+
+    Falls back to scanning noisy text (prose, code fences, trailing notes) for
+    complete step objects. Raises RoadmapParseError if nothing valid is found.
+    """
+    return _parse_steps(raw)[0]
+
+
+def _parse_or_repair(raw: str, db: Session, user_id: int) -> list:
+    """Parse a response, spending at most one repair round trip if it is unusable."""
+    try:
+        steps, outcome = _parse_steps(raw)
+        parse_stats.count(outcome)
+        return steps
+    except RoadmapParseError:
+        parse_stats.count("repair_attempts")
+
+    repaired = generate_text(build_repair_prompt(raw), db, user_id, generation_config=ROADMAP_GENERATION_CONFIG)
+    try:
+        steps = parse_roadmap_steps(repaired['text'])
+    except RoadmapParseError:
+        parse_stats.count("failed")
+        raise
+    parse_stats.count("repaired")
+    return steps
+
+
+def generate_roadmap_steps(db: Session, goal: Goal, user_id: int, use_cache: bool = True) -> list:
+    """Generate roadmap steps for a goal, serving identical prompts from the generation cache."""
+    return _generate_steps_for_inputs(db, roadmap_prompt_inputs(goal), user_id, use_cache)
+
+
+def _generate_steps_for_inputs(
+    db: Session, inputs: dict, user_id: int, use_cache: bool, build_prompt=build_roadmap_prompt
+) -> list:
+    cache_key = make_cache_key(inputs)
+    if use_cache:
+        cached = roadmap_cache.get(cache_key)
+        if cached is not None:
+            return cached
+    else:
+        roadmap_cache.record_bypass()
+
+    result = generate_text(
+        build_prompt(inputs), db, user_id, generation_config=ROADMAP_GENERATION_CONFIG)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Gemini roadmap response", extra=payload_fields("raw", result['text']))
+    steps_data = _parse_or_repair(result['text'], db, user_id)
+    roadmap_cache.set(cache_key, steps_data)
+    return steps_data
+
+
+class StepStreamParser:
+    """Incrementally extract complete step objects from a streamed JSON array.
+
+    Text before the opening '[' (such as a markdown code fence) is skipped, and
+    each top-level object in the array is returned as soon as its closing brace
+    arrives. The array is the first '[' whose next non-blank character is '{',
+    so bracketed prose such as "[1]" does not start it.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._started = False
+        self._array_open = False
+        self._in_string = False
+        self._escape = False
+        self._object_start = None
+
+    def feed(self, text: str) -> list:
+        """Add streamed text and return any steps completed by it."""
+        self._buffer += text
+        buffer = self._buffer
+        steps = []
+        for i in range(self._pos, len(buffer)):
+            ch = buffer[i]
+            if not self._started:
+                if ch == '{' and self._array_open:
+                    self._started = True
+                    self._depth = 1
+                else:
+                    if ch == '[':
+                        self._array_open = True
+                    elif not ch.isspace():
+                        self._array_open = False
+                    continue
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in '[{':
+                if ch == '{' and self._depth == 1:
+                    self._object_start = i
+                self._depth += 1
+            elif ch in ']}':
+                self._depth -= 1
+                if ch == '}' and self._depth == 1 and self._object_start is not None:
+                    steps.append(json.loads(buffer[self._object_start:i + 1]))
+                    self._object_start = None
+        self._pos = len(buffer)
+        return steps
+
+
+def stream_roadmap_steps(db: Session, goal: Goal, user_id: int, use_cache: bool = True) -> Iterator[dict]:
+    """Yield roadmap steps for a goal one at a time as Gemini streams them.
+
+    Cached results are replayed immediately; a fully streamed result is stored
+    in the generation cache. Key and capacity errors are raised before the
+    iterator is returned.
+    """
+    inputs = roadmap_prompt_inputs(goal)
+    cache_key = make_cache_key(inputs)
+    if use_cache:
+        cached = roadmap_cache.get(cache_key)
+        if cached is not None:
+            return iter(cached)
+    else:
+        roadmap_cache.record_bypass()
+
+    chunks = stream_text(
+        build_roadmap_prompt(inputs), db, user_id, generation_config=ROADMAP_GENERATION_CONFIG)
+
+    def iterate() -> Iterator[dict]:
+        parser = StepStreamParser()
+        steps_data = []
+        try:
+            for chunk in chunks:
+                for step in parser.feed(chunk):
+                    steps_data.append(step)
+                    yield step
+        finally:
+            # Propagate an early close to the Gemini stream
+            chunks.close()
+        if steps_data:
+            roadmap_cache.set(cache_key, steps_data)
+
+    return iterate()
+
+
+def build_roadmap_create(goal: Goal, steps_data: list) -> RoadmapCreate:
+    """Wrap generated steps in a RoadmapCreate for the goal."""
+    return RoadmapCreate(
+        title=f"Roadmap for: {goal.title}",
+        description=f"Auto-generated roadmap for goal '{goal.title}'",
+        steps=[RoadmapStepCreate(**step) for step in steps_data]
+    )
+
+
+def generate_roadmap(db: Session, goal: Goal, user_id: int, use_cache: bool = True) -> Optional[Roadmap]:
+    """Generate and persist a roadmap for a goal.
+
+    Concurrent calls for the same user and goal share one Gemini call; callers
+    that joined an in-flight generation load the resulting roadmap in their own
+    session, waiting at most ROADMAP_FLIGHT_WAIT_SECONDS before raising
+    GenerationTimeoutError. Returns None if the goal already has a roadmap or
+    it could not be created.
+    """
+    created = {}
+
+    def run() -> Optional[int]:
+        # Checked inside the flight so a goal that already has a roadmap never reaches Gemini
+        if roadmap_crud.get_roadmap_by_goal(db, goal.id, user_id):
+            return None
+        steps_data = generate_roadmap_steps(db, goal, user_id, use_cache=use_cache)
+        db_roadmap = roadmap_crud.create_roadmap(
+            db, build_roadmap_create(goal, steps_data), goal.id, user_id)
+        created["roadmap"] = db_roadmap
+        return db_roadmap.id if db_roadmap else None
+
+    def existing() -> Optional[int]:
+        db_roadmap = roadmap_crud.get_roadmap_by_goal(db, goal.id, user_id)
+        return db_roadmap.id if db_roadmap else None
+
+    try:
+        roadmap_id = roadmap_flights.do(
+            (user_id, goal.id), run, on_remote=existing, timeout=ROADMAP_FLIGHT_WAIT_SECONDS)
+    except FlightWaitTimeout:
+        logger.warning("Gave up waiting for an in-flight roadmap generation", extra={"goal_id": goal.id})
+        raise GenerationTimeoutError(
+            "Another generation for this goal is still running, please retry shortly")
+    if "roadmap" in created:
+        return created["roadmap"]
+    if roadmap_id is None:
+        return None
+    return roadmap_crud.get_roadmap(db, roadmap_id, user_id)
+
+
+def regenerate_remaining_steps(
+    db: Session, roadmap: Roadmap, user_id: int, use_cache: bool = True
+) -> Optional[Roadmap]:
+    """Regenerate a roadmap's incomplete steps against the goal's current dates.
+
+    Completed steps are kept and summarised for Gemini by title only; the
+    incomplete steps are swapped for the new ones in one transaction. Returns
+    None if the roadmap could not be updated.
+    """
+    inputs = remaining_prompt_inputs(roadmap.goal, roadmap)
+    steps_data = _generate_steps_for_inputs(
+        db, inputs, user_id, use_cache, build_prompt=build_remaining_prompt)
+    return roadmap_crud.replace_incomplete_steps(
+        db, roadmap.id, [RoadmapStepCreate(**step) for step in steps_data], user_id)
+
+
+@contextmanager
+def _user_batch_slot(user_id: int):
+    """Hold one of the user's batch slots, removing the user's semaphore once nobody uses it."""
+    with _user_batch_slots_lock:
+        entry = _user_batch_slots.get(user_id)
+        if entry is None:
+            entry = _user_batch_slots[user_id] = [threading.BoundedSemaphore(ROADMAP_BATCH_USER_CONCURRENCY), 0]
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _user_batch_slots_lock:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _user_batch_slots[user_id]
+
+
+def _generate_steps_in_thread(inputs: dict, user_id: int, use_cache: bool) -> list:
+    """Generate steps on a fan-out thread, holding one of the user's batch slots."""
+    with _user_batch_slot(user_id):
+        db = SessionLocal()
+        try:
+            return _generate_steps_for_inputs(db, inputs, user_id, use_cache)
+        finally:
+            db.close()
+
+
+def generate_roadmaps_batch(
+    db: Session, goal_ids: List[int], user_id: int, use_cache: bool = True,
+    before_generate: Optional[Callable[[int], None]] = None
+) -> Dict[int, Tuple[Optional[int], Optional[str]]]:
+    """Generate roadmaps for several goals concurrently and save them in one transaction.
+
+    Goals that are missing or already have a roadmap are reported without
+    calling Gemini. before_generate, if given, is called with the number of
+    goals about to be generated (e.g. to charge a rate limit) and may raise
+    to abort the batch. Gemini calls fan out across threads, capped per user
+    by ROADMAP_BATCH_USER_CONCURRENCY. Returns goal_id -> (roadmap_id, error).
+    """
+    goal_ids = list(dict.fromkeys(goal_ids))
+    goals = {
+        goal.id: goal for goal in db.query(Goal).filter(
+            Goal.id.in_(goal_ids), Goal.user_id == user_id
+        )
+    }
+    existing = {
+        goal_id for (goal_id,) in db.query(Roadmap.goal_id).filter(Roadmap.goal_id.in_(list(goals)))
+    } if goals else set()
+    results: Dict[int, Tuple[Optional[int], Optional[str]]] = {}
+    for goal_id in goal_ids:
+        if goal_id not in goals:
+            results[goal_id] = (None, "Goal not found")
+        elif goal_id in existing:
+            results[goal_id] = (None, "Roadmap already exists")
+            del goals[goal_id]
+    if not goals:
+        return results
+    if before_generate is not None:
+        before_generate(len(goals))
+
+    with ThreadPoolExecutor(max_workers=min(ROADMAP_BATCH_USER_CONCURRENCY, len(goals))) as pool:
+        futures = {
+            # Copy the context so fan-out threads log with the request's correlation id
+            goal_id: pool.submit(
+                contextvars.copy_context().run,
+                _generate_steps_in_thread, roadmap_prompt_inputs(goal), user_id, use_cache,
+            )
+            for goal_id, goal in goals.items()
+        }
+
+    roadmaps_in = {}
+    for goal_id, future in futures.items():
+        try:
+            roadmaps_in[goal_id] = build_roadmap_create(goals[goal_id], future.result())
+        except Exception as e:
+            logger.warning(
+                "Batch roadmap generation failed for goal",
+                extra={"goal_id": goal_id, "user_id": user_id, "error": repr(e)},
+            )
+            results[goal_id] = (None, f"Gemini generation failed: {str(e)}")
+
+    if roadmaps_in:
+        created = roadmap_crud.create_roadmaps(db, roadmaps_in, user_id)
+        for goal_id, roadmap_id in created.items():
+            results[goal_id] = (roadmap_id, None) if roadmap_id else (None, "Roadmap already exists or failed to create")
+    return results
@@ -0,0 +1,239 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Tuple
+
+# Limiter backend: "memory" (per process) or "sqlite" (shared by worker processes on the host)
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_SQLITE_PATH = os.getenv("RATE_LIMIT_SQLITE_PATH", "./goalforge_ratelimit.db")
+
+# Buckets untouched for this long are dropped; they restart full, which is
+# where any class refilling within this window would be anyway
+RATE_LIMIT_BUCKET_IDLE_SECONDS = float(os.getenv("RATE_LIMIT_BUCKET_IDLE_SECONDS", "3600"))
+# How often a store looks for idle buckets
+_SWEEP_INTERVAL_SECONDS = 60
+
+# Longest Retry-After ever reported, e.g. for a class configured with no refill
+MAX_RETRY_AFTER_SECONDS = 3600
+
+# Default (burst, per-minute refill) for each endpoint class; AI calls are
+# limited separately from CRUD so a burst of generations cannot use up CRUD quota
+_DEFAULT_LIMITS = {
+    "ai": (10, 12),
+    "crud": (120, 600),
+}
+
+
+class BucketLimit:
+    """Token bucket parameters for one endpoint class."""
+
+    def __init__(self, burst: float, per_minute: float):
+        self.capacity = float(burst)
+        self.rate = per_minute / 60.0
+
+    def to_dict(self) -> dict:
+        return {"burst": self.capacity, "per_minute": self.rate * 60}
+
+
+def _load_limits() -> Dict[str, BucketLimit]:
+    limits = {}
+    for name, (burst, per_minute) in _DEFAULT_LIMITS.items():
+        prefix = f"RATE_LIMIT_{name.upper()}"
+        limits[name] = BucketLimit(
+            float(os.getenv(f"{prefix}_BURST", str(burst))),
+            float(os.getenv(f"{prefix}_PER_MINUTE", str(per_minute))),
+        )
+    return limits
+
+
+def _refill(tokens: float, updated_at: float, limit: BucketLimit, now: float) -> float:
+    return min(limit.capacity, tokens + max(0.0, now - updated_at) * limit.rate)
+
+
+def _take(tokens: float, limit: BucketLimit, cost: float) -> Tuple[bool, float, float]:
+    """Spend cost tokens if available. Returns (allowed, tokens_left, retry_after_seconds)."""
+    if tokens >= cost:
+        return True, tokens - cost, 0.0
+    retry_after = (cost - tokens) / limit.rate if limit.rate > 0 else MAX_RETRY_AFTER_SECONDS
+    return False, tokens, min(retry_after, MAX_RETRY_AFTER_SECONDS)
+
+
+class MemoryBucketStore:
+    """Token buckets held in this process."""
+
+    name = "memory"
+
+    def __init__(self, idle_seconds: float = RATE_LIMIT_BUCKET_IDLE_SECONDS):
+        self._buckets: Dict[str, list] = {}
+        self._lock = threading.Lock()
+        self.idle_seconds = idle_seconds
+        self._last_sweep = 0.0
+        self.evicted = 0
+
+    def _sweep(self, now: float):
+        """Drop idle buckets. Caller holds the lock."""
+        if now - self._last_sweep < _SWEEP_INTERVAL_SECONDS:
+            return
+        self._last_sweep = now
+        idle = [key for key, bucket in self._buckets.items() if now - bucket[1] >= self.idle_seconds]
+        for key in idle:
+            del self._buckets[key]
+        self.evicted += len(idle)
+
+    def take(self, key: str, limit: BucketLimit, cost: float, now: float) -> Tuple[bool, float, float]:
+        with self._lock:
+            self._sweep(now)
+            bucket = self._buckets.setdefault(key, [limit.capacity, now, 0, 0])
+            tokens = _refill(bucket[0], bucket[1], limit, now)
+            allowed, tokens, retry_after = _take(tokens, limit, cost)
+            bucket[0], bucket[1] = tokens, now
+            bucket[2 if allowed else 3] += 1
+            return allowed, tokens, retry_after
+
+    def peek(self, key: str, limit: BucketLimit, now: float) -> dict:
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                return {"tokens": limit.capacity, "allowed": 0, "limited": 0}
+            return {"tokens": _refill(bucket[0], bucket[1], limit, now), "allowed": bucket[2], "limited": bucket[3]}
+
+
+class SQLiteBucketStore:
+    """Token buckets in a SQLite file, shared by every worker process on the host."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str, idle_seconds: float = RATE_LIMIT_BUCKET_IDLE_SECONDS):
+        self.path = path
+        self.idle_seconds = idle_seconds
+        self._last_sweep = 0.0
+        self.evicted = 0
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS rate_buckets (
+                    bucket_key TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    allowed INTEGER NOT NULL DEFAULT 0,
+                    limited INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def take(self, key: str, limit: BucketLimit, cost: float, now: float) -> Tuple[bool, float, float]:
+        with self._connect() as conn:
+            # Take the write lock up front so concurrent workers serialize on the bucket
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT tokens, updated_at FROM rate_buckets WHERE bucket_key = ?", (key,)
+                ).fetchone()
+                tokens = limit.capacity if row is None else _refill(row[0], row[1], limit, now)
+                allowed, tokens, retry_after = _take(tokens, limit, cost)
+                conn.execute(
+                    """
+                    INSERT INTO rate_buckets (bucket_key, tokens, updated_at, allowed, limited)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(bucket_key) DO UPDATE SET
+                        tokens = excluded.tokens,
+                        updated_at = excluded.updated_at,
+                        allowed = allowed + excluded.allowed,
+                        limited = limited + excluded.limited
+                    """,
+                    (key, tokens, now, int(allowed), int(not allowed)),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self._sweep(conn, now)
+        return allowed, tokens, retry_after
+
+    def _sweep(self, conn, now: float):
+        """Delete idle buckets, at most once per sweep interval in this process."""
+        if now - self._last_sweep < _SWEEP_INTERVAL_SECONDS:
+            return
+        self._last_sweep = now
+        cursor = conn.execute("DELETE FROM rate_buckets WHERE updated_at < ?", (now - self.idle_seconds,))
+        self.evicted += cursor.rowcount
+
+    def peek(self, key: str, limit: BucketLimit, now: float) -> dict:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT tokens, updated_at, allowed, limited FROM rate_buckets WHERE bucket_key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return {"tokens": limit.capacity, "allowed": 0, "limited": 0}
+        return {"tokens": _refill(row[0], row[1], limit, now), "allowed": row[2], "limited": row[3]}
+
+
+class RateLimiter:
+    """Per-user token-bucket limiter with a separate bucket for each endpoint class."""
+
+    def __init__(self, store, limits: Dict[str, BucketLimit], enabled: bool = True):
+        self.store = store
+        self.limits = limits
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counts = {name: {"allowed": 0, "limited": 0} for name in limits}
+
+    def acquire(self, user_id: int, endpoint_class: str, cost: float = 1) -> Tuple[bool, float]:
+        """Spend cost tokens from the user's bucket. Returns (allowed, retry_after_seconds).
+
+        cost is capped at the bucket size, so a batch request can at most drain
+        a full bucket rather than being rejected forever.
+        """
+        if not self.enabled:
+            return True, 0.0
+        limit = self.limits[endpoint_class]
+        allowed, _, retry_after = self.store.take(
+            f"{user_id}:{endpoint_class}", limit, min(float(cost), limit.capacity), time.time())
+        with self._lock:
+            self._counts[endpoint_class]["allowed" if allowed else "limited"] += 1
+        return allowed, retry_after
+
+    def usage(self, user_id: int) -> dict:
+        """Remaining tokens and allowed/limited counters for each of the user's buckets."""
+        now = time.time()
+        usage = {}
+        for name, limit in self.limits.items():
+            bucket = self.store.peek(f"{user_id}:{name}", limit, now)
+            usage[name] = {**limit.to_dict(), **bucket, "tokens": round(bucket["tokens"], 2)}
+        return usage
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = {name: dict(values) for name, values in self._counts.items()}
+        return {
+            "enabled": self.enabled,
+            "backend": self.store.name,
+            "evicted_buckets": self.store.evicted,
+            "limits": {name: limit.to_dict() for name, limit in self.limits.items()},
+            "requests": counts,
+        }
+
+
+def make_rate_limiter() -> RateLimiter:
+    """Build the limiter configured by RATE_LIMIT_* environment variables."""
+    if RATE_LIMIT_BACKEND == "sqlite":
+        store = SQLiteBucketStore(RATE_LIMIT_SQLITE_PATH)
+    elif RATE_LIMIT_BACKEND == "memory":
+        store = MemoryBucketStore()
+    else:
+        raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {RATE_LIMIT_BACKEND}")
+    return RateLimiter(store, _load_limits(), enabled=RATE_LIMIT_ENABLED)
+
+
+rate_limiter = make_rate_limiter()
@@ -44,6 +44,7 @@ class Goal(GoalBase):
     id: int
     created_at: datetime
     updated_at: datetime
+    search_snippet: Optional[str] = None  # Highlighted match, only on search results
 
     class Config:
         from_attributes = True
@@ -56,9 +57,10 @@ class GoalResponse(BaseModel):
 
 class GoalsListResponse(BaseModel):
     data: list[Goal]
-    total: int
+    total: Optional[int] = None  # Omitted when the request sets include_total=false
     page: int
     page_size: int
+    next_cursor: Optional[str] = None  # Pass as cursor to fetch the next page; None on the last page
     message: str = "Success"
 
 
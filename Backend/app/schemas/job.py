@@ -0,0 +1,28 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+from app.models.job import JobStatus
+from app.schemas.roadmap import Roadmap
+
+
+class Job(BaseModel):
+    id: str
+    kind: str
+    status: JobStatus
+    goal_id: int
+    roadmap_id: Optional[int] = None
+    error: Optional[str] = None
+    attempts: int
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class JobResponse(BaseModel):
+    data: Job
+    result: Optional[Roadmap] = None
+    message: str = "Success"
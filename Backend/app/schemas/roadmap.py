@@ -48,6 +48,8 @@ class RoadmapUpdate(BaseModel):
 class Roadmap(RoadmapBase):
     id: int
     goal_id: int
+    total_steps: int = 0
+    completed_steps: int = 0
     progress_percentage: float
     steps: List[RoadmapStep] = []
     created_at: datetime
@@ -55,3 +57,21 @@ class Roadmap(RoadmapBase):
 
     class Config:
         from_attributes = True
+
+
+class RoadmapBatchGenerateRequest(BaseModel):
+    goal_ids: List[int] = Field(..., min_length=1, max_length=50)
+
+
+class RoadmapBatchResult(BaseModel):
+    goal_id: int
+    success: bool
+    roadmap_id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class RoadmapBatchGenerateResponse(BaseModel):
+    data: List[RoadmapBatchResult]
+    succeeded: int
+    failed: int
+    message: str = "Success"
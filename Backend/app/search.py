@@ -0,0 +1,196 @@
+"""
+Full-text search over goal titles and descriptions.
+
+SQLite uses an external-content FTS5 table (goals_fts) kept in sync with
+goals by triggers; Postgres uses a generated tsvector column with a GIN
+index. Both are installed by the startup migrations, which also record the
+backend in use. Other databases, or SQLite builds without FTS5, fall back
+to ILIKE matching without ranking or snippets.
+"""
+import logging
+import os
+import re
+from typing import Optional, Tuple
+from sqlalchemy import func, literal_column, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.sql import column, table
+from app.models.goal import Goal
+
+logger = logging.getLogger(__name__)
+
+# Use the full-text index for the goal listing's search parameter when available
+GOAL_SEARCH_ENABLED = os.getenv("GOAL_SEARCH_ENABLED", "true").lower() == "true"
+GOAL_SEARCH_SNIPPET_WORDS = int(os.getenv("GOAL_SEARCH_SNIPPET_WORDS", "16"))
+
+# Snippets are markdown: matches are wrapped in ** and any * or \ already in
+# the goal text is backslash-escaped, so only the highlights render as bold.
+# The database marks matches with private-use characters, which are swapped
+# for ** after escaping.
+SNIPPET_BOLD = "**"
+SNIPPET_ELLIPSIS = "…"
+_MATCH_START = "\ue000"
+_MATCH_END = "\ue001"
+
+# Relative weight of title over description matches in the SQLite ranking
+TITLE_WEIGHT = 4.0
+DESCRIPTION_WEIGHT = 1.0
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# "fts5", "tsvector" or None (ILIKE fallback); set by install_goal_search
+_backend: Optional[str] = None
+
+_goals_fts = table("goals_fts", column("rowid"))
+_FTS = literal_column("goals_fts")
+_SEARCH_VECTOR = literal_column("goals.search_vector")
+_TS_CONFIG = literal_column("'simple'::regconfig")
+
+_SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS goals_fts USING fts5(
+        title, description, content='goals', content_rowid='id', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS goals_fts_ai AFTER INSERT ON goals BEGIN
+        INSERT INTO goals_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS goals_fts_ad AFTER DELETE ON goals BEGIN
+        INSERT INTO goals_fts(goals_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS goals_fts_au AFTER UPDATE OF title, description ON goals BEGIN
+        INSERT INTO goals_fts(goals_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO goals_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END
+    """,
+]
+
+_POSTGRES_DDL = [
+    """
+    ALTER TABLE goals ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_goals_search_vector ON goals USING GIN (search_vector)",
+]
+
+
+def _install_sqlite(conn: Connection) -> Optional[str]:
+    exists = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'goals_fts'")
+    ).first() is not None
+    try:
+        for statement in _SQLITE_DDL:
+            conn.execute(text(statement))
+    except DBAPIError as e:
+        # Typically "no such module: fts5" on SQLite builds without it
+        logger.warning("SQLite FTS5 unavailable, goal search falls back to ILIKE", extra={"error": str(e)})
+        return None
+    if not exists:
+        conn.execute(text("INSERT INTO goals_fts(goals_fts) VALUES ('rebuild')"))
+        logger.info("Created and populated goals_fts")
+    return "fts5"
+
+
+def _install_postgres(conn: Connection) -> Optional[str]:
+    try:
+        # Savepoint, so a server without generated columns (before 12) leaves the migration usable
+        with conn.begin_nested():
+            for statement in _POSTGRES_DDL:
+                conn.execute(text(statement))
+    except DBAPIError as e:
+        logger.warning("tsvector search unavailable, goal search falls back to ILIKE", extra={"error": str(e)})
+        return None
+    return "tsvector"
+
+
+def install_goal_search(conn: Connection):
+    """Migration step: create the full-text index for the connection's dialect and record the backend."""
+    global _backend
+    if not GOAL_SEARCH_ENABLED:
+        _backend = None
+        return
+
+    installers = {"sqlite": _install_sqlite, "postgresql": _install_postgres}
+    installer = installers.get(conn.dialect.name)
+    _backend = installer(conn) if installer else None
+
+
+def _terms(search: str) -> list:
+    return _TOKEN_RE.findall(search)
+
+
+def fts5_query(search: str) -> str:
+    """FTS5 MATCH expression requiring every word, each as a prefix."""
+    return " ".join('"{}"*'.format(term) for term in _terms(search))
+
+
+def tsquery_text(search: str) -> str:
+    """to_tsquery input requiring every word, each as a prefix."""
+    return " & ".join(f"{term}:*" for term in _terms(search))
+
+
+def apply_goal_search(query, search: str) -> Tuple[object, Optional[list], Optional[object]]:
+    """Restrict a goal Query or Select to goals matching search.
+
+    Returns (query, order_by, snippet): order_by ranks the best matches first
+    and snippet is a column expression for a highlighted excerpt; both are
+    None when the ILIKE fallback is used.
+    """
+    if _backend is None or not _terms(search):
+        return query.filter(
+            Goal.title.ilike(f"%{search}%") |
+            Goal.description.ilike(f"%{search}%")
+        ), None, None
+
+    if _backend == "fts5":
+        query = query.join(_goals_fts, _goals_fts.c.rowid == Goal.id).filter(
+            _FTS.op("MATCH")(fts5_query(search))
+        )
+        order_by = [func.bm25(_FTS, TITLE_WEIGHT, DESCRIPTION_WEIGHT)]
+        snippet = func.snippet(
+            _FTS, -1, _MATCH_START, _MATCH_END, SNIPPET_ELLIPSIS, GOAL_SEARCH_SNIPPET_WORDS
+        )
+        return query, order_by, snippet
+
+    tsquery = func.to_tsquery(_TS_CONFIG, tsquery_text(search))
+    query = query.filter(_SEARCH_VECTOR.op("@@")(tsquery))
+    order_by = [func.ts_rank_cd(_SEARCH_VECTOR, tsquery).desc()]
+    snippet = func.ts_headline(
+        _TS_CONFIG,
+        func.concat_ws(" — ", Goal.title, Goal.description),
+        tsquery,
+        f"StartSel={_MATCH_START}, StopSel={_MATCH_END}, FragmentDelimiter={SNIPPET_ELLIPSIS}, "
+        f"MaxFragments=1, MaxWords={GOAL_SEARCH_SNIPPET_WORDS}, MinWords=4",
+    )
+    return query, order_by, snippet
+
+
+def render_snippet(snippet: Optional[str]) -> Optional[str]:
+    """Turn a database snippet into markdown with the matches in bold."""
+    if snippet is None:
+        return None
+    escaped = snippet.replace("\\", "\\\\").replace("*", "\\*")
+    return escaped.replace(_MATCH_START, SNIPPET_BOLD).replace(_MATCH_END, SNIPPET_BOLD)
+
+
+def attach_snippets(rows) -> list:
+    """Unpack (Goal, snippet) rows, keeping each rendered snippet on its goal as search_snippet."""
+    goals = []
+    for goal, snippet in rows:
+        goal.search_snippet = render_snippet(snippet)
+        goals.append(goal)
+    return goals
+
+
+def search_stats() -> dict:
+    return {"enabled": GOAL_SEARCH_ENABLED, "backend": _backend or "ilike"}
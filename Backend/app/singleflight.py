@@ -0,0 +1,184 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Hashable, Optional
+
+# Coalescing mode: "local" (threads in this process) or "sqlite" (also across worker processes)
+SINGLEFLIGHT_MODE = os.getenv("SINGLEFLIGHT_MODE", "local")
+SINGLEFLIGHT_SQLITE_PATH = os.getenv("SINGLEFLIGHT_SQLITE_PATH", "./goalforge_locks.db")
+SINGLEFLIGHT_LOCK_TTL_SECONDS = float(os.getenv("SINGLEFLIGHT_LOCK_TTL_SECONDS", "300"))
+
+
+class FlightWaitTimeout(TimeoutError):
+    """Raised when a coalesced caller stops waiting for another caller's call, which carries on."""
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SQLiteFlightLock:
+    """Advisory lock rows in a SQLite file, shared by every worker process on the host."""
+
+    def __init__(self, path: str, ttl: float, poll_interval: float = 0.2):
+        self.path = path
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS flight_locks (
+                    lock_key TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+                """
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def try_acquire(self, key: str, owner: str) -> bool:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM flight_locks WHERE lock_key = ? AND expires_at <= ?", (key, now))
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO flight_locks (lock_key, owner, expires_at) VALUES (?, ?, ?)",
+                (key, owner, now + self.ttl),
+            )
+            return cursor.rowcount == 1
+
+    def wait_released(self, key: str, timeout: Optional[float] = None) -> bool:
+        """Block until the lock is released or expires. Returns False if timeout ran out first."""
+        limit = self.ttl if timeout is None else min(self.ttl, timeout)
+        deadline = time.time() + limit
+        while time.time() < deadline:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT expires_at FROM flight_locks WHERE lock_key = ?", (key,)
+                ).fetchone()
+            if row is None or row[0] <= time.time():
+                return True
+            time.sleep(self.poll_interval)
+        # Waiting the full TTL means the lock has expired by now
+        return limit >= self.ttl
+
+    def release(self, key: str, owner: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM flight_locks WHERE lock_key = ? AND owner = ?", (key, owner))
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into a single execution.
+
+    The first caller for a key runs fn; callers arriving while it is in flight
+    wait and receive the same result (or exception). With a cross-process lock,
+    a caller that finds another process holding the key waits for it to finish
+    and then calls on_remote (falling back to fn if that returns None).
+    A caller waits at most timeout seconds for someone else's call before
+    raising FlightWaitTimeout.
+    """
+
+    def __init__(self, process_lock: Optional[SQLiteFlightLock] = None):
+        self.process_lock = process_lock
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.remote_waits = 0
+        self.wait_timeouts = 0
+
+    def _wait_timed_out(self, key: Hashable, timeout: float):
+        with self._lock:
+            self.wait_timeouts += 1
+        raise FlightWaitTimeout(f"Call for {key!r} still in flight after {timeout:g} seconds")
+
+    def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], Any],
+        on_remote: Optional[Callable[[], Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            if not call.done.wait(timeout):
+                self._wait_timed_out(key, timeout)
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._run_leader(key, fn, on_remote, timeout)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def _run_leader(
+        self, key: Hashable, fn: Callable[[], Any], on_remote: Optional[Callable[[], Any]], timeout: Optional[float]
+    ) -> Any:
+        if self.process_lock is None:
+            return fn()
+
+        lock_key = repr(key)
+        owner = uuid.uuid4().hex
+        if not self.process_lock.try_acquire(lock_key, owner):
+            with self._lock:
+                self.remote_waits += 1
+            if not self.process_lock.wait_released(lock_key, timeout):
+                self._wait_timed_out(key, timeout)
+            if on_remote is not None:
+                result = on_remote()
+                if result is not None:
+                    return result
+            if not self.process_lock.try_acquire(lock_key, owner):
+                # Another process took the key again; run without the lock rather than wait indefinitely
+                return fn()
+
+        try:
+            return fn()
+        finally:
+            self.process_lock.release(lock_key, owner)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "mode": "sqlite" if self.process_lock else "local",
+                "in_flight": len(self._calls),
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+                "remote_waits": self.remote_waits,
+                "wait_timeouts": self.wait_timeouts,
+            }
+
+
+def make_single_flight() -> SingleFlight:
+    """Create a SingleFlight using the mode configured by SINGLEFLIGHT_MODE."""
+    if SINGLEFLIGHT_MODE == "sqlite":
+        return SingleFlight(SQLiteFlightLock(SINGLEFLIGHT_SQLITE_PATH, SINGLEFLIGHT_LOCK_TTL_SECONDS))
+    return SingleFlight()
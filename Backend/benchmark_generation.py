@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+End-to-end load benchmark for the GoalForge generation endpoints
+
+Start the server against the fake LLM backend first, for example:
+
+    LLM_BACKEND=fake FAKE_LLM_LATENCY_MS=800 RATE_LIMIT_ENABLED=false uvicorn app.main:app --port 8000
+
+then run:
+
+    python benchmark_generation.py --endpoint roadmap --concurrency 16 --requests 200
+"""
+import argparse
+import math
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def create_benchmark_user(base_url):
+    """Register a throwaway user with a placeholder Gemini key and return auth headers"""
+    name = f"bench_{uuid.uuid4().hex[:10]}"
+    password = uuid.uuid4().hex
+    email = f"{name}@example.com"
+    requests.post(f"{base_url}/auth/register", json={"email": email, "username": name, "password": password}).raise_for_status()
+    response = requests.post(f"{base_url}/auth/login", json={"email": email, "password": password})
+    response.raise_for_status()
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    requests.put(f"{base_url}/auth/gemini-key", json={"gemini_api_key": "fake-benchmark-key"}, headers=headers).raise_for_status()
+    return headers
+
+
+def create_goals(base_url, headers, count):
+    """Create goals to generate roadmaps for (each goal can only have one roadmap)"""
+    goal_ids = []
+    for i in range(count):
+        response = requests.post(
+            f"{base_url}/api/goals/",
+            json={"title": f"Benchmark goal {i} {uuid.uuid4().hex[:6]}", "category": "Benchmark", "deadline": "2030-01-01"},
+            headers=headers,
+        )
+        response.raise_for_status()
+        goal_ids.append(response.json()["data"]["id"])
+    return goal_ids
+
+
+class MetricsSampler(threading.Thread):
+    """Poll /metrics during the run and keep the peak pool usage"""
+
+    def __init__(self, base_url, interval=0.25):
+        super().__init__(daemon=True)
+        self.base_url = base_url
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.peak_db_checked_out = 0
+        self.peak_generation_in_flight = 0
+        self.peak_generation_queue = 0
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                metrics = requests.get(f"{self.base_url}/metrics", timeout=2).json()
+                self.peak_db_checked_out = max(self.peak_db_checked_out, metrics["database_pool"].get("checkedout", 0))
+                pool = metrics["generation_pool"]
+                self.peak_generation_in_flight = max(self.peak_generation_in_flight, pool["in_flight"])
+                self.peak_generation_queue = max(self.peak_generation_queue, pool["queue_depth"])
+            except (requests.RequestException, KeyError, ValueError):
+                pass
+            self.stop_event.wait(self.interval)
+
+
+def run_benchmark(base_url, endpoint, concurrency, total_requests):
+    headers = create_benchmark_user(base_url)
+    goal_ids = create_goals(base_url, headers, total_requests) if endpoint == "roadmap" else []
+
+    def call(i):
+        started = time.perf_counter()
+        if endpoint == "roadmap":
+            response = requests.post(f"{base_url}/roadmaps/generate/{goal_ids[i]}?cache=bypass", headers=headers)
+        else:
+            response = requests.get(f"{base_url}/gemini", params={"query": f"Benchmark prompt {i}"}, headers=headers)
+        return time.perf_counter() - started, response.status_code
+
+    sampler = MetricsSampler(base_url)
+    sampler.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(call, range(total_requests)))
+    elapsed = time.perf_counter() - started
+    sampler.stop_event.set()
+    sampler.join()
+
+    latencies = [latency for latency, code in results if code < 400]
+    errors = {}
+    for _, code in results:
+        if code >= 400:
+            errors[code] = errors.get(code, 0) + 1
+
+    print(f"Endpoint:        {endpoint}")
+    print(f"Concurrency:     {concurrency}")
+    print(f"Requests:        {total_requests} ({len(latencies)} ok, errors by status: {errors or 'none'})")
+    print(f"Throughput:      {len(latencies) / elapsed:.2f} req/s over {elapsed:.2f}s")
+    if latencies:
+        print(f"Latency p50:     {percentile(latencies, 50) * 1000:.1f} ms")
+        print(f"Latency p95:     {percentile(latencies, 95) * 1000:.1f} ms")
+        print(f"Latency p99:     {percentile(latencies, 99) * 1000:.1f} ms")
+        print(f"Latency mean:    {statistics.mean(latencies) * 1000:.1f} ms")
+    print(f"Peak DB connections checked out: {sampler.peak_db_checked_out}")
+    print(f"Peak generation calls in flight: {sampler.peak_generation_in_flight}")
+    print(f"Peak generation queue depth:     {sampler.peak_generation_queue}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark GoalForge generation endpoints")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--endpoint", choices=["gemini", "roadmap"], default="roadmap")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=100)
+    args = parser.parse_args()
+    run_benchmark(args.base_url.rstrip("/"), args.endpoint, args.concurrency, args.requests)
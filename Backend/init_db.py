@@ -2,6 +2,7 @@
 """
 Database initialization script for GoalForge
 """
+import argparse
 import os
 import sys
 from pathlib import Path
@@ -12,12 +13,26 @@ sys.path.insert(0, str(backend_dir))
 
 from app.database import Base, engine
 from app.models.auth import User  # Import all models to ensure they're registered
+from app.migrations import run_migrations, rebuild_user_goal_stats
 
 def init_db():
     """Initialize the database by creating all tables"""
     print("Creating database tables...")
     Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
     print("Database tables created successfully!")
 
+def rebuild_goal_stats():
+    """Recompute the per-user goal counts behind /api/goals/stats from the goals table"""
+    with engine.begin() as conn:
+        rows = rebuild_user_goal_stats(conn)
+    print(f"Rebuilt user_goal_stats ({rows} rows)")
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rebuild-goal-stats", action="store_true",
+                        help="Also recompute user_goal_stats from the goals table")
+    args = parser.parse_args()
     init_db()
+    if args.rebuild_goal_stats:
+        rebuild_goal_stats()
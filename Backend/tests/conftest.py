@@ -0,0 +1,46 @@
+import os
+import tempfile
+
+# Point every database the app opens at a throwaway directory before any app
+# module reads its settings
+_tmp_dir = tempfile.mkdtemp(prefix="goalforge-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp_dir}/goalforge.db"
+os.environ["RATE_LIMIT_SQLITE_PATH"] = os.path.join(_tmp_dir, "ratelimit.db")
+os.environ["SINGLEFLIGHT_SQLITE_PATH"] = os.path.join(_tmp_dir, "locks.db")
+
+import pytest
+from sqlalchemy import text
+
+from app.database import Base, SessionLocal, engine
+from app.migrations import run_migrations
+from app.models.auth import User
+from app.models.goal import Goal, UserGoalStats
+from app.models.job import GenerationJob
+from app.models.roadmap import Roadmap, RoadmapStep
+
+Base.metadata.create_all(bind=engine)
+run_migrations(engine)
+
+# Children first, so foreign keys never point at a deleted row
+_TABLES = [GenerationJob, RoadmapStep, Roadmap, UserGoalStats, Goal, User]
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.close()
+        with engine.begin() as conn:
+            for model in _TABLES:
+                conn.execute(text(f"DELETE FROM {model.__tablename__}"))
+
+
+@pytest.fixture
+def user(db):
+    user = User(email="ada@example.com", username="ada", hashed_password="not-a-hash")
+    db.add(user)
+    db.commit()
+    return user
@@ -0,0 +1,84 @@
+import asyncio
+
+from app.auth import crud_async as user_crud_async
+from app.crud import goal_async
+from app.crud.goal import get_goal_stats
+from app.crud.roadmap_async import async_roadmap_crud, async_roadmap_step_crud
+from app.database import dispose_async_engine, get_async_session_factory
+from app.schemas.goal import GoalCreate, GoalUpdate
+from app.schemas.roadmap import RoadmapCreate, RoadmapStepCreate, RoadmapStepUpdate
+
+
+def _run(fn):
+    """Run fn(session) on a fresh AsyncSession, closing the async engine with the event loop."""
+    async def main():
+        try:
+            async with get_async_session_factory()() as session:
+                return await fn(session)
+        finally:
+            await dispose_async_engine()
+    return asyncio.run(main())
+
+
+def test_goal_writes_keep_stats_and_category_key_in_step(db, user):
+    async def scenario(session):
+        goal = await goal_async.create_goal(session, GoalCreate(title="Read", category=" Books "), user.id)
+        await goal_async.create_goal(session, GoalCreate(title="Write", category="books"), user.id)
+        updated = await goal_async.update_goal(
+            session, goal.id, user.id, GoalUpdate(category="Learning", status="completed"))
+        goals, total, _ = await goal_async.get_goals(session, user.id, category="LEARNING")
+        return updated, goals, total, await goal_async.get_goal_stats(session, user.id), \
+            await goal_async.get_goal_facets(session, user.id)
+
+    updated, goals, total, stats, facets = _run(scenario)
+
+    assert updated.category_key == "learning"
+    assert [goal.id for goal in goals] == [updated.id] and total == 1
+    assert stats == get_goal_stats(db, user.id)
+    assert stats["by_category"] == {"books": 1, "learning": 1}
+    assert {facet["key"]: facet["count"] for facet in facets["categories"]} == {"books": 1, "learning": 1}
+
+
+def test_goal_listing_cursor_pages_through_every_goal(user):
+    async def scenario(session):
+        for i in range(5):
+            await goal_async.create_goal(session, GoalCreate(title=f"Goal {i}", category="Work"), user.id)
+        seen, cursor = [], None
+        while True:
+            page, _, cursor = await goal_async.get_goals(session, user.id, limit=2, cursor=cursor)
+            seen.extend(goal.title for goal in page)
+            if cursor is None:
+                return seen
+
+    assert sorted(_run(scenario)) == [f"Goal {i}" for i in range(5)]
+
+
+def test_step_writes_keep_roadmap_counters_in_step(user):
+    async def scenario(session):
+        goal = await goal_async.create_goal(session, GoalCreate(title="Learn piano", category="Music"), user.id)
+        roadmap = await async_roadmap_crud.create_roadmap(session, RoadmapCreate(
+            title="Piano", steps=[RoadmapStepCreate(title=f"Step {i}") for i in range(3)]
+        ), goal.id, user.id)
+        first, second, third = await async_roadmap_step_crud.get_steps_by_roadmap(session, roadmap.id, user.id)
+        await async_roadmap_step_crud.toggle_step_completion(session, first.id, user.id)
+        await async_roadmap_step_crud.update_step(
+            session, second.id, RoadmapStepUpdate(is_completed=True), user.id)
+        await async_roadmap_step_crud.delete_step(session, third.id, user.id)
+        return await async_roadmap_crud.get_roadmap(session, roadmap.id, user.id)
+
+    roadmap = _run(scenario)
+
+    assert (roadmap.total_steps, roadmap.completed_steps) == (2, 2)
+    assert [step.is_completed for step in roadmap.steps] == [True, True]
+
+
+def test_user_lookup_and_key_round_trip(user):
+    async def scenario(session):
+        await user_crud_async.update_user_gemini_key(session, user.id, "secret-key")
+        found = await user_crud_async.get_user_by_username(session, "ada")
+        return found, await user_crud_async.get_user_gemini_key(session, user.id)
+
+    found, api_key = _run(scenario)
+
+    assert found.id == user.id
+    assert api_key == "secret-key"
@@ -0,0 +1,134 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import func
+
+from app.crud import goal as goal_crud
+from app.database import SessionLocal
+from app.models.goal import Goal, GoalStatus, UserGoalStats, normalize_category
+from app.schemas.goal import GoalCreate, GoalUpdate
+
+
+def _materialized_stats(db, user_id) -> dict:
+    rows = db.query(
+        UserGoalStats.status, UserGoalStats.priority, UserGoalStats.category, UserGoalStats.goal_count
+    ).filter(UserGoalStats.user_id == user_id, UserGoalStats.goal_count != 0)
+    return {(status, priority, category): count for status, priority, category, count in rows}
+
+
+def _aggregated_stats(db, user_id) -> dict:
+    rows = db.query(
+        Goal.status, Goal.priority, Goal.category_key, func.count(Goal.id)
+    ).filter(Goal.user_id == user_id).group_by(Goal.status, Goal.priority, Goal.category_key)
+    return {
+        (status.value, priority.value, category): count for status, priority, category, count in rows
+    }
+
+
+def _create(db, user, **fields) -> Goal:
+    data = {"title": "Run a marathon", "category": "Health"}
+    data.update(fields)
+    return goal_crud.create_goal(db, GoalCreate(**data), user.id)
+
+
+def test_stats_follow_creates_updates_and_deletes(db, user):
+    first = _create(db, user)
+    second = _create(db, user, category=" health ", priority="high")
+    _create(db, user, category="Work")
+
+    goal_crud.update_goal(db, first.id, user.id, GoalUpdate(status="completed"))
+    goal_crud.update_goal(db, second.id, user.id, GoalUpdate(category="Fitness", title="Swim"))
+    goal_crud.delete_goal(db, first.id, user.id)
+
+    assert _materialized_stats(db, user.id) == _aggregated_stats(db, user.id)
+    stats = goal_crud.get_goal_stats(db, user.id)
+    assert stats["total_goals"] == 2
+    assert stats["by_category"] == {"fitness": 1, "work": 1}
+
+
+def test_update_rereads_goal_changed_by_a_concurrent_write(db, user, monkeypatch):
+    goal = _create(db, user)
+    read_goal = goal_crud._read_goal_for_write
+    calls = []
+
+    def read_then_race(session, goal_id, user_id):
+        db_goal = read_goal(session, goal_id, user_id)
+        calls.append(session)
+        if len(calls) == 1:
+            # Another request moves the goal between this read and the stats write
+            other = SessionLocal()
+            goal_crud.update_goal(other, goal_id, user_id, GoalUpdate(priority="low"))
+            other.close()
+        return db_goal
+
+    monkeypatch.setattr(goal_crud, "_read_goal_for_write", read_then_race)
+    updated = goal_crud.update_goal(db, goal.id, user.id, GoalUpdate(status="paused"))
+
+    # Our read, the concurrent request's read, then our re-read after the mismatch
+    assert calls == [db, calls[1], db]
+    assert updated.status == GoalStatus.paused
+    assert updated.priority.value == "low"
+    assert _materialized_stats(db, user.id) == {("paused", "low", normalize_category("Health")): 1}
+
+
+def test_write_gives_up_with_conflict_and_leaves_stats_intact(db, user, monkeypatch):
+    goal = _create(db, user)
+    monkeypatch.setattr(goal_crud, "_current_stats_key", lambda session, goal_id: ("overdue", "low", "x"))
+
+    with pytest.raises(goal_crud.GoalWriteConflictError):
+        goal_crud.update_goal(db, goal.id, user.id, GoalUpdate(status="completed"))
+    with pytest.raises(goal_crud.GoalWriteConflictError):
+        goal_crud.delete_goal(db, goal.id, user.id)
+    db.rollback()
+
+    assert _materialized_stats(db, user.id) == _aggregated_stats(db, user.id)
+
+
+def test_cursor_round_trips_and_rejects_garbage():
+    goal = Goal(id=42, updated_at=datetime(2024, 5, 1, 12, 30, 15, 250))
+
+    assert goal_crud.decode_goal_cursor(goal_crud.encode_goal_cursor(goal)) == (goal.updated_at, 42)
+    with pytest.raises(goal_crud.InvalidCursorError):
+        goal_crud.decode_goal_cursor("not-a-cursor")
+
+
+def test_cursor_pages_match_stored_timestamps_with_and_without_microseconds(db, user):
+    goals = [_create(db, user, title=f"Goal {i}") for i in range(6)]
+    # Server defaults store whole seconds; explicitly set values keep their microseconds
+    for goal, stamp in zip(goals[:3], ["2024-05-01 12:00:00.500000", "2024-05-01 12:00:00.500000", "2024-05-01 12:00:00"]):
+        db.query(Goal).filter(Goal.id == goal.id).update(
+            {Goal.updated_at: datetime.fromisoformat(stamp)}, synchronize_session=False)
+    db.commit()
+
+    seen, cursor = [], None
+    # Bounded, so a cursor that fails to move past its page fails instead of looping
+    for _ in range(len(goals)):
+        page, _, cursor = goal_crud.get_goals(db, user.id, limit=2, cursor=cursor, include_total=False)
+        seen.extend(goal.id for goal in page)
+        if cursor is None:
+            break
+
+    expected = [goal.id for goal in db.query(Goal).order_by(Goal.updated_at.desc(), Goal.id.desc())]
+    assert seen == expected and len(seen) == 6
+    assert str(goal_crud._updated_at_param(db, datetime(2024, 5, 1, 12, 0, 0, 500000)).value) == \
+        "2024-05-01 12:00:00.500000"
+
+
+def test_category_key_groups_facets_and_filters_ignoring_case_and_spacing(db, user):
+    _create(db, user, category="Health")
+    _create(db, user, category="  health ")
+    _create(db, user, category="Home 100%", status="completed")
+    _create(db, user, category="Home 1000")
+
+    facets = goal_crud.get_goal_facets(db, user.id)
+    assert [(facet["key"], facet["label"], facet["count"]) for facet in facets["categories"]] == [
+        ("health", "  health ", 2), ("home 100%", "Home 100%", 1), ("home 1000", "Home 1000", 1),
+    ]
+    assert facets["total"] == 4 and facets["status"]["completed"] == 1
+
+    assert goal_crud.get_goals(db, user.id, category="HEALTH")[1] == 2
+    # LIKE wildcards in a prefix match literally
+    assert [goal.category for goal in goal_crud.get_goals(db, user.id, category_prefix="home 100%")[0]] == ["Home 100%"]
+
+    goal_crud.delete_goal(db, goal_crud.get_goals(db, user.id, category="home 1000")[0][0].id, user.id)
+    assert [facet["key"] for facet in goal_crud.get_goal_facets(db, user.id)["categories"]] == ["health", "home 100%"]
@@ -0,0 +1,37 @@
+import asyncio
+import os
+
+import pytest
+from PIL import Image
+
+from app.models import image_store
+
+
+@pytest.fixture
+def legacy_path(tmp_path, monkeypatch):
+    path = tmp_path / "image.jpg"
+    monkeypatch.setattr(image_store, "LEGACY_IMAGE_PATH", path)
+    return path
+
+
+def test_legacy_image_is_prepared_off_the_event_loop_and_rebuilt_on_reupload(legacy_path):
+    Image.new("RGB", (2048, 512), "red").save(legacy_path, format="PNG")
+    payload = asyncio.run(image_store.get_legacy_image_payload())
+
+    with Image.open(legacy_path.with_name("image.prepared.jpg")) as prepared:
+        assert prepared.format == "JPEG"
+        assert prepared.size == (image_store.IMAGE_MAX_DIMENSION, image_store.IMAGE_MAX_DIMENSION // 4)
+    assert payload[:2] == b"\xff\xd8"
+
+    Image.new("RGB", (64, 64), "blue").save(legacy_path, format="PNG")
+    prepared_at = legacy_path.with_name("image.prepared.jpg").stat().st_mtime
+    os.utime(legacy_path, (prepared_at + 1, prepared_at + 1))
+    asyncio.run(image_store.get_legacy_image_payload())
+
+    with Image.open(legacy_path.with_name("image.prepared.jpg")) as prepared:
+        assert prepared.size == (64, 64)
+
+
+def test_missing_legacy_image_is_not_found(legacy_path):
+    with pytest.raises(image_store.ImageNotFoundError):
+        asyncio.run(image_store.get_legacy_image_payload())
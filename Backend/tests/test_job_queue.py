@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta, timezone
+
+from app.crud.goal import create_goal
+from app.crud.job import create_job, get_job, requeue_stale_jobs
+from app.models import job_queue as job_queue_module
+from app.models.generative import GenerationBusyError
+from app.models.job import JobStatus
+from app.schemas.goal import GoalCreate
+
+
+def _job(db, user):
+    goal = create_goal(db, GoalCreate(title="Learn to sail", category="Outdoors"), user.id)
+    return create_job(db, user.id, goal.id)
+
+
+def test_job_that_stays_busy_fails_after_max_attempts(db, user, monkeypatch):
+    job = _job(db, user)
+
+    def busy(*args, **kwargs):
+        raise GenerationBusyError("Too many generation requests in progress")
+
+    monkeypatch.setattr(job_queue_module, "generate_roadmap", busy)
+    queue = job_queue_module.JobQueue(workers=0, poll_interval=0, stale_after=600, max_attempts=2)
+
+    assert queue._run_next()
+    assert get_job(db, job.id, user.id).status == JobStatus.queued
+    assert queue._run_next()
+    db.expire_all()
+    failed = get_job(db, job.id, user.id)
+    assert failed.status == JobStatus.failed
+    assert failed.attempts == 2
+    assert "Gave up after 2 attempts" in failed.error
+    assert not queue._run_next()
+
+
+def test_stale_jobs_are_requeued_until_max_attempts(db, user):
+    retried, exhausted = _job(db, user), _job(db, user)
+    long_ago = datetime.now(timezone.utc) - timedelta(hours=1)
+    for job, attempts in ((retried, 1), (exhausted, 3)):
+        job.status, job.started_at, job.attempts = JobStatus.running, long_ago, attempts
+    db.commit()
+
+    assert requeue_stale_jobs(db, stale_after_seconds=60, max_attempts=3) == 1
+    db.expire_all()
+    assert get_job(db, retried.id, user.id).status == JobStatus.queued
+    assert get_job(db, exhausted.id, user.id).status == JobStatus.failed
@@ -0,0 +1,22 @@
+from app.auth import key_cache
+
+
+def test_key_read_that_overlaps_a_purge_is_not_cached():
+    generation = key_cache.key_generation()
+    key_cache.purge_key(1)
+    key_cache.cache_key(1, generation, "old-key")
+    assert key_cache.get_cached_key(1) is None
+
+    key_cache.cache_key(1, key_cache.key_generation(), "new-key")
+    assert key_cache.get_cached_key(1) == "new-key"
+
+
+def test_purge_wipes_the_cached_bytes_and_keeps_no_per_user_state():
+    key_cache.cache_key(2, key_cache.key_generation(), "secret")
+    secret = key_cache._key_cache.get(2)
+
+    key_cache.purge_key(2)
+
+    assert secret == bytearray(len("secret"))
+    assert key_cache.get_cached_key(2) is None
+    assert 2 not in key_cache._key_cache._data
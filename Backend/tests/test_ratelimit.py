@@ -0,0 +1,38 @@
+import pytest
+
+from app.ratelimit import BucketLimit, MemoryBucketStore, RateLimiter, SQLiteBucketStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryBucketStore()
+    return SQLiteBucketStore(str(tmp_path / "buckets.db"))
+
+
+def test_bucket_allows_a_burst_then_refills_at_the_configured_rate(store):
+    limit = BucketLimit(burst=3, per_minute=60)
+
+    assert [store.take("1:ai", limit, 1, 100.0)[0] for _ in range(3)] == [True, True, True]
+    allowed, tokens, retry_after = store.take("1:ai", limit, 1, 100.0)
+    assert (allowed, tokens, retry_after) == (False, 0.0, 1.0)
+
+    assert store.take("1:ai", limit, 1, 101.0)[0]
+    assert store.peek("1:ai", limit, 1000.0)["tokens"] == 3.0
+    # Other users and endpoint classes have their own buckets
+    assert store.take("2:ai", limit, 3, 101.0)[0]
+
+
+def test_limiter_caps_cost_at_the_bucket_size_and_counts_outcomes():
+    limiter = RateLimiter(MemoryBucketStore(), {"ai": BucketLimit(burst=2, per_minute=1)})
+
+    assert limiter.acquire(1, "ai", cost=10) == (True, 0.0)
+    allowed, retry_after = limiter.acquire(1, "ai")
+    assert not allowed and retry_after == pytest.approx(60, abs=1)
+    assert limiter.usage(1)["ai"]["limited"] == 1
+
+
+def test_disabled_limiter_never_limits():
+    limiter = RateLimiter(MemoryBucketStore(), {"ai": BucketLimit(burst=0, per_minute=0)}, enabled=False)
+
+    assert limiter.acquire(1, "ai") == (True, 0.0)
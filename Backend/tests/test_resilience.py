@@ -0,0 +1,48 @@
+import time
+
+import pytest
+
+from app.models.resilience import CircuitBreaker, ResilientCaller, TransientLLMError
+
+
+def _raise(error):
+    def fn(timeout):
+        raise error
+    return fn
+
+
+def _open_breaker(caller: ResilientCaller, key_id: str) -> CircuitBreaker:
+    breaker = caller.breaker(key_id)
+    breaker.state = "open"
+    breaker.failures = breaker.failure_threshold
+    breaker.opened_at = time.monotonic() - breaker.reset_seconds
+    return breaker
+
+
+def test_non_transient_error_releases_half_open_trial_without_closing():
+    caller = ResilientCaller()
+    breaker = _open_breaker(caller, "key")
+
+    with pytest.raises(ValueError):
+        caller.call("key", _raise(ValueError("bad request")), time.monotonic() + 5)
+
+    assert breaker.state == "half_open"
+    assert breaker.failures == breaker.failure_threshold
+    # The trial slot is free again, so the next call may probe upstream
+    assert breaker.allow()
+
+
+def test_non_transient_error_keeps_failure_count_of_closed_breaker(monkeypatch):
+    monkeypatch.setattr("app.models.resilience.LLM_MAX_RETRIES", 0)
+    caller = ResilientCaller()
+    breaker = caller.breaker("key")
+
+    with pytest.raises(TransientLLMError):
+        caller.call("key", _raise(TransientLLMError("503")), time.monotonic() + 5)
+    assert breaker.failures == 1
+
+    with pytest.raises(ValueError):
+        caller.call("key", _raise(ValueError("bad key")), time.monotonic() + 5)
+
+    assert breaker.state == "closed"
+    assert breaker.failures == 1
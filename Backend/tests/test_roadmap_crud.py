@@ -0,0 +1,87 @@
+import warnings
+
+import pytest
+from sqlalchemy.exc import SAWarning
+
+from app.crud.goal import create_goal
+from app.database import SessionLocal
+from app.crud.roadmap import RoadmapStepCRUD, roadmap_crud, roadmap_step_crud, step_counter_values
+from app.models.roadmap import Roadmap
+from app.schemas.goal import GoalCreate
+from app.schemas.roadmap import RoadmapCreate, RoadmapStepCreate, RoadmapStepUpdate
+
+
+@pytest.fixture
+def roadmap(db, user):
+    goal = create_goal(db, GoalCreate(title="Learn Spanish", category="Languages"), user.id)
+    return roadmap_crud.create_roadmap(db, RoadmapCreate(
+        title="Spanish", steps=[RoadmapStepCreate(title=f"Step {i}") for i in range(4)]
+    ), goal.id, user.id)
+
+
+def _assert_counters_match_steps(db, roadmap_id):
+    db_roadmap = db.get(Roadmap, roadmap_id, populate_existing=True)
+    counted = step_counter_values(db, roadmap_id)
+    assert db_roadmap.total_steps == counted[Roadmap.total_steps]
+    assert db_roadmap.completed_steps == counted[Roadmap.completed_steps]
+
+
+def test_regenerating_remaining_steps_twice_keeps_order_and_counters(db, user, roadmap):
+    first, second = roadmap.steps[:2]
+    roadmap_step_crud.toggle_step_completion(db, first.id, user.id)
+    roadmap_step_crud.toggle_step_completion(db, second.id, user.id)
+
+    with warnings.catch_warnings():
+        # Stale steps left in the identity map show up as SAWarnings on flush
+        warnings.simplefilter("error", SAWarning)
+        for round_ in ("a", "b"):
+            regenerated = roadmap_crud.replace_incomplete_steps(
+                db, roadmap.id, [RoadmapStepCreate(title=f"New {round_}{i}") for i in range(3)], user.id)
+
+    assert [(step.title, step.order_index, step.is_completed) for step in regenerated.steps] == [
+        ("Step 0", 0, True),
+        ("Step 1", 1, True),
+        ("New b0", 2, False),
+        ("New b1", 3, False),
+        ("New b2", 4, False),
+    ]
+    assert (regenerated.total_steps, regenerated.completed_steps) == (5, 2)
+    _assert_counters_match_steps(db, roadmap.id)
+
+
+def test_toggles_and_updates_move_the_completed_counter_only_on_change(db, user, roadmap):
+    first, second = roadmap.steps[:2]
+    roadmap_step_crud.toggle_step_completion(db, first.id, user.id)
+    roadmap_step_crud.toggle_step_completion(db, first.id, user.id)
+    roadmap_step_crud.update_step(db, second.id, RoadmapStepUpdate(is_completed=True), user.id)
+    # Re-sending the same completion does not count twice
+    roadmap_step_crud.update_step(db, second.id, RoadmapStepUpdate(is_completed=True, title="Renamed"), user.id)
+
+    db_roadmap = db.get(Roadmap, roadmap.id, populate_existing=True)
+    assert (db_roadmap.total_steps, db_roadmap.completed_steps) == (4, 1)
+    _assert_counters_match_steps(db, roadmap.id)
+
+
+def test_delete_step_retries_when_completion_changes_under_it(db, user, roadmap, monkeypatch):
+    step = roadmap.steps[0]
+    get_step = RoadmapStepCRUD.get_step
+    calls = []
+
+    def read_then_race(session, step_id, user_id):
+        db_step = get_step(session, step_id, user_id)
+        calls.append(session)
+        if len(calls) == 1:
+            # Another request completes the step between this read and the delete
+            other = SessionLocal()
+            RoadmapStepCRUD.toggle_step_completion(other, step_id, user_id)
+            other.close()
+        return db_step
+
+    monkeypatch.setattr(RoadmapStepCRUD, "get_step", staticmethod(read_then_race))
+    assert roadmap_step_crud.delete_step(db, step.id, user.id)
+
+    # Our read, the concurrent toggle's read, then our re-read after the missed delete
+    assert calls == [db, calls[1], db]
+    db_roadmap = db.get(Roadmap, roadmap.id, populate_existing=True)
+    assert (db_roadmap.total_steps, db_roadmap.completed_steps) == (3, 0)
+    _assert_counters_match_steps(db, roadmap.id)
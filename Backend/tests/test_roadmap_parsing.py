@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from app.models import roadmap_generator
+from app.models.roadmap_generator import (
+    RoadmapParseError, StepStreamParser, _find_step_array, _parse_or_repair, parse_roadmap_steps,
+)
+
+STEPS = [
+    {"title": "Pick a plan", "description": "Choose a 16 week [beginner] plan"},
+    {"title": "Run {easy}", "description": "Keep the pace \"conversational\""},
+]
+
+
+def test_stream_parser_yields_each_step_once_its_object_closes():
+    text = "```json\n" + json.dumps(STEPS) + "\n```"
+    parser = StepStreamParser()
+
+    steps = []
+    for i in range(0, len(text), 7):
+        steps.extend(parser.feed(text[i:i + 7]))
+
+    assert steps == STEPS
+
+
+def test_stream_parser_skips_bracketed_prose_and_keeps_completed_steps_of_truncated_input():
+    text = "Here are [2] steps: " + json.dumps(STEPS)
+    truncated = text[:text.index('"Run')]
+
+    assert StepStreamParser().feed(truncated) == STEPS[:1]
+
+
+def test_find_step_array_skips_brackets_in_surrounding_prose():
+    text = f"Roadmap [3 steps] below [1]\n{json.dumps(STEPS)}\nSee [notes]."
+
+    assert _find_step_array(text) == STEPS
+    assert _find_step_array("no [steps] here, only [1, 2]") is None
+
+
+@pytest.mark.parametrize("raw", [
+    json.dumps(STEPS),
+    "```json\n" + json.dumps(STEPS) + "\n```",
+    json.dumps({"steps": STEPS}),
+    "Sure! [Plan]\n" + json.dumps(STEPS) + "\nGood luck.",
+])
+def test_parse_roadmap_steps_accepts_noisy_responses(raw):
+    assert parse_roadmap_steps(raw) == STEPS
+
+
+def test_parse_roadmap_steps_rejects_responses_without_steps():
+    with pytest.raises(RoadmapParseError):
+        parse_roadmap_steps("I cannot help with that.")
+
+
+def test_parse_or_repair_spends_one_repair_round_trip(monkeypatch):
+    prompts = []
+
+    def fake_generate_text(prompt, db, user_id, generation_config=None):
+        prompts.append(prompt)
+        return {"text": json.dumps(STEPS)}
+
+    monkeypatch.setattr(roadmap_generator, "generate_text", fake_generate_text)
+
+    assert _parse_or_repair("not json at all", None, 1) == STEPS
+    assert len(prompts) == 1 and "not json at all" in prompts[0]
+
+
+def test_parse_or_repair_gives_up_when_the_repair_is_unusable(monkeypatch):
+    monkeypatch.setattr(roadmap_generator, "generate_text", lambda *args, **kwargs: {"text": "still not json"})
+    failed = roadmap_generator.parse_stats.stats()["failed"]
+
+    with pytest.raises(RoadmapParseError):
+        _parse_or_repair("not json at all", None, 1)
+    assert roadmap_generator.parse_stats.stats()["failed"] == failed + 1
@@ -0,0 +1,8 @@
+from app.search import _MATCH_END, _MATCH_START, render_snippet
+
+
+def test_render_snippet_bolds_matches_and_escapes_markdown_in_goal_text():
+    snippet = f"Save 5*2 \\ week for {_MATCH_START}marathon{_MATCH_END} shoes"
+
+    assert render_snippet(snippet) == "Save 5\\*2 \\\\ week for **marathon** shoes"
+    assert render_snippet(None) is None
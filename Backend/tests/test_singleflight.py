@@ -0,0 +1,56 @@
+import threading
+import time
+
+import pytest
+
+from app.singleflight import FlightWaitTimeout, SingleFlight
+
+
+def _start_leader(flight: SingleFlight, release: threading.Event, result="roadmap") -> threading.Thread:
+    started = threading.Event()
+
+    def leader():
+        def fn():
+            started.set()
+            release.wait(5)
+            return result
+        flight.do("goal", fn)
+
+    thread = threading.Thread(target=leader)
+    thread.start()
+    assert started.wait(5)
+    return thread
+
+
+def test_followers_share_the_leaders_result():
+    flight = SingleFlight()
+    release = threading.Event()
+    leader = _start_leader(flight, release)
+    results = []
+    follower = threading.Thread(target=lambda: results.append(flight.do("goal", lambda: "duplicate")))
+    follower.start()
+    while flight.stats()["coalesced"] == 0:
+        time.sleep(0.001)
+
+    release.set()
+    follower.join(5)
+    leader.join(5)
+
+    assert results == ["roadmap"]
+    assert flight.stats()["leaders"] == 1
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_follower_stops_waiting_for_a_stuck_leader():
+    flight = SingleFlight()
+    release = threading.Event()
+    leader = _start_leader(flight, release)
+
+    with pytest.raises(FlightWaitTimeout):
+        flight.do("goal", lambda: "duplicate", timeout=0.05)
+
+    release.set()
+    leader.join(5)
+    assert flight.stats()["wait_timeouts"] == 1
+    # The key is free again once the leader finishes
+    assert flight.do("goal", lambda: "next") == "next"
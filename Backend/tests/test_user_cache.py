@@ -0,0 +1,43 @@
+import asyncio
+
+from app.auth.user_cache import _user_cache, aget_cached_user, get_cached_user, invalidate_user
+from app.database import SessionLocal, dispose_async_engine, get_async_session_factory
+from app.crud.goal import create_goal
+from app.schemas.goal import GoalCreate
+
+
+def test_each_session_gets_its_own_attached_user(db, user):
+    invalidate_user("ada")
+    create_goal(db, GoalCreate(title="Run a marathon", category="Health"), user.id)
+
+    first_session, second_session = SessionLocal(), SessionLocal()
+    try:
+        first = get_cached_user(first_session, "ada")
+        second = get_cached_user(second_session, "ada")
+
+        assert first is not second
+        assert _user_cache.get("ada") not in (first, second)
+        assert first in first_session and second in second_session
+        # Relationships lazy-load instead of raising DetachedInstanceError
+        assert [goal.title for goal in second.goals] == ["Run a marathon"]
+
+        first.username = "changed"
+        assert second.username == _user_cache.get("ada").username == "ada"
+    finally:
+        first_session.close()
+        second_session.close()
+
+
+def test_async_lookup_merges_into_the_async_session(db, user):
+    invalidate_user("ada")
+    cached = get_cached_user(db, "ada")
+
+    async def main():
+        try:
+            async with get_async_session_factory()() as session:
+                found = await aget_cached_user(session, "ada")
+                return found is not cached and found in session, found.id
+        finally:
+            await dispose_async_engine()
+
+    assert asyncio.run(main()) == (True, user.id)